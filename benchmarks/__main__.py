@@ -0,0 +1,204 @@
+"""
+Time each stage of the generation pipeline over synthetic module trees
+
+Usage::
+
+    python -m benchmarks --sizes 10 100 1000 --output bench.json
+
+For every category and size, a module tree is synthesized in a temporary directory
+and each stage (read, parse, tokenize, format, fill, generate, sort, layout, fit,
+save) is timed on its own, over all items. Results are printed as JSON.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from generate.config import FORMATS
+from generate.generators import *
+from generate.layout import LAYOUTS, fit, item_layouts
+from generate.loader import YAML_LOADER
+from generate.save import save_tex
+from generate.tokenize import clear_cache, tokenize, tokenize_many
+from generate.utils import item_name, list_files
+
+from .corpus import ITEM_FACTORIES, make_items, make_skills
+
+ITEM_GENERATORS = {
+    "education-items": EducationItemGenerator,
+    "work-items": WorkItemGenerator,
+    "experience-items": ExperienceItemGenerator,
+    "courses-items": CourseItemGenerator,
+    "projects-items": ProjectItemGenerator,
+    "awards-items": AwardItemGenerator,
+}
+
+
+def timed(func: Callable[[], object], repeat: int) -> float:
+    """Best wall time of ``repeat`` calls to ``func``, in seconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_stages(
+    generator: YamlTexModuleGenerator, paths: List[str], output_root: str, repeat: int
+) -> Dict[str, float]:
+    generator.output_root = output_root
+    timings = {}
+
+    def read():
+        raw = []
+        for path in paths:
+            with open(path, encoding="utf-8") as f:
+                raw.append(generator.read(f))
+        return raw
+
+    timings["read"] = timed(read, repeat)
+    raw = read()
+    timings["parse"] = timed(lambda: [generator.parse(data) for data in raw], repeat)
+    parsed = [generator.parse(data) for data in raw]
+
+    texts = [
+        item["description"]
+        for data in raw
+        for item in data.get("items", [data])
+        if item.get("description")
+    ]
+
+    def tokenize_each():
+        clear_cache()
+        return [tokenize(text) for text in texts]
+
+    def tokenize_batch():
+        clear_cache()
+        return tokenize_many(texts)
+
+    timings["tokenize"] = timed(tokenize_each, repeat)
+    timings["tokenize_many"] = timed(tokenize_batch, repeat)
+    timings["tokenize_memoized"] = timed(lambda: tokenize_many(texts), repeat)
+
+    for fmt in FORMATS:
+        formatter = generator.formatters[fmt]
+        template = generator.templates[fmt]
+        timings[f"format_fields_{fmt}"] = timed(
+            lambda: [formatter(data) for data in parsed], repeat
+        )
+        formatted = [formatter(data) for data in parsed]
+        timings[f"fill_{fmt}"] = timed(
+            lambda: [template.fill(fields) for fields in formatted], repeat
+        )
+
+    timings["generate_each"] = timed(
+        lambda: [generator.generate(data, fmt) for fmt in FORMATS for data in parsed],
+        repeat,
+    )
+    timings["generate_many"] = timed(lambda: generator.generate_many(parsed), repeat)
+
+    if "items" not in parsed[0]:
+        aggregate = AllItemsByDateGenerator(generator)
+        named = [(item_name(path), data) for path, data in zip(paths, parsed)]
+        timings["sort"] = timed(lambda: aggregate.sort_items(named), repeat)
+        timings["sort_paths"] = timed(lambda: aggregate.sort_paths(paths), repeat)
+        timings["sort_top5"] = timed(lambda: aggregate.sort_items(named, 5), repeat)
+        # with the index already built, as when rendering several formats
+        timings["select_indexed"] = timed(lambda: aggregate.select_items(named), repeat)
+        # estimated heights of the resume items, and a one-page selection of them
+        timings["layout"] = timed(
+            lambda: item_layouts(generator, named, "resume", "items"), repeat
+        )
+        layouts = {"items": item_layouts(generator, named, "resume", "items")}
+        timings["fit"] = timed(lambda: fit(layouts, LAYOUTS["resume"]), repeat)
+
+    rendered = [generator.generate(data, FORMATS[0]) for data in parsed]
+
+    def save():
+        for i, tex in enumerate(rendered):
+            save_tex(tex, "bench", f"item{i}", generator.output_dir(FORMATS[0]))
+
+    timings["save_tex"] = timed(save, 1)  # later runs would skip unchanged files
+    return timings
+
+
+def run(sizes: List[int], categories: List[str], repeat: int) -> Dict:
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory(prefix="cv-bench-") as root:
+            modules = os.path.join(root, "modules")
+            sources = {
+                category: list_files(make_items(modules, category, size))
+                for category in categories
+            }
+            sources["skills"] = [make_skills(modules, size)]
+            for category, paths in sources.items():
+                generator = (
+                    SkillsGenerator()
+                    if category == "skills"
+                    else ITEM_GENERATORS[category]()
+                )
+                timings = bench_stages(
+                    generator, paths, os.path.join(root, "generated"), repeat
+                )
+                results.append(
+                    {
+                        "category": category,
+                        "size": size,
+                        "stages": {
+                            stage: {
+                                "seconds": seconds,
+                                "us_per_item": seconds / size * 1e6,
+                            }
+                            for stage, seconds in timings.items()
+                        },
+                    }
+                )
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "yaml_loader": YAML_LOADER.name,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def define_cli():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument(
+        "-s",
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[10, 100, 1000],
+        help="numbers of items per category",
+    )
+    parser.add_argument(
+        "-c",
+        "--categories",
+        nargs="+",
+        choices=ITEM_FACTORIES,
+        default=list(ITEM_FACTORIES),
+        help="item categories to benchmark",
+    )
+    parser.add_argument(
+        "-r", "--repeat", type=int, default=3, help="runs per stage (best is kept)"
+    )
+    parser.add_argument("-o", "--output", help="also write the JSON results here")
+    return parser
+
+
+if __name__ == "__main__":
+    args = define_cli().parse_args()
+    report = run(args.sizes, args.categories, args.repeat)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
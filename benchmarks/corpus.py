@@ -0,0 +1,149 @@
+"""Synthetic module trees shaped like the real ``modules/`` directory"""
+
+import calendar
+import os
+import random
+from typing import Callable, Dict
+
+import yaml
+
+from generate.utils import Data
+
+WORDS = (
+    "developed evaluated model classification data pipeline research orchestra "
+    "university project team python learning analysis course performance cello "
+    "algebra geometry statistics forecasting web interface concert programme "
+    "students tutor validation repository library processing numerical"
+).split()
+
+
+def _sentence(rng: random.Random, n_words: int) -> str:
+    words = [rng.choice(WORDS) for _ in range(n_words)]
+    return " ".join(words).capitalize() + "."
+
+
+def _description(rng: random.Random) -> str:
+    text = " ".join(
+        _sentence(rng, rng.randint(6, 18)) for _ in range(rng.randint(1, 4))
+    )
+    if rng.random() < 0.2:
+        text += f" See https://example.org/{rng.choice(WORDS)}/{rng.randint(1, 999)}."
+    return text
+
+
+def _date(rng: random.Random) -> str:
+    return f"{calendar.month_name[rng.randint(1, 12)]} {rng.randint(2000, 2025)}"
+
+
+def _dated(rng: random.Random) -> Data:
+    return {
+        "start-date": _date(rng),
+        "end-date": "present" if rng.random() < 0.05 else _date(rng),
+    }
+
+
+def _education(rng: random.Random) -> Data:
+    return {
+        "degree": rng.choice(["BSc", "MSc", "PhD", None]),
+        "title": _sentence(rng, 3),
+        "institution": _sentence(rng, rng.randint(2, 6)),
+        **_dated(rng),
+        "comment": {"expected-end-date": None, "other": None},
+        "description": _description(rng),
+        "grade": {"type": "GPA", "value": f"{rng.uniform(5, 10):.2f}/10"},
+    }
+
+
+def _work(rng: random.Random) -> Data:
+    return {
+        "job-title": _sentence(rng, 2),
+        "company": _sentence(rng, 2),
+        **_dated(rng),
+        "comment": None,
+        "description": _description(rng),
+    }
+
+
+def _experience(rng: random.Random) -> Data:
+    return {
+        "title": _sentence(rng, 4),
+        "institution": _sentence(rng, 3),
+        **_dated(rng),
+        "comment": None,
+        "description": _description(rng),
+    }
+
+
+def _course(rng: random.Random) -> Data:
+    return {
+        "title": _sentence(rng, 4),
+        "institution": _sentence(rng, 3),
+        **_dated(rng),
+        "description": _description(rng),
+    }
+
+
+def _project(rng: random.Random) -> Data:
+    return {
+        "title": _sentence(rng, 4),
+        **_dated(rng),
+        "link": (
+            f"https://example.org/{rng.randint(1, 999)}" if rng.random() < 0.5 else None
+        ),
+        "comment": None,
+        "description": _description(rng),
+        "short-description": _sentence(rng, 12),
+    }
+
+
+def _award(rng: random.Random) -> Data:
+    return {
+        "title": _sentence(rng, 5),
+        "awarded-by": _sentence(rng, 3),
+        "date": _date(rng),
+        "description": _description(rng) if rng.random() < 0.5 else None,
+    }
+
+
+#: item factories by ``modules/`` directory name
+ITEM_FACTORIES: Dict[str, Callable[[random.Random], Data]] = {
+    "education-items": _education,
+    "work-items": _work,
+    "experience-items": _experience,
+    "courses-items": _course,
+    "projects-items": _project,
+    "awards-items": _award,
+}
+
+
+def make_items(root: str, category: str, size: int, seed: int = 0) -> str:
+    """Write ``size`` synthetic items of a category under ``root``; return the dir"""
+    rng = random.Random(f"{category}-{seed}")
+    directory = os.path.join(root, category)
+    os.makedirs(directory, exist_ok=True)
+    factory = ITEM_FACTORIES[category]
+    for i in range(size):
+        with open(
+            os.path.join(directory, f"item{i:06}.yaml"), "w", encoding="utf-8"
+        ) as f:
+            yaml.safe_dump(factory(rng), f, allow_unicode=True, sort_keys=False)
+    return directory
+
+
+def make_skills(root: str, size: int, seed: int = 0) -> str:
+    """Write a ``skills.yaml`` with ``size`` synthetic skills; return its path"""
+    rng = random.Random(f"skills-{seed}")
+    items = [
+        {
+            "name": _sentence(rng, 2),
+            "level": rng.choice(["Beginner", "Intermediate", "Advanced", "Fluent"]),
+            "score": rng.randint(1, 5),
+            "description": _description(rng),
+        }
+        for _ in range(size)
+    ]
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, "skills.yaml")
+    with open(path, "w", encoding="utf-8") as f:
+        yaml.safe_dump({"items": items}, f, allow_unicode=True, sort_keys=False)
+    return path
@@ -0,0 +1,134 @@
+"""
+Measure the start-up cost of the command line interface
+
+Usage::
+
+    python -m benchmarks.startup [--check] [--output startup.json]
+
+Each scenario runs ``python -X importtime -m generate ...`` in a subprocess and
+records its wall time, the time spent importing modules and which modules were
+imported. With ``--check``, the exit status is non-zero if a scenario imports a
+module it shouldn't need (e.g. PyYAML or the generators for ``--help``), which
+guards the lazy imports of the entry point against regressions.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#: modules that only generating, serving or compiling need
+HEAVY_MODULES = (
+    "yaml",
+    "generate.generators",
+    "generate.templates",
+    "generate.pipeline",
+    "generate.build",
+    "generate.serve",
+    "http.server",
+)
+
+
+class Scenario(NamedTuple):
+    name: str
+    arguments: Tuple[str, ...]
+    forbidden: Tuple[str, ...]
+    #: run the command once beforehand, e.g. to bring the outputs up to date
+    warm_up: bool = False
+
+
+SCENARIOS = [
+    Scenario("help", ("--help",), HEAVY_MODULES),
+    Scenario("build-help", ("build", "--help"), HEAVY_MODULES),
+    Scenario("serve-help", ("serve", "--help"), HEAVY_MODULES),
+    Scenario("incremental-noop", ("-l", "WARNING", "-i"), ("yaml",), warm_up=True),
+]
+
+
+def parse_importtime(stderr: str) -> Dict[str, int]:
+    """Self import time in microseconds of each module, from ``-X importtime``"""
+    imports = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, module = line[len("import time:") :].split("|")
+        imports[module.strip()] = int(self_us)
+    return imports
+
+
+def run_scenario(scenario: Scenario, cwd: str, repeat: int) -> Dict:
+    command = [sys.executable, "-X", "importtime", "-m", "generate"]
+    command += scenario.arguments
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    if scenario.warm_up:
+        subprocess.run(command, cwd=cwd, env=env, capture_output=True, check=True)
+
+    best_wall = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run(
+            command, cwd=cwd, env=env, capture_output=True, text=True, check=True
+        )
+        best_wall = min(best_wall, time.perf_counter() - start)
+    imports = parse_importtime(result.stderr)
+    return {
+        "arguments": list(scenario.arguments),
+        "wall_ms": best_wall * 1e3,
+        "import_ms": sum(imports.values()) / 1e3,
+        "modules": len(imports),
+        "forbidden_imports": sorted(
+            module for module in imports if module in scenario.forbidden
+        ),
+    }
+
+
+def run(scenarios: Sequence[Scenario], repeat: int) -> Dict:
+    with tempfile.TemporaryDirectory(prefix="cv-startup-") as cwd:
+        # run against a copy of the sources, so that the repository's own outputs
+        # are left alone
+        shutil.copytree(os.path.join(ROOT, "modules"), os.path.join(cwd, "modules"))
+        shutil.copy(os.path.join(ROOT, "build-plan.yaml"), cwd)
+        results = {
+            scenario.name: run_scenario(scenario, cwd, repeat)
+            for scenario in scenarios
+        }
+    return {"python": sys.version.split()[0], "repeat": repeat, "results": results}
+
+
+def define_cli():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.startup")
+    parser.add_argument(
+        "-r", "--repeat", type=int, default=5, help="runs per scenario (best is kept)"
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="fail if a scenario imports a module it doesn't need",
+    )
+    parser.add_argument("-o", "--output", help="also write the JSON results here")
+    return parser
+
+
+if __name__ == "__main__":
+    args = define_cli().parse_args()
+    report = run(SCENARIOS, args.repeat)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+    failures: List[str] = [
+        f"{name}: imports {', '.join(result['forbidden_imports'])}"
+        for name, result in report["results"].items()
+        if result["forbidden_imports"]
+    ]
+    if args.check and failures:
+        sys.exit("Unneeded imports at start-up:\n" + "\n".join(failures))
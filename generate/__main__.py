@@ -1,6 +1,24 @@
+"""
+Command line entry point
+
+Only the standard library and the configuration are imported up front; everything
+else is imported by the command that needs it, so that ``--help`` and commands not
+generating anything start quickly (see ``benchmarks/startup.py``).
+"""
 import argparse
+import logging
+import os
+import sys
 
-from .generators import *
+from .config import (
+    BUILD_PLAN_PATH,
+    DOCUMENTS,
+    ENGINES,
+    FORMATS,
+    SERVE_HOST,
+    SERVE_PORT,
+    YAML_CACHE_PATH,
+)
 
 logger = logging.getLogger()
 
@@ -29,35 +47,339 @@ def setup_logging(level):
 
 
 def main(**kwargs):
-    setup_logging(kwargs.get("logging_level", logging.INFO))
-
-    TexIdentityGenerator("toplevel", subdir="").generate_file("modules/aboutme.tex")
-    ContactInfoGenerator().generate_file("modules/contact-info.yaml")
-    SkillsGenerator().generate_file("modules/skills.yaml")
-    CompactSkillsGenerator().generate_file("modules/skills.yaml")
-    LanguagesGenerator().generate_file("modules/languages.yaml")
-
-    (education := EducationItemGenerator()).generate_dir("modules/education-items")
-    AllItemsByDateGenerator(education).generate_dir("modules/education-items")
-    (work := WorkItemGenerator()).generate_dir("modules/work-items")
-    AllItemsByDateGenerator(work).generate_dir("modules/work-items")
-    (experience := ExperienceItemGenerator()).generate_dir("modules/experience-items")
-    AllItemsByDateGenerator(experience).generate_dir("modules/experience-items")
-    (course := CourseItemGenerator()).generate_dir("modules/courses-items")
-    AllItemsByDateGenerator(course).generate_dir("modules/courses-items")
-    (project := ProjectItemGenerator()).generate_dir("modules/projects-items")
-    AllItemsByDateGenerator(project).generate_dir("modules/projects-items")
-    (award := AwardItemGenerator()).generate_dir("modules/awards-items")
-    AllItemsByDateGenerator(award).generate_dir("modules/awards-items")
+    setup_logging(kwargs.get("logging_level") or logging.INFO)
+
+    if kwargs.get("command") == "build":
+        from .build import build_documents
+
+        build_documents(
+            kwargs.get("documents") or DOCUMENTS,
+            engine=kwargs.get("engine"),
+            force=kwargs.get("force", False),
+        )
+        return
+    if kwargs.get("command") == "serve":
+        from .loader import YAML_LOADER
+        from .serve import serve
+
+        if kwargs.get("yaml_cache"):
+            YAML_LOADER.cache_dir = YAML_CACHE_PATH
+        serve(
+            host=kwargs.get("host") or SERVE_HOST,
+            port=kwargs.get("port") or SERVE_PORT,
+            socket_path=kwargs.get("socket"),
+            variants_path=kwargs.get("variants"),
+            engine=kwargs.get("engine"),
+            plan_path=kwargs.get("plan") or BUILD_PLAN_PATH,
+        )
+        return
+    if kwargs.get("command") == "query":
+        from .index import ItemQuery, build_index
+        from .plan import load_plan
+        from .utils import format_date_short
+
+        query = ItemQuery.from_data(
+            {
+                "type": kwargs.get("item_type"),
+                "tags": kwargs.get("tags"),
+                "institutions": kwargs.get("institutions"),
+                "since": kwargs.get("since"),
+                "until": kwargs.get("until"),
+                "order-by": kwargs.get("order_by"),
+                "limit": kwargs.get("limit"),
+            }
+        )
+        index = build_index(load_plan(kwargs.get("plan") or BUILD_PLAN_PATH))
+        for item in index.select(query):
+            if query.order_by == "date":
+                value = format_date_short(
+                    item.data.get("end-date") or item.data.get("date")
+                )
+            else:
+                value = item.data.get(query.order_by)
+            print(f"{item.item_type}/{item.name}\t{'-' if value is None else value}")
+        return
+    if kwargs.get("command") == "fit":
+        from .layout import LAYOUTS, fit, plan_layouts
+        from .plan import load_plan
+
+        fmt = kwargs.get("format") or "resume"
+        layouts = plan_layouts(
+            load_plan(kwargs.get("plan") or BUILD_PLAN_PATH),
+            fmt,
+            kwargs.get("sections"),
+        )
+        result = fit(layouts, LAYOUTS[fmt], kwargs.get("pages") or 1)
+        for item, field in result.chosen:
+            print(f"{item.section}/{item.name}\t{field}\t{item.heights[field]:.0f}pt")
+        for item in result.left_out:
+            print(f"{item.section}/{item.name}\tleft out")
+        print(
+            f"{len(result.chosen)} of {len(result.chosen) + len(result.left_out)} "
+            f"items, {result.height:.0f} of {result.capacity:.0f}pt"
+        )
+        return
+
+    from .loader import YAML_LOADER
+    from .manifest import Manifest
+    from .pipeline import build_graph
+    from .plan import load_plan
+    from .profiling import PROFILER
+
+    if kwargs.get("profile") or kwargs.get("profile_json"):
+        PROFILER.enabled = True
+    if kwargs.get("cprofile"):
+        import cProfile
+
+        profile = cProfile.Profile()
+        profile.enable()
+
+    if kwargs.get("yaml_cache"):
+        YAML_LOADER.cache_dir = YAML_CACHE_PATH
+
+    manifest = Manifest() if kwargs.get("incremental") else None
+    variants = None
+    if kwargs.get("variants"):
+        from .variants import build_variants_graph, load_variants
+
+        variants = load_variants(kwargs["variants"])
+    cat_file = None
+    try:
+        if kwargs.get("branches") is not None:
+            from .branches import CatFile, build_branches_graph, load_branches
+
+            cat_file = CatFile()
+            try:
+                branches = load_branches(cat_file, kwargs["branches"])
+            except ValueError as e:
+                logger.error("%s", e)
+                sys.exit(1)
+        jobs = kwargs.get("jobs", 1)
+        jobs = jobs if jobs > 0 else os.cpu_count() or 1
+
+        plan_path = kwargs.get("plan") or BUILD_PLAN_PATH
+
+        def build():
+            plan = load_plan(plan_path)
+            if variants is not None:
+                return build_variants_graph(variants, manifest=manifest, plan=plan)
+            if cat_file is not None:
+                return build_branches_graph(branches, plan=plan)
+            return build_graph(manifest=manifest, plan=plan)
+
+        def run(graph):
+            graph.run(jobs=jobs)
+            if manifest is not None:
+                manifest.save()
+
+        if kwargs.get("dry_run"):
+            graph = build()
+            stale = graph.explain()
+            for task, reason in stale:
+                print(f"{task.key}: {reason}")
+            print(f"{len(stale)} of {len(graph)} tasks would run")
+            return
+
+        run(build())
+    finally:
+        if cat_file is not None:
+            cat_file.close()
+
+    if kwargs.get("report_loader"):
+        print(YAML_LOADER.report(), file=sys.stderr)
+
+    if kwargs.get("cprofile"):
+        profile.disable()
+        profile.dump_stats(kwargs["cprofile"])
+    if kwargs.get("profile"):
+        print(PROFILER.format_table())
+    if kwargs.get("profile_json"):
+        import json
+
+        with open(kwargs["profile_json"], "w", encoding="utf-8") as f:
+            json.dump(PROFILER.to_json(), f, indent=2)
+
+    if kwargs.get("watch"):
+        from .watch import watch
+
+        watch("modules", build, run)
 
 
 def define_cli():
     parser = argparse.ArgumentParser()
     parser.add_argument("-l", "--logging-level", type=logging.getLevelName)
+    parser.add_argument(
+        "-i",
+        "--incremental",
+        action="store_true",
+        help="only regenerate outputs whose inputs changed since the last run",
+    )
+    parser.add_argument(
+        "-n",
+        "--dry-run",
+        action="store_true",
+        help="list the outputs that would be regenerated and why, without "
+        "generating anything",
+    )
+    parser.add_argument(
+        "--plan",
+        metavar="FILE",
+        help="build plan mapping each module to its generators "
+        "(default: build-plan.yaml)",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of worker threads (0: one per CPU); they only overlap I/O, "
+        "parsing and rendering don't run in parallel",
+    )
+    parser.add_argument(
+        "-w",
+        "--watch",
+        action="store_true",
+        help="keep running, regenerating outputs as the modules change",
+    )
+    flavours = parser.add_mutually_exclusive_group()
+    flavours.add_argument(
+        "--variants",
+        metavar="FILE",
+        help="render every variant listed in a variants file, each into its own "
+        "output directory (generated/<variant> by default)",
+    )
+    flavours.add_argument(
+        "--branches",
+        nargs="*",
+        metavar="BRANCH",
+        help="render the modules of each branch (default: all local branches) "
+        "straight from git into generated/<branch>, without checking them out",
+    )
+    parser.add_argument(
+        "--yaml-cache",
+        action="store_true",
+        help="reuse pre-serialized parses of unchanged YAML sources",
+    )
+    parser.add_argument(
+        "--report-loader",
+        action="store_true",
+        help="report which YAML loader was used on stderr",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="print the time, calls and bytes read/written per generation stage",
+    )
+    parser.add_argument(
+        "--profile-json",
+        metavar="FILE",
+        help="write the per-stage profile to FILE as JSON",
+    )
+    parser.add_argument(
+        "--cprofile", metavar="FILE", help="dump cProfile statistics to FILE"
+    )
+
+    subparsers = parser.add_subparsers(dest="command")
+    build_parser = subparsers.add_parser(
+        "build",
+        help="compile the master LaTeX documents to PDF",
+        description="Compile the master documents in parallel, skipping those whose "
+        "inputs are unchanged since the last successful build.",
+    )
+    build_parser.add_argument(
+        "documents",
+        nargs="*",
+        help=f"documents to compile (default: {', '.join(DOCUMENTS)})",
+    )
+    build_parser.add_argument(
+        "-e", "--engine", choices=ENGINES, help="TeX engine (default: first found)"
+    )
+    build_parser.add_argument(
+        "-f", "--force", action="store_true", help="compile even if up to date"
+    )
+
+    query_parser = subparsers.add_parser(
+        "query",
+        help="list the items matching a query, most relevant first",
+        description="Index the items of every module and list those matching all "
+        "the given criteria, most recent first or by descending --order-by field.",
+    )
+    query_parser.add_argument(
+        "-t", "--type", dest="item_type", help="item type, e.g. work or skill"
+    )
+    query_parser.add_argument(
+        "--tag", dest="tags", action="append", help="required tag (repeatable)"
+    )
+    query_parser.add_argument(
+        "--institution",
+        dest="institutions",
+        action="append",
+        help="institution or company (repeatable: any of them)",
+    )
+    query_parser.add_argument("--since", metavar="DATE", help='e.g. "June 2020"')
+    query_parser.add_argument("--until", metavar="DATE")
+    query_parser.add_argument(
+        "--order-by",
+        metavar="FIELD",
+        help="date (default) or a numeric field, e.g. score",
+    )
+    query_parser.add_argument("--limit", type=int, help="list at most LIMIT items")
+
+    fit_parser = subparsers.add_parser(
+        "fit",
+        help="choose the items and descriptions that fit on a number of pages",
+        description="Estimate the height of every item from its text, without "
+        "compiling anything, and choose the most relevant items of each section, "
+        "with their long or short descriptions, that fit on the given pages.",
+    )
+    fit_parser.add_argument(
+        "-p", "--pages", type=int, default=1, help="number of pages (default: 1)"
+    )
+    fit_parser.add_argument(
+        "-f",
+        "--format",
+        choices=FORMATS,
+        default="resume",
+        help="format whose layout is estimated (default: resume)",
+    )
+    fit_parser.add_argument(
+        "--section",
+        dest="sections",
+        action="append",
+        help="section to fit, e.g. work-items (repeatable; default: every "
+        "directory with aggregates in the build plan)",
+    )
+
+    serve_parser = subparsers.add_parser(
+        "serve",
+        help="serve rendered modules and documents over a local HTTP API",
+        description="Keep parsed modules and compiled templates in memory and render "
+        "modules, documents and PDFs on request. Variants come from --variants.",
+    )
+    serve_parser.add_argument(
+        "--host", default=SERVE_HOST, help=f"address to bind (default: {SERVE_HOST})"
+    )
+    serve_parser.add_argument(
+        "-p",
+        "--port",
+        type=int,
+        default=SERVE_PORT,
+        help=f"port to listen on (default: {SERVE_PORT})",
+    )
+    serve_parser.add_argument(
+        "-s", "--socket", metavar="PATH", help="listen on a Unix socket instead"
+    )
+    serve_parser.add_argument(
+        "-e", "--engine", choices=ENGINES, help="TeX engine for PDF requests"
+    )
     return parser
 
 
 if __name__ == "__main__":
     arg_parser = define_cli()
     arg_namespace = arg_parser.parse_args()
+    if arg_namespace.branches is not None and (
+        arg_namespace.incremental or arg_namespace.watch
+    ):
+        arg_parser.error("--branches can't be combined with --incremental or --watch")
     main(**vars(arg_namespace))
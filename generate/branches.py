@@ -0,0 +1,199 @@
+"""
+Render every branch straight from the git object database
+
+Each branch of the repository is a flavour of the CV, differing mostly in its
+``modules/``. Instead of checking out and rendering each branch in turn, the trees
+and blobs of all branches are read through a single ``git cat-file --batch``
+process, and each branch is rendered into ``generated/<branch>/``. Parsed sources
+are cached by blob id, so a file that is the same on several branches is parsed
+once.
+"""
+import logging
+import os
+import posixpath
+import subprocess
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .config import ROOT_OUTPUT_PATH
+from .pipeline import build_graph
+from .plan import BuildPlan
+from .scheduler import TaskGraph
+
+
+logger = logging.getLogger(__name__)
+
+#: mode of the tree entries that are subdirectories
+TREE_MODE = b"40000"
+#: modes of the tree entries that are regular files
+FILE_MODES = (b"100644", b"100755")
+
+
+class CatFile:
+    """
+    A long-lived ``git cat-file --batch`` process, reading objects by name
+
+    Requests are serialized, so one instance can be shared between threads.
+    """
+
+    def __init__(self, repo: str = "."):
+        self.process = subprocess.Popen(
+            ["git", "cat-file", "--batch"],
+            cwd=repo,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+        self._lock = threading.Lock()
+
+    def read(self, name: str) -> Tuple[str, str, bytes]:
+        """Id, type and contents of the object ``name`` (an id or e.g. ``rev:path``)
+
+        Raises ``KeyError`` if there is no such object.
+        """
+        with self._lock:
+            self.process.stdin.write(name.encode("utf-8") + b"\n")
+            self.process.stdin.flush()
+            header = self.process.stdout.readline().split()
+            if len(header) != 3:  # "<name> missing" or "<name> ambiguous"
+                raise KeyError(name)
+            object_id, object_type, size = header
+            content = self.process.stdout.read(int(size))
+            self.process.stdout.read(1)  # trailing newline
+        return object_id.decode("ascii"), object_type.decode("ascii"), content
+
+    def close(self) -> None:
+        self.process.stdin.close()
+        self.process.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def parse_tree(content: bytes, id_size: int) -> List[Tuple[bytes, str, str]]:
+    """(mode, name, object id) of the entries of a tree object
+
+    ``id_size`` is the size of the binary object ids of the repository (20 bytes
+    for SHA-1, 32 for SHA-256).
+    """
+    entries = []
+    i = 0
+    while i < len(content):
+        end = content.index(b"\0", i)
+        mode, name = content[i:end].split(b" ", 1)
+        object_id = content[end + 1 : end + 1 + id_size].hex()
+        entries.append((mode, name.decode("utf-8"), object_id))
+        i = end + 1 + id_size
+    return entries
+
+
+class GitTree:
+    """
+    The files under a directory of a commit, read through ``CatFile``
+
+    Paths are relative to the repository root, like the paths of the working tree
+    the generators are otherwise given (e.g. ``modules/work-items/glovo.yaml``).
+    """
+
+    def __init__(self, cat_file: CatFile, rev: str, root: str = "modules"):
+        self.cat_file = cat_file
+        self.rev = rev
+        #: blob id of each file, and paths of the files directly in each directory
+        self.files: Dict[str, str] = {}
+        self.dirs: Dict[str, List[str]] = {}
+
+        try:
+            cat_file.read(rev)
+        except KeyError:
+            raise ValueError(f"Unknown branch or revision {rev!r}") from None
+        try:
+            object_id, object_type, content = cat_file.read(f"{rev}:{root}")
+        except KeyError:
+            object_type = None
+        if object_type != "tree":
+            raise ValueError(f"No {root} directory in {rev!r}")
+        self._walk(posixpath.normpath(root), content, len(object_id) // 2)
+        logger.debug("Read %d files under %s in %s", len(self.files), root, rev)
+
+    def _walk(self, directory: str, content: bytes, id_size: int) -> None:
+        files = self.dirs[directory] = []
+        for mode, name, object_id in parse_tree(content, id_size):
+            path = posixpath.join(directory, name)
+            if mode == TREE_MODE:
+                _, _, subtree = self.cat_file.read(object_id)
+                self._walk(path, subtree, id_size)
+            elif mode in FILE_MODES:
+                self.files[path] = object_id
+                files.append(path)
+        files.sort()
+
+    def exists(self, path: str) -> bool:
+        path = posixpath.normpath(path)
+        return path in self.files or path in self.dirs
+
+    def isdir(self, path: str) -> bool:
+        return posixpath.normpath(path) in self.dirs
+
+    def list_files(self, directory: str) -> List[str]:
+        """Paths of the regular files in a directory, like ``utils.list_files``"""
+        return list(self.dirs[posixpath.normpath(directory)])
+
+    def object_id(self, path: str) -> str:
+        return self.files[posixpath.normpath(path)]
+
+    def read(self, path: str) -> bytes:
+        _, _, content = self.cat_file.read(self.object_id(path))
+        return content
+
+
+class Branch(NamedTuple):
+    """A branch to render, and where to"""
+
+    name: str
+    tree: GitTree
+    output_root: str
+
+
+def list_branches(repo: str = ".") -> List[str]:
+    """Names of the local branches of a repository"""
+    output = subprocess.run(
+        ["git", "for-each-ref", "--format=%(refname:short)", "refs/heads/"],
+        cwd=repo,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return output.split()
+
+
+def load_branches(
+    cat_file: CatFile,
+    names: Optional[List[str]] = None,
+    output_root: str = ROOT_OUTPUT_PATH,
+) -> List[Branch]:
+    """The branches ``names`` (default: all local branches), read through ``cat_file``"""
+    if not names:
+        names = list_branches()
+    return [
+        Branch(name, GitTree(cat_file, name), os.path.join(output_root, name))
+        for name in names
+    ]
+
+
+def build_branches_graph(
+    branches: List[Branch],
+    add_comment: bool = True,
+    plan: Optional[BuildPlan] = None,
+) -> TaskGraph:
+    """
+    Build the tasks rendering every branch into its own output root
+
+    All branches are rendered with the generators and build plan of the working
+    tree; sources a branch doesn't have are skipped.
+    """
+    graph = TaskGraph()
+    for branch in branches:
+        build_graph(add_comment, branch=branch, graph=graph, plan=plan)
+    return graph
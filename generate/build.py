@@ -0,0 +1,132 @@
+import logging
+import os
+import re
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence
+
+from .config import BUILD_DIR, BUILD_MANIFEST_PATH, DOCUMENTS, ENGINE_PASSES, ENGINES
+from .manifest import Manifest
+
+
+logger = logging.getLogger(__name__)
+
+INPUT_PATTERN = re.compile(r"^[^%\n]*?\\(?:input|include)\{([^}]+)\}", re.MULTILINE)
+CLASS_PATTERN = re.compile(
+    r"^[^%\n]*?\\(documentclass|usepackage|RequirePackage)(?:\[[^]]*\])?\{([^}]+)\}",
+    re.MULTILINE,
+)
+
+
+def find_engine(preferred: Optional[str] = None) -> str:
+    """Name of the TeX engine to use: ``preferred`` or the first one installed"""
+    candidates = [preferred] if preferred else list(ENGINES)
+    for engine in candidates:
+        if shutil.which(ENGINES[engine][0]):
+            return engine
+    raise RuntimeError(f"No TeX engine found (tried {', '.join(candidates)})")
+
+
+def find_dependencies(document: str) -> List[str]:
+    """
+    Local files a LaTeX document depends on
+
+    Follows ``\\input``/``\\include`` recursively and picks up class and package
+    files that live in the document's directory (e.g. ``resume.cls``); files that
+    don't exist yet or come from the TeX distribution are ignored.
+    """
+    root_dir = os.path.dirname(os.path.abspath(document))
+    found = set()
+    pending = [os.path.abspath(document)]
+    while pending:
+        path = pending.pop()
+        if path in found or not os.path.isfile(path):
+            continue
+        found.add(path)
+        with open(path, encoding="utf-8", errors="replace") as f:
+            source = f.read()
+        for name in INPUT_PATTERN.findall(source):
+            name = name.strip()
+            if not os.path.splitext(name)[1]:
+                name += ".tex"
+            pending.append(os.path.join(root_dir, name))
+        for command, names in CLASS_PATTERN.findall(source):
+            extension = ".cls" if command == "documentclass" else ".sty"
+            for name in names.split(","):
+                pending.append(os.path.join(root_dir, name.strip() + extension))
+    return sorted(found)
+
+
+def compile_document(
+    document: str,
+    engine: str,
+    manifest: Optional[Manifest] = None,
+    output_dir: str = BUILD_DIR,
+) -> bool:
+    """
+    Compile a LaTeX document to PDF in ``output_dir``
+
+    If a manifest is given, compilation is skipped when the document and all of its
+    dependencies are byte-identical to the last successful build. Returns whether
+    the document was compiled.
+    """
+    name = os.path.splitext(os.path.basename(document))[0]
+    pdf_path = os.path.join(output_dir, f"{name}.pdf")
+    output_option = "-outdir" if engine == "latexmk" else "-output-directory"
+    command = [
+        *ENGINES[engine],
+        f"{output_option}={os.path.abspath(output_dir)}",
+        os.path.basename(document),
+    ]
+
+    if manifest is not None:
+        key = f"{document}:{output_dir}"
+        fingerprint = manifest.fingerprint(
+            inputs=find_dependencies(document), components=command
+        )
+        if manifest.is_up_to_date(key, fingerprint):
+            logger.info("%s is up to date", pdf_path)
+            return False
+
+    os.makedirs(output_dir, exist_ok=True)
+    logger.info("Compiling %s with %s", document, engine)
+    for _ in range(ENGINE_PASSES[engine]):
+        result = subprocess.run(
+            command,
+            cwd=os.path.dirname(os.path.abspath(document)),
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            encoding="utf-8",
+            errors="replace",
+        )
+        if result.returncode != 0:
+            logger.error("%s failed on %s:\n%s", engine, document, result.stdout)
+            raise RuntimeError(f"Compiling {document} failed")
+
+    if manifest is not None:
+        manifest.record(key, fingerprint, [pdf_path])
+    return True
+
+
+def build_documents(
+    documents: Sequence[str] = DOCUMENTS,
+    engine: Optional[str] = None,
+    force: bool = False,
+    jobs: Optional[int] = None,
+) -> None:
+    """Compile the master documents in parallel, skipping the up-to-date ones"""
+    engine = find_engine(engine)
+    manifest = None if force else Manifest(BUILD_MANIFEST_PATH)
+    with ThreadPoolExecutor(jobs or len(documents), "build") as executor:
+        futures = [
+            executor.submit(compile_document, document, engine, manifest)
+            for document in documents
+        ]
+        try:
+            for future in futures:
+                future.result()
+        finally:
+            if manifest is not None:
+                manifest.save()
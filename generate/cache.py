@@ -0,0 +1,154 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List, Sequence, Tuple
+
+from .config import PARSED_ITEMS_CACHE_SIZE
+from .utils import Data
+
+
+class ParsedItemCache:
+    """
+    Bounded LRU cache of parsed source files
+
+    Entries are keyed by a namespace (identifying how the file is parsed) and the
+    file's path, and are only reused while the file's modification time and size
+    are unchanged. Immutable objects, such as git blobs, are keyed by their id
+    instead (see ``fetch_object``). Several files can be fetched at once, loading
+    the missing ones in a single batch (see ``fetch_many``). When the cache is full,
+    the least recently used entries are evicted.
+    """
+
+    def __init__(self, maxsize: int = PARSED_ITEMS_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[Tuple[Hashable, str], Tuple[Any, Data]] = OrderedDict()
+        self._pending: Dict[Tuple[Tuple[Hashable, str], Any], Future] = {}
+        self._lock = threading.Lock()
+
+    def fetch(
+        self, namespace: Hashable, path: str, load: Callable[[str], Data]
+    ) -> Data:
+        """
+        Get the parsed contents of ``path``, calling ``load(path)`` if needed
+
+        Concurrent fetches of the same file wait for a single load instead of
+        loading it once each.
+        """
+        key = (namespace, os.path.abspath(path))
+        stat = os.stat(path)
+        return self._fetch(key, (stat.st_mtime_ns, stat.st_size), load, path)
+
+    def fetch_object(
+        self, namespace: Hashable, object_id: str, load: Callable[[str], Data]
+    ) -> Data:
+        """
+        Get the parsed contents of an object, calling ``load(object_id)`` if needed
+
+        Objects are identified by their contents (e.g. git blobs), so entries never
+        go stale and are shared by all the paths with the same object.
+        """
+        return self._fetch(("object", namespace, object_id), None, load, object_id)
+
+    def fetch_many(
+        self,
+        namespace: Hashable,
+        paths: Sequence[str],
+        load_many: Callable[[List[str]], List[Data]],
+    ) -> List[Data]:
+        """
+        Like ``fetch`` for several files, loading all the missing ones in one batch
+
+        ``load_many`` is called (at most once) with the paths that are neither cached
+        nor being loaded by another thread, and returns their parsed contents.
+        """
+        entries = []
+        for path in paths:
+            stat = os.stat(path)
+            key = (namespace, os.path.abspath(path))
+            entries.append((key, (stat.st_mtime_ns, stat.st_size)))
+        return self._fetch_many(entries, load_many, paths)
+
+    def fetch_objects(
+        self,
+        namespace: Hashable,
+        object_ids: Sequence[str],
+        load_many: Callable[[List[str]], List[Data]],
+    ) -> List[Data]:
+        """Like ``fetch_object`` for several objects, see ``fetch_many``"""
+        entries = [(("object", namespace, object_id), None) for object_id in object_ids]
+        return self._fetch_many(entries, load_many, object_ids)
+
+    def _fetch(
+        self, key: Tuple, stamp: Any, load: Callable[[str], Data], argument: str
+    ) -> Data:
+        def load_one(arguments: List[str]) -> List[Data]:
+            return [load(arguments[0])]
+
+        return self._fetch_many([(key, stamp)], load_one, [argument])[0]
+
+    def _fetch_many(
+        self,
+        entries: Sequence[Tuple[Tuple, Any]],
+        load_many: Callable[[List[str]], List[Data]],
+        arguments: Sequence[str],
+    ) -> List[Data]:
+        results: List[Any] = [None] * len(entries)
+        missing: List[Tuple[int, Future]] = []  # loaded here
+        waiting: List[Tuple[int, Future]] = []  # loaded by another thread, or twice
+        with self._lock:
+            for i, (key, stamp) in enumerate(entries):
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] == stamp:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    results[i] = entry[1]
+                    continue
+                pending = self._pending.get((key, stamp))
+                if pending is None:
+                    self.misses += 1
+                    self._pending[key, stamp] = future = Future()
+                    missing.append((i, future))
+                else:
+                    waiting.append((i, pending))
+
+        if missing:
+            try:
+                loaded = load_many([arguments[i] for i, _ in missing])
+            except BaseException as e:
+                with self._lock:
+                    for i, _ in missing:
+                        del self._pending[entries[i]]
+                for _, future in missing:
+                    future.set_exception(e)
+                raise
+
+            with self._lock:
+                for (i, _), data in zip(missing, loaded):
+                    key, stamp = entries[i]
+                    del self._pending[key, stamp]
+                    self._entries[key] = (stamp, data)
+                    self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+            for (i, future), data in zip(missing, loaded):
+                future.set_result(data)
+                results[i] = data
+
+        for i, future in waiting:
+            results[i] = future.result()
+        return results
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+#: cache shared by all generators
+PARSED_ITEMS = ParsedItemCache()
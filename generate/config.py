@@ -1,8 +1,43 @@
 import os
+from typing import Dict, List
 
 ROOT_OUTPUT_PATH = os.path.abspath("generated")
+MANIFEST_PATH = os.path.join(ROOT_OUTPUT_PATH, ".manifest.json")
+YAML_CACHE_PATH = os.path.join(ROOT_OUTPUT_PATH, ".cache", "yaml")
+PLAN_CACHE_PATH = os.path.join(ROOT_OUTPUT_PATH, ".cache", "plan")
+BUILD_PLAN_PATH = os.path.abspath("build-plan.yaml")
+
+DOCUMENTS = ["cv.tex", "resume.tex"]
+BUILD_DIR = os.path.abspath("out")
+BUILD_MANIFEST_PATH = os.path.join(BUILD_DIR, ".build-manifest.json")
+
+#: TeX engines in order of preference, with the command line to compile a document
+ENGINES: Dict[str, List[str]] = {
+    "latexmk": ["latexmk", "-pdf", "-interaction=nonstopmode", "-halt-on-error"],
+    "pdflatex": ["pdflatex", "-interaction=nonstopmode", "-halt-on-error"],
+    "xelatex": ["xelatex", "-interaction=nonstopmode", "-halt-on-error"],
+}
+#: number of runs needed by engines that don't work out reruns by themselves
+ENGINE_PASSES = {"latexmk": 1, "pdflatex": 2, "xelatex": 2}
 
 FORMATS = ["cv", "resume"]
-DATE_FIELDS = {"start-date", "end-date"}
-TEXT_FIELDS = {"description"}
+DATE_FIELDS = {"start-date", "end-date", "date"}
+TEXT_FIELDS = {"description", "short-description"}
 ITEMS_FIELD = "items"
+#: fields identifying an item within a multiple-items-per-file module
+ITEM_NAME_FIELDS = ("name", "language")
+#: fields indexed for item queries (see ``index.ItemIndex``)
+TAGS_FIELD = "tags"
+INSTITUTION_FIELDS = ("institution", "company", "awarded-by")
+
+PARSED_ITEMS_CACHE_SIZE = 4096
+TOKENIZE_CACHE_SIZE = 16384
+DATE_CACHE_SIZE = 1024
+WORD_WIDTH_CACHE_SIZE = 16384
+#: aggregates of at least this many items are written item by item
+STREAMING_THRESHOLD = 512
+
+SERVE_HOST = "127.0.0.1"
+SERVE_PORT = 8000
+RESPONSE_CACHE_SIZE = 256
+PDF_CACHE_SIZE = 16
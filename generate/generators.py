@@ -1,38 +1,81 @@
-import datetime
 import functools
+import heapq
+import inspect
+import io
+import itertools
 import logging
 import os
+import re
+import threading
 from abc import ABCMeta, abstractmethod
-from typing import ClassVar, Dict, IO, Optional, Type
-
-import yaml
+from contextlib import contextmanager
+from typing import (
+    Callable,
+    ClassVar,
+    Dict,
+    FrozenSet,
+    IO,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TYPE_CHECKING,
+)
 
-from .config import DATE_FIELDS, FORMATS, ITEMS_FIELD, ROOT_OUTPUT_PATH, TEXT_FIELDS
-from .save import save_tex
-from .templates import TEX_TEMPLATES
-from .tokenize import tokenize
+from .cache import PARSED_ITEMS
+from .config import (
+    DATE_FIELDS,
+    FORMATS,
+    ITEMS_FIELD,
+    ROOT_OUTPUT_PATH,
+    STREAMING_THRESHOLD,
+    TEXT_FIELDS,
+)
+from .index import IndexedItem, ItemIndex, ItemQuery, multiple_item_names
+from .loader import YAML_LOADER
+from .manifest import Manifest, code_hash
+from .profiling import PROFILER
+from .records import MISSING, Overlay, record_type
+from .save import generated_header, save_tex, stream_tex
+from .templates import TEX_TEMPLATES, Template
+from .tokenize import tokenize_many
 from .utils import (
     Data,
     FormattedFields,
     Formatter,
-    MonthDate,
+    date_sort_key,
     format_date_long,
     format_date_short,
     format_optional,
+    item_name,
+    list_files,
     parse_date,
 )
 
+if TYPE_CHECKING:
+    from .branches import GitTree
+
 
 logger = logging.getLogger(__name__)
 
 
 class AbstractTexModuleGenerator(metaclass=ABCMeta):
+    #: names of the fields the template of each format renders, and of the fields
+    #: any format renders; formatters skip the others (if empty, none are skipped)
+    template_fields: Mapping[str, FrozenSet[str]] = {}
+    rendered_fields: FrozenSet[str] = frozenset()
+
     def __init__(self, module_type: str, formatters: Dict[str, Formatter] = None):
         if formatters is None:
             formatters = {fmt: getattr(self, f"format_fields_{fmt}") for fmt in FORMATS}
 
         self.module_type = module_type
         self.formatters = formatters
+        self._batch = threading.local()
 
     @abstractmethod
     def read(self, source: IO) -> Data:
@@ -42,40 +85,115 @@ class AbstractTexModuleGenerator(metaclass=ABCMeta):
     def parse(self, data: Data) -> Data:
         pass
 
+    def parse_many(self, items: Sequence[Data]) -> List[Data]:
+        """Parse several items, see ``parse``"""
+        return [self.parse(data) for data in items]
+
     @abstractmethod
     def generate(self, parsed_data: Data, fmt: str) -> str:
         pass
 
     @abstractmethod
-    def save(self, generated_tex: str, *, name: str, fmt: str):
+    def save(self, generated_tex: str, *, name: str, fmt: str) -> str:
         pass
 
+    def generate_many(
+        self,
+        items: Iterable[Data],
+        formats: Optional[Iterable[str]] = None,
+        max_items: Optional[Mapping[str, int]] = None,
+    ) -> Dict[str, List[str]]:
+        """Render each of ``items`` in each of ``formats`` (default: all) in one pass
+
+        The formatting shared by all formats (``format_base``) is done once per item.
+        ``max_items`` optionally caps the number of items rendered per format.
+        Returns the rendered items of each format, in order.
+        """
+        formats = list(self.formatters if formats is None else formats)
+        limits = [(max_items or {}).get(fmt) for fmt in formats]
+        outputs: Dict[str, List[str]] = {fmt: [] for fmt in formats}
+        with self.shared_base():
+            for i, item in enumerate(items):
+                for fmt, limit in zip(formats, limits):
+                    if limit is None or i < limit:
+                        outputs[fmt].append(self.generate(item, fmt))
+        return outputs
+
+    @contextmanager
+    def shared_base(self) -> Iterator[None]:
+        """Reuse the result of ``format_base`` for an item across formats
+
+        Applies to the current thread until the context exits; nested uses share
+        the outermost context.
+        """
+        if getattr(self._batch, "bases", None) is not None:
+            yield
+            return
+        self._batch.bases = {}
+        try:
+            yield
+        finally:
+            self._batch.bases = None
+
+    def uses(self, field: str, fmt: Optional[str] = None) -> bool:
+        """Whether ``field`` is rendered in ``fmt`` (default: in any format)"""
+        if not self.template_fields:
+            return True
+        if fmt is None:
+            return field in self.rendered_fields
+        return field in self.template_fields[fmt]
+
+    def fingerprint_components(self) -> Tuple[str, ...]:
+        """Identify everything besides the input data that determines the output"""
+        cls = type(self)
+        path = inspect.getfile(cls)
+        return cls.__module__, cls.__qualname__, path, self.module_type, code_hash(path)
+
     def format_base(self, parsed_data: Data) -> FormattedFields:
-        return parsed_data.copy()
+        return Overlay(parsed_data)
+
+    def base_fields(self, data: Data) -> FormattedFields:
+        """Fields of ``data`` formatted by ``format_base``, for a formatter to extend
+
+        Within ``shared_base``, ``format_base`` runs once per item and each format
+        writes to its own overlay of the shared result.
+        """
+        bases = getattr(self._batch, "bases", None)
+        if bases is None:
+            return self.format_base(data)
+        entry = bases.get(id(data))
+        if entry is None:
+            # keep the item alive, so that its id isn't reused within the batch
+            entry = bases[id(data)] = (data, self.format_base(data))
+        return Overlay(entry[1])
 
     def format_fields_cv(self, data: Data) -> FormattedFields:
-        formatted = self.format_base(data)
+        formatted = self.base_fields(data)
 
         for date_field in DATE_FIELDS:
-            if date_field in data:
+            if date_field in data and self.uses(date_field, "cv"):
                 formatted[date_field] = format_date_long(data[date_field])
 
         return formatted
 
     def format_fields_resume(self, data: Data) -> FormattedFields:
-        formatted = self.format_base(data)
+        formatted = self.base_fields(data)
 
         for date_field in DATE_FIELDS:
-            if date_field in data:
+            if date_field in data and self.uses(date_field, "resume"):
                 formatted[date_field] = format_date_short(data[date_field])
 
-        if "description" in formatted:
+        if "description" in formatted and self.uses("short-description", "resume"):
             formatted.setdefault("short-description", formatted["description"])
 
         return formatted
 
 
 class FileToFileGenerator(AbstractTexModuleGenerator, metaclass=ABCMeta):
+    output_root: str = ROOT_OUTPUT_PATH
+    #: git tree the source files are read from, instead of the working directory
+    tree: Optional["GitTree"] = None
+
     def __init__(
         self,
         module_type: str,
@@ -85,31 +203,186 @@ class FileToFileGenerator(AbstractTexModuleGenerator, metaclass=ABCMeta):
         super().__init__(module_type, formatters)
         self.subdir = subdir if subdir is not None else self.module_type
 
-    def save(self, generated_tex: str, *, name: str, fmt: str):
-        save_tex(
+    def save(self, generated_tex: str, *, name: str, fmt: str) -> str:
+        return save_tex(
             generated_tex,
             type_name=f"{fmt} TeX",
             name=name,
-            output_dir=os.path.join(ROOT_OUTPUT_PATH, fmt, self.subdir),
+            output_dir=self.output_dir(fmt),
         )
 
-    def generate_file(self, path, add_comment=True):
+    def output_dir(self, fmt: str) -> str:
+        return os.path.join(self.output_root, fmt, self.subdir)
+
+    def output_name(self, path: str) -> str:
+        """Name of the output generated from the source file at ``path``"""
+        return item_name(path)
+
+    def load(self, path: str) -> Data:
+        """Read and parse a source file, reusing the result of a previous load"""
+        return self.load_many([path])[0]
+
+    def load_many(self, paths: Sequence[str]) -> List[Data]:
+        """Read and parse several source files, reusing the results of previous loads
+
+        The files that weren't loaded before are parsed together with ``parse_many``.
+        Parses are shared by the generators reading and parsing files the same way,
+        into the same record type.
+        """
+        cls = type(self)
+        namespace = (cls.read, cls.parse_many, getattr(self, "record_type", None))
+        if self.tree is not None:
+            object_ids = [self.tree.object_id(path) for path in paths]
+            paths_by_id = dict(zip(object_ids, paths))
+            return PARSED_ITEMS.fetch_objects(
+                namespace,
+                object_ids,
+                lambda object_ids: self._load_uncached(
+                    [paths_by_id[object_id] for object_id in object_ids]
+                ),
+            )
+        return PARSED_ITEMS.fetch_many(namespace, paths, self._load_uncached)
+
+    def _load_uncached(self, paths: Sequence[str]) -> List[Data]:
+        items = []
+        with PROFILER.stage("read", self.module_type):
+            for path in paths:
+                with self.open_source(path) as f:
+                    items.append(self.read(f))
+        with PROFILER.stage("parse", self.module_type):
+            return self.parse_many(items)
+
+    def preload(
+        self,
+        paths: Sequence[str],
+        *,
+        add_comment: bool = True,
+        manifest: Optional[Manifest] = None,
+    ) -> None:
+        """Load the files in ``paths`` that ``generate_outputs`` would render, at once
+
+        This batches the parsing of a directory's items, which would otherwise be
+        parsed one by one by the tasks rendering them.
+        """
+        stale = [
+            path
+            for path in paths
+            if any(
+                self.stale_reason(path, fmt, add_comment=add_comment, manifest=manifest)
+                for fmt in self.formatters
+            )
+        ]
+        if stale:
+            self.load_many(stale)
+
+    def open_source(self, path: str) -> IO[str]:
+        """Open a source file for reading, from ``tree`` if set"""
+        if self.tree is not None:
+            content = self.tree.read(path)
+            PROFILER.count_bytes(read=len(content))
+            return io.StringIO(content.decode("utf-8"))
+        f = open(path, encoding="utf-8")
+        PROFILER.count_bytes(read=os.fstat(f.fileno()).st_size)
+        return f
+
+    def list_sources(self, directory: str) -> List[str]:
+        """Paths of the source files in a directory, from ``tree`` if set"""
+        if self.tree is not None:
+            return self.tree.list_files(directory)
+        return list_files(directory)
+
+    def generate_file(
+        self, path, add_comment=True, manifest: Optional[Manifest] = None
+    ):
         """Generate single file"""
-        name = os.path.basename(path).rsplit(".")[0]
+        self.generate_outputs(path, add_comment=add_comment, manifest=manifest)
+
+    def generate_output(
+        self,
+        path: str,
+        fmt: str,
+        *,
+        add_comment: bool = True,
+        manifest: Optional[Manifest] = None,
+    ) -> None:
+        """Generate the output for a single file in a single format"""
+        self.generate_outputs(path, [fmt], add_comment=add_comment, manifest=manifest)
+
+    def generate_outputs(
+        self,
+        path: str,
+        formats: Optional[Iterable[str]] = None,
+        *,
+        add_comment: bool = True,
+        manifest: Optional[Manifest] = None,
+    ) -> None:
+        """Generate the outputs for a single file in several formats (default: all)
+
+        The file is loaded once and rendered in all formats in one pass, see
+        ``generate_many``. If a manifest is given, a format is skipped when neither
+        the source file nor its previously generated output have changed since the
+        last run.
+        """
+        formats = list(self.formatters if formats is None else formats)
+        entries: Dict[str, Tuple[str, str]] = {}
+        if manifest is not None:
+            for fmt in formats:
+                key, fingerprint = self.manifest_entry(
+                    path, fmt, add_comment=add_comment
+                )
+                if manifest.is_up_to_date(key, fingerprint):
+                    logger.debug("%s up to date: %s", self.__class__.__name__, key)
+                else:
+                    entries[fmt] = (key, fingerprint)
+            formats = list(entries)
+            if not formats:
+                return
+
+        name = self.output_name(path)
         logger.debug("%s processing %s (%s)", self.__class__.__name__, name, path)
-        with open(path, encoding="utf-8") as f:
-            data = self.parse(self.read(f))
-        for fmt in self.formatters:
-            tex = self.generate(data, fmt)
+        data = self.load(path)
+        with PROFILER.stage("generate", self.module_type):
+            outputs = self.generate_many([data], formats)
+        for fmt in formats:
+            tex = outputs[fmt][0]
             if add_comment:
-                tex = f"% generated by {__file__} at {datetime.datetime.now()}\n" + tex
-            self.save(tex, name=name, fmt=fmt)
+                tex = generated_header(__file__) + tex
+            with PROFILER.stage("save", self.module_type, fmt):
+                output = self.save(tex, name=name, fmt=fmt)
+            if manifest is not None:
+                manifest.record(*entries[fmt], [output])
+
+    def manifest_entry(
+        self, path: str, fmt: str, *, add_comment: bool = True
+    ) -> Tuple[str, str]:
+        """Key and fingerprint of the output for ``path`` in ``fmt`` in the manifest"""
+        step = f"{self.__class__.__qualname__}[{self.module_type}]"
+        key = f"{step}:{path}:{self.output_dir(fmt)}"
+        fingerprint = Manifest.fingerprint(
+            inputs=[path],
+            components=[*self.fingerprint_components(), fmt, str(add_comment)],
+        )
+        return key, fingerprint
+
+    def stale_reason(
+        self,
+        path: str,
+        fmt: str,
+        *,
+        add_comment: bool = True,
+        manifest: Optional[Manifest] = None,
+    ) -> Optional[str]:
+        """Why ``generate_output`` would regenerate its output, ``None`` if it won't"""
+        if manifest is None:
+            return "not incremental"
+        return manifest.stale_reason(
+            *self.manifest_entry(path, fmt, add_comment=add_comment)
+        )
 
     def generate_dir(self, source_dir: str, **kwargs) -> None:
         """Generate all files in a directory"""
-        for file_name in os.listdir(source_dir):
-            if os.path.isfile(path := os.path.join(source_dir, file_name)):
-                self.generate_file(path, **kwargs)
+        for path in self.list_sources(source_dir):
+            self.generate_file(path, **kwargs)
 
 
 class YamlTexModuleGenerator(FileToFileGenerator, metaclass=ABCMeta):
@@ -121,33 +394,84 @@ class YamlTexModuleGenerator(FileToFileGenerator, metaclass=ABCMeta):
         super().__init__(
             module_type=self.item_type, formatters=formatters, subdir=subdir
         )
+        self.templates: Dict[str, Template] = TEX_TEMPLATES[self.module_type]
+        self.record_type = record_type(
+            self.item_type,
+            DATE_FIELDS.union(
+                TEXT_FIELDS, *(t.item_fields for t in self.templates.values())
+            ),
+        )
+
+    @property
+    def templates(self) -> Dict[str, Template]:
+        return self._templates
+
+    @templates.setter
+    def templates(self, templates: Dict[str, Template]) -> None:
+        self._templates = templates
+        self.template_fields = {fmt: t.item_fields for fmt, t in templates.items()}
+        self.rendered_fields = frozenset().union(*self.template_fields.values())
 
     def read(self, source):
-        return yaml.full_load(source)
+        return YAML_LOADER.load(source.read())
+
+    def fingerprint_components(self) -> Tuple[str, ...]:
+        return super().fingerprint_components() + tuple(
+            f"{fmt}: {self.templates[fmt]!r}" for fmt in sorted(self.templates)
+        )
 
     def generate(self, parsed_data: Data, fmt: str) -> str:
         formatter = self.formatters[fmt]
-        template = TEX_TEMPLATES[self.module_type][fmt]
-        tex = template.fill(formatter(parsed_data))
+        template = self.templates[fmt]
+        with PROFILER.stage("format", self.module_type, fmt):
+            fields = formatter(parsed_data)
+        tex = template.fill(fields)
         return tex
 
     def parse(self, data: Data) -> Data:
-        parsed = data.copy()
-        fields = set(data.keys())
-        for date_field in DATE_FIELDS & fields:
-            parsed[date_field] = parse_date(data[date_field])
-        for text_field in TEXT_FIELDS & fields:
-            text = data[text_field]
-            parsed[text_field] = tokenize(text) if text else None
-        return parsed
+        return self.parse_many([data])[0]
+
+    def parse_many(self, items: Sequence[Data]) -> List[Data]:
+        """Parse several items, tokenizing all of their text fields in one pass"""
+        record_type = self.record_type
+        index = record_type._index
+        date_fields = [index[field] for field in sorted(DATE_FIELDS)]
+        text_fields = [index[field] for field in sorted(TEXT_FIELDS)]
+
+        split_items = []
+        texts = []  # (values of the item, field index, text)
+        for data in items:
+            values, extra = record_type.split(data)
+            for i in date_fields:
+                if isinstance(values[i], str):
+                    values[i] = parse_date(values[i])
+            for i in text_fields:
+                text = values[i]
+                if text is not MISSING:
+                    values[i] = None
+                    if text:
+                        texts.append((values, i, text))
+            split_items.append((values, extra))
+
+        tokenized = tokenize_many(text for _, _, text in texts)
+        for (values, i, _), tokens in zip(texts, tokenized):
+            values[i] = tokens
+        records = []
+        for values, extra in split_items:
+            record = record_type(tuple(values), extra)
+            record.date_key = date_sort_key(
+                record.get("end-date") or record.get("date")
+            )
+            records.append(record)
+        return records
 
     def format_base(self, parsed_data: Data) -> FormattedFields:
-        parsed_data = parsed_data.copy()
-        parsed_data.setdefault("comment", None)
         formatted = super().format_base(parsed_data)
-        # replace None with empty string:
-        for key, value in parsed_data.items():
-            if value is None:
+        if self.uses("comment"):
+            formatted.setdefault("comment", "")
+        # replace None with empty string, in the fields that are rendered:
+        for key in self.rendered_fields if self.template_fields else parsed_data:
+            if parsed_data.get(key, MISSING) is None:
                 formatted[key] = ""
         return formatted
 
@@ -157,7 +481,10 @@ def single_file_multiple_items(cls: Type[YamlTexModuleGenerator]):
     Decorate a one-item-per-file generator into a multiple-items-per-file generator
 
     The generated output consists of the concatenation of the generated output for
-    each individual item.
+    each individual item. If ``item_filter`` is set on an instance, only the items
+    for which it returns true are included (``item_filter_key`` identifies it in the
+    fingerprints); if ``item_query`` is set, the items are selected and ordered by
+    it, through an index of the file's items.
     """
 
     class DecoratedClass(YamlTexModuleGenerator):
@@ -165,10 +492,12 @@ def single_file_multiple_items(cls: Type[YamlTexModuleGenerator]):
 
         def __init__(self, *args, **kwargs):
             self.wrapped_generator = cls(*args, **kwargs)
+            self.item_filter: Optional[Callable[[Data], bool]] = None
+            self.item_filter_key: Optional[str] = None
+            self.item_query: Optional[ItemQuery] = None
+            self._index: Optional[Tuple[Data, ItemIndex]] = None
             formatters = {
-                fmt: lambda data: {
-                    ITEMS_FIELD: [formatter(item) for item in data[ITEMS_FIELD]]
-                }
+                fmt: functools.partial(self._format_items, fmt, formatter)
                 for fmt, formatter in self.wrapped_generator.formatters.items()
             }
             super().__init__(
@@ -176,13 +505,73 @@ def single_file_multiple_items(cls: Type[YamlTexModuleGenerator]):
                 subdir="",  # single file for all items
             )
 
-        def parse(self, data: Data) -> Data:
+        @YamlTexModuleGenerator.templates.setter
+        def templates(self, templates: Dict[str, Template]) -> None:
+            YamlTexModuleGenerator.templates.fset(self, templates)
+            # the items are formatted by the wrapped generator, for these templates
+            self.wrapped_generator.templates = templates
+
+        def _format_items(
+            self, fmt: str, formatter: Formatter, data: Data
+        ) -> FormattedFields:
             items = data[ITEMS_FIELD]
-            return {ITEMS_FIELD: [self.wrapped_generator.parse(item) for item in items]}
+            query = self.item_query
+            if query is not None:
+                selected = self.item_index(data).iter_select(
+                    query._replace(item_type=None, limit=None)
+                )
+                items = (item.data for item in selected)
+            if self.item_filter is not None:
+                items = filter(self.item_filter, items)
+            # only format the items the template shows
+            limit = getattr(self.templates[fmt], "max_items", None)
+            if query is not None and query.limit is not None:
+                limit = query.limit if limit is None else min(limit, query.limit)
+            if limit is not None:
+                items = itertools.islice(items, limit)
+            return {ITEMS_FIELD: [formatter(item) for item in items]}
+
+        def item_index(self, data: Data) -> ItemIndex:
+            """Index of the items of a parsed file, kept while the file is unchanged"""
+            cached = self._index
+            if cached is None or cached[0] is not data:
+                index = ItemIndex(
+                    IndexedItem(name, self.item_type, item, None)
+                    for name, item in multiple_item_names(data)
+                )
+                cached = self._index = (data, index)
+            return cached[1]
+
+        def shared_base(self):
+            # the items are formatted by the wrapped generator
+            return self.wrapped_generator.shared_base()
+
+        def parse_many(self, files: Sequence[Data]) -> List[Data]:
+            # the items of all the files are parsed in one batch
+            parsed = iter(
+                self.wrapped_generator.parse_many(
+                    [item for data in files for item in data[ITEMS_FIELD]]
+                )
+            )
+            return [
+                {ITEMS_FIELD: list(itertools.islice(parsed, len(data[ITEMS_FIELD])))}
+                for data in files
+            ]
 
         def generate_dir(self, source_dir: str, **kwargs) -> None:
             raise TypeError(f"{cls.__name__} is a single-file-multiple-items generator")
 
+        def fingerprint_components(self) -> Tuple[str, ...]:
+            components = (
+                super().fingerprint_components()
+                + self.wrapped_generator.fingerprint_components()
+            )
+            if self.item_filter is not None:
+                components += (f"filter: {self.item_filter_key}",)
+            if self.item_query is not None:
+                components += (repr(self.item_query),)
+            return components
+
     functools.update_wrapper(DecoratedClass, cls, updated=())
     return DecoratedClass
 
@@ -196,8 +585,8 @@ class ContactInfoGenerator(YamlTexModuleGenerator):
     def __init__(self):
         super().__init__(subdir="")
 
-    def parse(self, data: Data) -> Data:
-        return data
+    def parse_many(self, items: Sequence[Data]) -> List[Data]:
+        return list(items)
 
 
 @single_file_multiple_items
@@ -208,8 +597,8 @@ class SkillsGenerator(YamlTexModuleGenerator):
 class CompactSkillsGenerator(SkillsGenerator):
     item_type = "skill-compact"
 
-    def save(self, generated_tex: str, *, name: str, fmt: str):
-        super().save(generated_tex, name=f"{name}-compact", fmt=fmt)
+    def output_name(self, path: str) -> str:
+        return f"{super().output_name(path)}-compact"
 
 
 @single_file_multiple_items
@@ -222,6 +611,8 @@ class LanguagesGenerator(YamlTexModuleGenerator):
 
     def format_base(self, parsed_data: Data) -> FormattedFields:
         formatted = super().format_base(parsed_data)
+        if not self.uses("level"):
+            return formatted
 
         level = parsed_data["level"]
 
@@ -245,49 +636,55 @@ class EducationItemGenerator(YamlTexModuleGenerator):
     def format_base(self, parsed_data: Data) -> FormattedFields:
         formatted = super().format_base(parsed_data)
 
-        grade = parsed_data.get("grade")
-        formatted["grade"] = (
-            rf"\textit{{ {grade['type']}: {grade['value']} }}" if grade else ""
-        )
+        if self.uses("grade"):
+            grade = parsed_data.get("grade")
+            formatted["grade"] = (
+                rf"\textit{{ {grade['type']}: {grade['value']} }}" if grade else ""
+            )
 
         return formatted
 
     def format_fields_cv(self, data: Data) -> FormattedFields:
         formatted = super().format_fields_cv(data)
 
-        formatted["degree"] = format_optional(data["degree"])
+        if self.uses("degree", "cv"):
+            formatted["degree"] = format_optional(data["degree"])
 
-        comment = data["comment"]
-        formatted["comment"] = (
-            f"Expected graduation: {comment['expected-end-date']}"
-            if comment["expected-end-date"]
-            else comment["other"] or ""
-        )
+        if self.uses("comment", "cv"):
+            comment = data["comment"]
+            formatted["comment"] = (
+                f"Expected graduation: {comment['expected-end-date']}"
+                if comment["expected-end-date"]
+                else comment["other"] or ""
+            )
 
         return formatted
 
     def format_fields_resume(self, data: Data) -> FormattedFields:
         formatted = super().format_fields_resume(data)
 
-        formatted["degree"] = format_optional(data["degree"])
-
-        comment = data["comment"]
-        formatted["comment"] = (
-            f"(exp. {comment['expected-end-date']})"
-            if comment["expected-end-date"]
-            else f"({comment['other']})"
-            if comment["other"]
-            else ""
-        )
+        degree = format_optional(data["degree"])
+        if self.uses("degree", "resume"):
+            formatted["degree"] = degree
+
+        if self.uses("comment", "resume"):
+            comment = data["comment"]
+            formatted["comment"] = (
+                f"(exp. {comment['expected-end-date']})"
+                if comment["expected-end-date"]
+                else f"({comment['other']})"
+                if comment["other"]
+                else ""
+            )
 
-        institution = data["institution"]
-        formatted["institution"] = (
-            rf" \newline {institution}"
-            if len(formatted["degree"]) + len(formatted["title"]) + len(institution)
-            > 55
-            and len(institution) < 30
-            else institution
-        )
+        if self.uses("institution", "resume"):
+            institution = data["institution"]
+            formatted["institution"] = (
+                rf" \newline {institution}"
+                if len(degree) + len(formatted["title"]) + len(institution) > 55
+                and len(institution) < 30
+                else institution
+            )
 
         return formatted
 
@@ -298,7 +695,8 @@ class ExperienceItemGenerator(YamlTexModuleGenerator):
     def format_base(self, data: Data) -> FormattedFields:
         formatted = super().format_base(data)
 
-        formatted["comment"] = format_optional(data["comment"])
+        if self.uses("comment"):
+            formatted["comment"] = format_optional(data["comment"])
 
         return formatted
 
@@ -317,16 +715,18 @@ class ProjectItemGenerator(YamlTexModuleGenerator):
     def format_fields_cv(self, data: Data) -> FormattedFields:
         formatted = super().format_fields_cv(data)
 
-        link = data["link"]
-        formatted["link"] = rf"Link: \showlink{{{link}}}" if link else ""
+        if self.uses("link", "cv"):
+            link = data["link"]
+            formatted["link"] = rf"Link: \showlink{{{link}}}" if link else ""
 
         return formatted
 
     def format_fields_resume(self, data: Data) -> FormattedFields:
         formatted = super().format_fields_resume(data)
 
-        link = data["link"]
-        formatted["link"] = rf"\href{{{link}}}{{{link}}}" if link else ""
+        if self.uses("link", "resume"):
+            link = data["link"]
+            formatted["link"] = rf"\href{{{link}}}{{{link}}}" if link else ""
 
         return formatted
 
@@ -358,61 +758,343 @@ class TexIdentityGenerator(FileToFileGenerator):
 
 
 class AllItemsByDateGenerator:
-    """Generate a single .tex file with all individual items of a given type, sorted by date."""
+    """Generate a single .tex file with all individual items of a given type, sorted by date.
+
+    Items can be selected by name (the source file name without extension) with
+    ``item_filter``, and by tags, institutions, dates etc. with ``query``, through
+    an index of the items (see ``index.ItemIndex``). Items named in ``order`` come
+    first, in that order, followed by the rest sorted by date (or in the order of
+    the query); ``max_items`` caps the number of items per format.
+    """
 
-    def __init__(self, item_generator: YamlTexModuleGenerator):
+    output_name = "all-items"
+    item_separator = "\n\\medskip\n"
+
+    #: top-level date lines of a YAML item, for pre-scanning
+    DATE_LINE_PATTERN = re.compile(
+        r"^(?P<field>end-date|date):[ \t]*['\"]?(?P<value>[^'\"#\n]*?)['\"]?"
+        r"[ \t]*(?:#.*)?$",
+        re.MULTILINE,
+    )
+
+    def __init__(
+        self,
+        item_generator: YamlTexModuleGenerator,
+        *,
+        item_filter: Optional[Callable[[str], bool]] = None,
+        order: Sequence[str] = (),
+        max_items: Optional[Mapping[str, int]] = None,
+        query: Optional[ItemQuery] = None,
+        streaming_threshold: int = STREAMING_THRESHOLD,
+    ):
         self.item_generator = item_generator
+        self.item_filter = item_filter
+        self.order = tuple(order)
+        self.max_items = dict(max_items or {})
+        self.query = query
+        self.streaming_threshold = streaming_threshold
+        self._index: Optional[Tuple[List[Tuple[str, int]], ItemIndex]] = None
 
-    def generate_dir(self, source_dir: str, *, add_comment: bool = True) -> None:
+    def generate_dir(self, source_dir: str, **kwargs) -> None:
         """Generate the tex module for all items in the given directory."""
-        items = []
-        for file_name in os.listdir(source_dir):
-            if os.path.isfile(path := os.path.join(source_dir, file_name)):
-                name = os.path.basename(path).rsplit(".")[0]
-                logger.debug(
-                    "%s processing %s (%s)", self.__class__.__name__, name, path
+        self.generate_outputs(source_dir, **kwargs)
+
+    def item_paths(self, source_dir: str) -> List[str]:
+        """Source files of the items selected by ``item_filter``"""
+        paths = self.item_generator.list_sources(source_dir)
+        if self.item_filter is not None:
+            paths = [path for path in paths if self.item_filter(item_name(path))]
+        return paths
+
+    def item_date_key(self, name: str, item: Data) -> int:
+        key = getattr(item, "date_key", None)
+        if key is None:
+            key = date_sort_key(item.get("end-date") or item.get("date"))
+            if key is None:
+                raise ValueError(f"Item {name!r} has no valid end date")
+        return key
+
+    def scan_date_key(self, path: str) -> int:
+        """Sort key of an item's date, read from its source without parsing all of it
+
+        Only top-level ``end-date`` and ``date`` lines are looked at; an item whose
+        date can't be found that way is loaded in full.
+        """
+        with self.item_generator.open_source(path) as f:
+            dates = {
+                m["field"]: m["value"]
+                for m in self.DATE_LINE_PATTERN.finditer(f.read())
+            }
+        key = date_sort_key(dates.get("end-date") or dates.get("date"))
+        if key is None:
+            key = self.item_date_key(item_name(path), self.item_generator.load(path))
+        return key
+
+    def _sorted(
+        self, entries: Iterable[Tuple], date_key: Callable, limit: Optional[int] = None
+    ) -> List[Tuple]:
+        if limit is None:
+            return self._ordered(sorted(entries, key=date_key, reverse=True))
+        # top-k selection in O(n log k): the entries named in self.order (which
+        # come first anyway), then the most recent of the rest
+        positions = {name: i for i, name in enumerate(self.order)}
+        named, rest = [], []
+        for entry in entries:
+            (named if entry[0] in positions else rest).append(entry)
+        named.sort(key=lambda entry: positions[entry[0]])
+        # nlargest is stable, like sorted(..., reverse=True)
+        rest = heapq.nlargest(max(limit - len(named), 0), rest, key=date_key)
+        return (named + rest)[:limit]
+
+    def _ordered(self, entries: List[Tuple]) -> List[Tuple]:
+        """Move the entries named in ``self.order`` first, in that order"""
+        if self.order:
+            positions = {name: i for i, name in enumerate(self.order)}
+            entries.sort(key=lambda entry: positions.get(entry[0], len(positions)))
+        return entries
+
+    def item_index(self, items: List[Tuple[str, Data]]) -> ItemIndex:
+        """Index of (name, item) pairs, reused while the items are the same objects"""
+        # the index references the items, so their ids aren't reused while it's kept
+        key = [(name, id(item)) for name, item in items]
+        cached = self._index
+        if cached is None or cached[0] != key:
+            index = ItemIndex(
+                IndexedItem(
+                    name,
+                    self.item_generator.module_type,
+                    item,
+                    self.item_date_key(name, item),
                 )
-                with open(path, encoding="utf-8") as f:
-                    item = self.item_generator.parse(self.item_generator.read(f))
-                items.append(item)
-
-        def parse_date_for_comparison(date):
-            if date == "present":
-                return MonthDate(datetime.date.max.month, datetime.date.max.year)
-
-            if isinstance(date, str):
-                date = parse_date(date)
-            assert isinstance(
-                date, MonthDate
-            ), f"Unexpected date value: {date} ({type(date)})"
-            return date
-
-        items.sort(
-            key=lambda item: parse_date_for_comparison(
-                item.get("end-date") or item.get("date")
-            ),
-            reverse=True,
+                for name, item in items
+            )
+            cached = self._index = (key, index)
+        return cached[1]
+
+    def select_items(
+        self, items: List[Tuple[str, Data]], limit: Optional[int] = None
+    ) -> List[Tuple[str, Data]]:
+        """Select (name, item) pairs with ``self.query``, sorted like ``sort_items``
+
+        Items are ordered by the query (by descending date unless it says otherwise),
+        then by ``self.order``, and only the first ``limit`` are kept. Without a query,
+        a limit selects them with the top-k selection of ``sort_items``.
+        """
+        if self.query is None and limit is not None:
+            return self.sort_items(items, limit)
+        query = (self.query or ItemQuery())._replace(item_type=None)
+        if limit is not None and not self.order:
+            query = query._replace(limit=min(limit, query.limit or limit))
+        selected = self.item_index(items).select(query)
+        return self._ordered([(item.name, item.data) for item in selected])[:limit]
+
+    def sort_items(
+        self, items: List[Tuple[str, Data]], limit: Optional[int] = None
+    ) -> List[Tuple[str, Data]]:
+        """Sort (name, item) pairs by descending end date, then by ``self.order``
+
+        With a ``limit``, only the first ``limit`` pairs are selected, with a heap on
+        the items' precomputed date keys instead of a full sort.
+        """
+        return self._sorted(
+            items, lambda named_item: self.item_date_key(*named_item), limit
         )
 
-        tex = {fmt: [] for fmt in self.item_generator.formatters}
-        for item in items:
-            for fmt in self.item_generator.formatters:
-                tex[fmt].append(self.item_generator.generate(item, fmt))
-
-        tex = {fmt: "\n\\medskip\n".join(tex[fmt]) for fmt in tex}
-        if add_comment:
-            for fmt in tex:
-                tex[fmt] = (
-                    f"% generated by {__file__} at {datetime.datetime.now()}\n"
-                    + tex[fmt]
+    def sort_paths(
+        self, paths: Sequence[str], limit: Optional[int] = None
+    ) -> List[Tuple[str, str]]:
+        """Sorted index of (name, path) pairs, in the same order as ``sort_items``
+
+        The index is built from a date-only pre-scan of the source files.
+        """
+        keys = {path: self.scan_date_key(path) for path in paths}
+        return self._sorted(
+            ((item_name(path), path) for path in paths),
+            lambda entry: keys[entry[1]],
+            limit,
+        )
+
+    def limit(self, formats: Iterable[str]) -> Optional[int]:
+        """Number of items shown in the longest of ``formats``, ``None`` if uncapped"""
+        caps = [self.max_items.get(fmt) for fmt in formats]
+        return None if not caps or None in caps else max(caps)
+
+    def generate_output(
+        self,
+        source_dir: str,
+        fmt: str,
+        *,
+        add_comment: bool = True,
+        manifest: Optional[Manifest] = None,
+    ) -> None:
+        """Generate the tex module for all items in the given directory in one format."""
+        self.generate_outputs(
+            source_dir, [fmt], add_comment=add_comment, manifest=manifest
+        )
+
+    def generate_outputs(
+        self,
+        source_dir: str,
+        formats: Optional[Iterable[str]] = None,
+        *,
+        add_comment: bool = True,
+        manifest: Optional[Manifest] = None,
+    ) -> None:
+        """Generate the tex module for all items in a directory in several formats.
+
+        ``formats`` defaults to all of the item generator's formats.
+        If a manifest is given, a format is skipped when no item in the directory
+        has been added, removed or modified and its output is untouched. Directories
+        with at least ``streaming_threshold`` items are written item by item, one
+        format at a time, see ``stream_output``, unless a query selects the items;
+        otherwise all formats are rendered in one pass, see ``render_outputs``.
+        """
+        formats = list(self.item_generator.formatters if formats is None else formats)
+        paths = self.item_paths(source_dir)
+        entries: Dict[str, Tuple[str, str]] = {}
+        if manifest is not None:
+            for fmt in formats:
+                key, fingerprint = self.manifest_entry(
+                    source_dir, fmt, paths, add_comment=add_comment
+                )
+                if manifest.is_up_to_date(key, fingerprint):
+                    logger.debug("%s up to date: %s", self.__class__.__name__, key)
+                else:
+                    entries[fmt] = (key, fingerprint)
+            formats = list(entries)
+            if not formats:
+                return
+
+        if len(paths) >= self.streaming_threshold and self.query is None:
+            outputs = {
+                fmt: self.stream_output(paths, fmt, add_comment=add_comment)
+                for fmt in formats
+            }
+        else:
+            outputs = self.render_outputs(paths, formats, add_comment=add_comment)
+
+        if manifest is not None:
+            for fmt, output in outputs.items():
+                manifest.record(*entries[fmt], [output])
+
+    def manifest_entry(
+        self,
+        source_dir: str,
+        fmt: str,
+        paths: Sequence[str],
+        *,
+        add_comment: bool = True,
+    ) -> Tuple[str, str]:
+        """Key and fingerprint of the output for ``source_dir`` in the manifest"""
+        step = f"{self.__class__.__qualname__}[{self.item_generator.module_type}]"
+        key = f"{step}:{source_dir}:{self.item_generator.output_dir(fmt)}"
+        fingerprint = Manifest.fingerprint(
+            inputs=paths,
+            components=[
+                self.__class__.__qualname__,
+                *self.item_generator.fingerprint_components(),
+                fmt,
+                repr(self.order),
+                repr(self.max_items.get(fmt)),
+                *([repr(self.query)] if self.query is not None else []),
+                str(add_comment),
+            ],
+        )
+        return key, fingerprint
+
+    def stale_reason(
+        self,
+        source_dir: str,
+        fmt: str,
+        *,
+        add_comment: bool = True,
+        manifest: Optional[Manifest] = None,
+    ) -> Optional[str]:
+        """Why ``generate_output`` would regenerate its output, ``None`` if it won't"""
+        if manifest is None:
+            return "not incremental"
+        paths = self.item_paths(source_dir)
+        return manifest.stale_reason(
+            *self.manifest_entry(source_dir, fmt, paths, add_comment=add_comment)
+        )
+
+    def render_items(self, paths: Sequence[str], fmt: str) -> str:
+        """Render the items in ``paths``, sorted and capped, into a single string"""
+        return self.render_all(paths, [fmt])[fmt]
+
+    def render_all(
+        self, paths: Sequence[str], formats: Iterable[str]
+    ) -> Dict[str, str]:
+        """Render the items in ``paths``, sorted and capped, in each of ``formats``
+
+        Items are loaded and sorted once, and rendered in all formats in one pass.
+        """
+        names = [item_name(path) for path in paths]
+        for name, path in zip(names, paths):
+            logger.debug("%s processing %s (%s)", self.__class__.__name__, name, path)
+        items = list(zip(names, self.item_generator.load_many(paths)))
+
+        module_type = f"{self.item_generator.module_type} (all items)"
+        formats = list(formats)
+        with PROFILER.stage("sort", module_type):
+            items = self.select_items(items, self.limit(formats))
+
+        with PROFILER.stage("generate", module_type):
+            rendered = self.item_generator.generate_many(
+                (item for _, item in items), formats, self.max_items
+            )
+        return {fmt: self.item_separator.join(texts) for fmt, texts in rendered.items()}
+
+    def render_output(
+        self, paths: Sequence[str], fmt: str, *, add_comment: bool = True
+    ) -> str:
+        """Load all items, render the whole output in memory and save it"""
+        return self.render_outputs(paths, [fmt], add_comment=add_comment)[fmt]
+
+    def render_outputs(
+        self, paths: Sequence[str], formats: Iterable[str], *, add_comment: bool = True
+    ) -> Dict[str, str]:
+        """Render the whole output in each of ``formats`` in memory and save them"""
+        module_type = f"{self.item_generator.module_type} (all items)"
+        outputs = {}
+        for fmt, tex in self.render_all(paths, formats).items():
+            if add_comment:
+                tex = generated_header(__file__) + tex
+            with PROFILER.stage("save", module_type, fmt):
+                outputs[fmt] = save_tex(
+                    tex,
+                    type_name=f"{fmt} TeX",
+                    name=self.output_name,
+                    output_dir=self.item_generator.output_dir(fmt),
                 )
+        return outputs
 
-        for fmt in self.item_generator.formatters:
-            save_tex(
-                tex[fmt],
+    def stream_output(
+        self, paths: Sequence[str], fmt: str, *, add_comment: bool = True
+    ) -> str:
+        """Render and write items one at a time, in the order of a pre-scanned index
+
+        Only one item is held in memory at a time (besides the parsed items cache),
+        so memory use doesn't grow with the size of the directory.
+        """
+        module_type = f"{self.item_generator.module_type} (all items)"
+        with PROFILER.stage("sort", module_type, fmt):
+            index = self.sort_paths(paths, self.max_items.get(fmt))
+
+        def chunks() -> Iterator[str]:
+            if add_comment:
+                yield generated_header(__file__)
+            for i, (name, path) in enumerate(index):
+                logger.debug(
+                    "%s processing %s (%s)", self.__class__.__name__, name, path
+                )
+                tex = self.item_generator.generate(self.item_generator.load(path), fmt)
+                yield tex if i == 0 else self.item_separator + tex
+
+        with PROFILER.stage("stream", module_type, fmt):
+            return stream_tex(
+                chunks(),
                 type_name=f"{fmt} TeX",
-                name="all-items",
-                output_dir=os.path.join(
-                    ROOT_OUTPUT_PATH, fmt, self.item_generator.subdir
-                ),
+                name=self.output_name,
+                output_dir=self.item_generator.output_dir(fmt),
             )
@@ -0,0 +1,253 @@
+"""
+In-memory index of parsed items, for selecting items by query
+
+Items are indexed by type, by tag and by institution (inverted indexes from values
+to item ids), and ordered by date or by any numeric field such as the skills'
+``score``. Orders are sorted once, on first use, and kept, so a query such as "the
+5 most recent work items tagged python" walks a presorted list (narrowed down by
+bisection for date ranges) and stops at the 5th match, or sorts just the few items
+of its smallest inverted index. Items without a sort key (e.g. undated skills) come
+last, in the order of their sources.
+"""
+import bisect
+from collections import defaultdict
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from .config import INSTITUTION_FIELDS, ITEM_NAME_FIELDS, ITEMS_FIELD, TAGS_FIELD
+from .plan import BuildPlan
+from .utils import Data, date_sort_key, item_name, stable_repr
+
+#: order of queries by date, most recent first
+DATE = "date"
+
+
+def _normalize(value: Any) -> str:
+    return " ".join(str(value).split()).lower()
+
+
+def _values(value: Any) -> List[str]:
+    """Normalized tags or institution names in a field (a list or a string)"""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return [_normalize(v) for v in value if str(v).strip()]
+
+
+def item_date_key(item: Data) -> Optional[int]:
+    """Sort key of an item's (end) date, see ``utils.date_sort_key``"""
+    key = getattr(item, "date_key", None)
+    if key is None:
+        key = date_sort_key(item.get("end-date") or item.get("date"))
+    return key
+
+
+class IndexedItem(NamedTuple):
+    name: str
+    item_type: str
+    data: Data
+    date_key: Optional[int]
+
+
+class ItemQuery(NamedTuple):
+    """
+    A selection of items, most relevant first
+
+    Items must have all of ``tags``, and one of ``institutions`` if any are given.
+    ``since`` and ``until`` bound their date keys (inclusively), leaving out undated
+    items. They are ordered by descending date, or by the descending value of the
+    numeric field ``order_by``, followed by the items without one, and at most
+    ``limit`` of them are selected.
+    """
+
+    item_type: Optional[str] = None
+    tags: FrozenSet[str] = frozenset()
+    institutions: FrozenSet[str] = frozenset()
+    since: Optional[int] = None
+    until: Optional[int] = None
+    order_by: str = DATE
+    limit: Optional[int] = None
+
+    @classmethod
+    def from_data(cls, data: Data) -> "ItemQuery":
+        """Read a query from e.g. a variants file, with dates like ``June 2022``"""
+
+        def date(field: str) -> Optional[int]:
+            if data.get(field) is None:
+                return None
+            key = date_sort_key(str(data[field]))
+            if key is None:
+                raise ValueError(f"Invalid {field} date: {data[field]!r}")
+            return key
+
+        return cls(
+            item_type=data.get("type"),
+            tags=frozenset(_values(data.get("tags"))),
+            institutions=frozenset(_values(data.get("institutions"))),
+            since=date("since"),
+            until=date("until"),
+            order_by=data.get("order-by") or DATE,
+            limit=data.get("limit"),
+        )
+
+    def __repr__(self):
+        return stable_repr(self)
+
+
+class ItemIndex:
+    """Items indexed for ``select``; items are identified by their position"""
+
+    def __init__(self, items: Iterable[IndexedItem]):
+        self.items: List[IndexedItem] = list(items)
+        self._types: Dict[Optional[str], List[int]] = defaultdict(list)
+        self._tags: Dict[str, Set[int]] = defaultdict(set)
+        self._institutions: Dict[str, Set[int]] = defaultdict(set)
+        for i, item in enumerate(self.items):
+            self._types[None].append(i)
+            self._types[item.item_type].append(i)
+            for tag in _values(item.data.get(TAGS_FIELD)):
+                self._tags[tag].add(i)
+            for field in INSTITUTION_FIELDS:
+                for name in _values(item.data.get(field)):
+                    self._institutions[name].add(i)
+                    if "|" in name:  # e.g. "School of X | University of Y"
+                        for part in name.split("|"):
+                            self._institutions[part.strip()].add(i)
+        #: (ids by descending key then those without one, ascending negated keys,
+        #: rank of each id) of each (item type, order), sorted on first use
+        self._orders: Dict[Tuple, Tuple[List[int], List[Any], Dict[int, int]]] = {}
+
+    def key(self, i: int, order_by: str) -> Any:
+        """Sort key of item ``i`` in ``order_by``; ``None`` if it has none"""
+        item = self.items[i]
+        if order_by == DATE:
+            return item.date_key
+        value = item.data.get(order_by)
+        return value if isinstance(value, (int, float)) else None
+
+    def _order(self, item_type: Optional[str], order_by: str):
+        order = self._orders.get((item_type, order_by))
+        if order is None:
+            ids, unkeyed = [], []
+            for i in self._types.get(item_type, ()):
+                (unkeyed if self.key(i, order_by) is None else ids).append(i)
+            # stable, so that ties keep the order of the sources
+            ids.sort(key=lambda i: self.key(i, order_by), reverse=True)
+            negated = [-self.key(i, order_by) for i in ids]
+            ids += unkeyed
+            order = ids, negated, {i: rank for rank, i in enumerate(ids)}
+            self._orders[item_type, order_by] = order
+        return order
+
+    def _candidates(self, query: ItemQuery) -> Optional[Set[int]]:
+        """Ids allowed by the inverted indexes, or ``None`` if they don't restrict"""
+        candidates = None
+        for tag in query.tags:
+            ids = self._tags.get(tag, set())
+            candidates = ids if candidates is None else candidates & ids
+        if query.institutions:
+            ids = set().union(
+                *(self._institutions.get(name, ()) for name in query.institutions)
+            )
+            candidates = ids if candidates is None else candidates & ids
+        return candidates
+
+    def iter_select(self, query: ItemQuery) -> Iterator[IndexedItem]:
+        ids, negated, ranks = self._order(query.item_type, query.order_by)
+        start, stop = 0, len(ids)
+        dates = query.since is not None or query.until is not None
+        if dates and query.order_by == DATE:
+            stop = len(negated)  # undated items are out of any date range
+            if query.until is not None:
+                start = bisect.bisect_left(negated, -query.until)
+            if query.since is not None:
+                stop = bisect.bisect_right(negated, -query.since)
+            dates = False
+
+        candidates = self._candidates(query)
+        if candidates is not None and len(candidates) < stop - start:
+            # fewer candidates than items in range: sort them by rank instead
+            selected = sorted(
+                ranks[i] for i in candidates if start <= ranks.get(i, -1) < stop
+            )
+            matches = (ids[rank] for rank in selected)
+        else:
+            matches = (
+                ids[rank]
+                for rank in range(start, stop)
+                if candidates is None or ids[rank] in candidates
+            )
+
+        count = 0
+        for i in matches:
+            if query.limit is not None and count >= query.limit:
+                return
+            item = self.items[i]
+            if dates and not (
+                item.date_key is not None
+                and (query.since is None or item.date_key >= query.since)
+                and (query.until is None or item.date_key <= query.until)
+            ):
+                continue
+            count += 1
+            yield item
+
+    def select(self, query: ItemQuery) -> List[IndexedItem]:
+        """The items matching ``query``, in its order"""
+        return list(self.iter_select(query))
+
+    def __len__(self):
+        return len(self.items)
+
+
+def index_items(item_type: str, named_items: Sequence[Tuple[str, Data]]) -> ItemIndex:
+    """Index (name, item) pairs of a single type"""
+    return ItemIndex(
+        IndexedItem(name, item_type, item, item_date_key(item))
+        for name, item in named_items
+    )
+
+
+def multiple_item_names(data: Data) -> List[Tuple[str, Data]]:
+    """(name, item) pairs of a multiple-items-per-file source"""
+    return [
+        (next((str(item[f]) for f in ITEM_NAME_FIELDS if f in item), ""), item)
+        for item in data[ITEMS_FIELD]
+    ]
+
+
+def build_index(plan: BuildPlan) -> ItemIndex:
+    """Index every item of the sources of a build plan
+
+    Items come from the directories of items and the multiple-items-per-file
+    sources (e.g. ``skills.yaml``); each source is indexed once, with the type of
+    the first generator of the plan that renders it.
+    """
+    items: List[IndexedItem] = []
+    indexed = set()
+    for entry in plan.entries:
+        if entry.source in indexed:
+            continue
+        generator = entry.make_generator()
+        if entry.is_dir:
+            paths = generator.list_sources(entry.source)
+            named = list(zip(map(item_name, paths), generator.load_many(paths)))
+        elif hasattr(generator, "wrapped_generator"):
+            named = multiple_item_names(generator.load(entry.source))
+        else:
+            continue
+        indexed.add(entry.source)
+        items.extend(index_items(generator.module_type, named).items)
+    return ItemIndex(items)
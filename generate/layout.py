@@ -0,0 +1,379 @@
+"""
+Estimate the height of rendered items, and fit the items of a document to its pages
+
+Instead of compiling the document to find out whether it fits, the height of each
+item is predicted from its TeX: its text is laid out word by word in lines as wide
+as the boxes of the item's command (``\\twentyitem`` of ``resume.cls``,
+``\\cvchronoitem`` of ``cv.tex``), with average character widths per font, and the
+lines are counted at the baselines of the font sizes of those documents. Lengths
+come from the class and the documents; the character widths are chosen so that a
+title line breaks where ``EducationItemGenerator``'s 55-character rule expects it.
+Hyphenation is not simulated, so estimates err on the long side.
+
+``fit`` then chooses which items of each section, and which of their descriptions
+(``description`` or ``short-description``), fit on a number of pages.
+"""
+import functools
+import re
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from .config import WORD_WIDTH_CACHE_SIZE
+from .generators import YamlTexModuleGenerator
+from .plan import BuildPlan
+from .records import Overlay
+from .utils import item_name
+
+#: TeX points per centimetre and per inch
+CM = 72.27 / 2.54
+INCH = 72.27
+
+#: fields an item's description can be rendered from, shortest first
+DESCRIPTION_FIELDS = ("short-description", "description")
+
+#: widths of characters in em, by group; others are DEFAULT_CHAR_WIDTH
+CHAR_WIDTHS: Dict[str, float] = {
+    **dict.fromkeys("ijl.,:;!'|", 0.29),
+    **dict.fromkeys(" ", 0.32),
+    **dict.fromkeys('frt()[]/-"', 0.4),
+    **dict.fromkeys("0123456789", 0.64),
+    **dict.fromkeys("ABCDEFGHIJKLNOPQRSTUVXYZ", 0.75),
+    **dict.fromkeys("mw", 0.92),
+    **dict.fromkeys("MW", 1.0),
+}
+DEFAULT_CHAR_WIDTH = 0.6
+#: width of bold characters relative to regular ones
+BOLD_WIDTH = 1.05
+
+
+@functools.lru_cache(maxsize=WORD_WIDTH_CACHE_SIZE)
+def text_width(text: str) -> float:
+    """Width of ``text`` in em"""
+    return sum(CHAR_WIDTHS.get(c, DEFAULT_CHAR_WIDTH) for c in text)
+
+
+class Font(NamedTuple):
+    """A font size and its baseline skip, in pt"""
+
+    size: float
+    baseline: float
+    bold: bool = False
+
+    def width(self, text: str) -> float:
+        return self.size * (BOLD_WIDTH if self.bold else 1) * text_width(text)
+
+    def embolden(self) -> "Font":
+        return self._replace(bold=True)
+
+
+#: sizes of the 10pt (resume) and 11pt (cv) article classes
+NORMAL_10 = Font(10, 12)
+SMALL_10 = Font(9, 11)
+FOOTNOTE_10 = Font(8, 9.5)
+NORMAL_11 = Font(10.95, 13.6)
+SMALL_11 = Font(10, 12)
+
+
+def count_lines(runs: Iterable[Tuple[str, Font]], width: float) -> int:
+    """Lines taken by consecutive runs of text, set ragged right in a box ``width``
+    wide; newlines are forced line breaks"""
+    lines = 0
+    x = None  # width of the current line so far, None until a line is started
+    for text, font in runs:
+        space = font.width(" ")
+        for i, segment in enumerate(text.split("\n")):
+            if i > 0:
+                # the break starts a new line, which is typeset even if empty
+                lines, x = lines + 1, 0.0
+            for word in segment.split():
+                word_width = font.width(word)
+                if x is None or (x and x + space + word_width > width):
+                    lines, x = lines + 1, word_width
+                else:
+                    x += (space if x else 0.0) + word_width
+                # words longer than a line overflow onto the next ones
+                while x > width:
+                    lines, x = lines + 1, x - width
+    return lines
+
+
+_COMMENT = re.compile(r"(?<!\\)%.*")
+_HREF = re.compile(r"\\href\{[^{}]*\}\{([^{}]*)\}")
+_SHOWLINK = re.compile(r"\\showlink(?:\[[^\]]*\])?\{([^{}]*)\}")
+_PARAGRAPH = re.compile(r"\n\s*\n")
+_BREAK = re.compile(r"\\\\(?:\[[^\]]*\])?|\\newline\b")
+_ESCAPE = re.compile(r"\\([&%#$_{} ])")
+_COMMAND = re.compile(r"\\[a-zA-Z]+\*?|[{}$~]")
+#: what matters to brace matching: escaped characters and braces
+_BRACE = re.compile(r"\\.|[{}]", re.DOTALL)
+
+
+def tex_text(tex: str) -> str:
+    """The text ``tex`` typesets, roughly: commands dropped, line breaks as newlines"""
+    text = _COMMENT.sub("", tex)
+    text = _PARAGRAPH.sub(r" \\newline ", text).replace("\n", " ")
+    text = _HREF.sub(r"\1", text)
+    text = _SHOWLINK.sub(r"\1", text)
+    text = _BREAK.sub("\n", text)
+    text = _COMMAND.sub(lambda m: " " if m.group() == "~" else "", text)
+    text = _ESCAPE.sub(r"\1", text)
+    return text.replace("--", "\u2013")
+
+
+def command_arguments(tex: str, command: str) -> Optional[List[str]]:
+    """Mandatory arguments of the first ``\\command`` in ``tex``; ``None`` if absent
+
+    An optional ``[...]`` argument is skipped.
+    """
+    match = re.search(rf"\\{command}(?![a-zA-Z])", tex)
+    if match is None:
+        return None
+    args = []
+    i = match.end()
+    while True:
+        while i < len(tex) and tex[i].isspace():
+            i += 1
+        if i < len(tex) and tex[i] == "[" and not args:
+            i = tex.index("]", i) + 1
+            continue
+        if i >= len(tex) or tex[i] != "{":
+            return args
+        depth, start = 0, i
+        for brace in _BRACE.finditer(tex, i):
+            depth += {"{": 1, "}": -1}.get(brace.group(), 0)
+            if depth == 0:
+                i = brace.end()
+                break
+        else:
+            raise ValueError(f"Unbalanced braces in \\{command} of {tex!r}")
+        args.append(tex[start + 1 : i - 1])
+
+
+class DocumentLayout(NamedTuple):
+    """
+    How a document lays out the items of a format, in pt
+
+    ``measure`` estimates the height of an item from the text of the arguments of
+    its ``command``. Each section takes ``section_height`` besides its items, which
+    are ``item_separation`` apart.
+    """
+
+    command: str
+    page_height: float
+    section_height: float
+    item_separation: float
+    measure: Callable[[Sequence[str]], float]
+
+    def item_height(self, tex: str) -> float:
+        args = command_arguments(tex, self.command)
+        if args is None:
+            raise ValueError(f"No \\{self.command} in {tex!r}")
+        return self.measure([tex_text(arg).strip(" ") for arg in args])
+
+
+#: resume.cls: \twentyitem rows of a date column (\chronowidth in resume.tex) and a
+#: \parbox \twentylen (\itemwidth) wide
+TWENTY_DATE_WIDTH = 2.5 * CM
+TWENTY_ITEM_WIDTH = 10 * CM
+#: the \\[3pt] after the title line, and the \vspace{\parsep} after the body
+TWENTY_TITLE_SKIP = 3
+TWENTY_PARSEP = 4
+
+
+def measure_twentyitem(args: Sequence[str]) -> float:
+    """Height of ``\\twentyitem{date}{title}{place}{description}``"""
+    date, title, place, body = args[:4]
+    date_height = count_lines([(date, NORMAL_10)], TWENTY_DATE_WIDTH)
+    head = [(title, NORMAL_10.embolden())]
+    if place:
+        head += [(" \u2013 ", NORMAL_10), (place, FOOTNOTE_10)]
+    item_height = (
+        count_lines(head, TWENTY_ITEM_WIDTH) * NORMAL_10.baseline
+        + TWENTY_TITLE_SKIP
+        + count_lines([(body, SMALL_10)], TWENTY_ITEM_WIDTH) * SMALL_10.baseline
+        + TWENTY_PARSEP
+    )
+    return max(date_height * NORMAL_10.baseline, item_height)
+
+
+#: cv.tex: the right column of the two-column (paracol) sections, 0.8 of an A4 page
+#: with 1.5cm margins less the 10pt column separation
+CHRONO_WIDTH = 0.8 * (21 * CM - 2 * 1.5 * CM - 10)
+#: the \medskip after the dates line, and the \setstretch{0.9} of the description
+CHRONO_DATES_SKIP = 6
+CHRONO_STRETCH = 0.9
+
+
+def measure_cvchronoitem(args: Sequence[str]) -> float:
+    """Height of ``\\cvchronoitem{title}{place}{start}{end}{comment}{description}``"""
+    title, place, start, end, comment, body = args[:6]
+    head = [(title, NORMAL_11.embolden())]
+    if place:
+        head.append((f" \u2013 {place}", NORMAL_11))
+    dates = " ".join(
+        filter(None, (start, end and f"- {end}", comment and f"| {comment}"))
+    )
+    return (
+        count_lines(head, CHRONO_WIDTH) * NORMAL_11.baseline
+        + count_lines([(dates.upper(), SMALL_11)], CHRONO_WIDTH) * SMALL_11.baseline
+        + CHRONO_DATES_SKIP
+        + count_lines([(body, SMALL_11)], CHRONO_WIDTH)
+        * SMALL_11.baseline
+        * CHRONO_STRETCH
+    )
+
+
+#: \medskip, the separator of the aggregated items
+MEDSKIP = 6
+
+LAYOUTS: Dict[str, DocumentLayout] = {
+    # letter paper (the article default) with 0.1cm and 0.2cm vertical margins; a
+    # \section* (its 18pt \Large line, 3.5ex before and 2.3ex after) and the
+    # \parskip and \topsep around the twenty environment
+    "resume": DocumentLayout(
+        command="twentyitem",
+        page_height=11 * INCH - 0.3 * CM,
+        section_height=18 + 15 + 10 + 6 + 8,
+        item_separation=MEDSKIP,
+        measure=measure_twentyitem,
+    ),
+    # A4 with 1.5cm margins; the section rule, the 5pt after it and the \bigskip
+    # closing each two-column section
+    "cv": DocumentLayout(
+        command="cvchronoitem",
+        page_height=29.7 * CM - 2 * 1.5 * CM,
+        section_height=0.05 * CM + 5 + 12,
+        item_separation=MEDSKIP,
+        measure=measure_cvchronoitem,
+    ),
+}
+
+
+class ItemLayout(NamedTuple):
+    """An item of a section, with its estimated height by description field"""
+
+    section: str
+    name: str
+    heights: Dict[str, float]
+
+
+class Fit(NamedTuple):
+    """Items chosen to fit, with the description field each is rendered with"""
+
+    chosen: List[Tuple[ItemLayout, str]]
+    left_out: List[ItemLayout]
+    height: float
+    capacity: float
+
+
+def fit(
+    sections: Mapping[str, Sequence[ItemLayout]],
+    layout: DocumentLayout,
+    pages: int = 1,
+) -> Fit:
+    """
+    Choose the items of ``sections`` (each in order of relevance) to fit on ``pages``
+
+    Each section shows its first items: items are added with their shortest
+    description, the first item of every section, then the second of every section
+    and so on, as long as they fit; a section whose next item doesn't fit shows no
+    more. Then, in the same order, items are given their longest description where
+    the space left allows it.
+    """
+    capacity = pages * layout.page_height
+    height = 0.0
+    shown = {section: 0 for section in sections}
+    #: description field of each shown item, by (section, rank)
+    fields: Dict[Tuple[str, int], str] = {}
+    for rank in range(max(map(len, sections.values()), default=0)):
+        for section, items in sections.items():
+            if shown[section] != rank or rank >= len(items):
+                continue
+            heights = items[rank].heights
+            field = min(heights, key=heights.get)
+            extra = heights[field] + (
+                layout.section_height if rank == 0 else layout.item_separation
+            )
+            if height + extra <= capacity:
+                fields[section, rank] = field
+                shown[section] += 1
+                height += extra
+
+    # fields are in the order the items were added
+    for (section, rank), field in fields.items():
+        heights = sections[section][rank].heights
+        longest = max(heights, key=heights.get)
+        extra = heights[longest] - heights[field]
+        if extra > 0 and height + extra <= capacity:
+            fields[section, rank] = longest
+            height += extra
+
+    chosen = [
+        (items[rank], fields[section, rank])
+        for section, items in sections.items()
+        for rank in range(shown[section])
+    ]
+    left_out = [
+        item for section, items in sections.items() for item in items[shown[section] :]
+    ]
+    return Fit(chosen, left_out, height, capacity)
+
+
+def item_layouts(
+    generator: YamlTexModuleGenerator,
+    named_items: Iterable[Tuple[str, Mapping]],
+    fmt: str,
+    section: str,
+) -> List[ItemLayout]:
+    """Estimate the height of each (name, parsed item) rendered by ``generator``,
+    with each of its descriptions"""
+    layout = LAYOUTS[fmt]
+    formatter, template = generator.formatters[fmt], generator.templates[fmt]
+    layouts = []
+    for name, item in named_items:
+        fields = formatter(item)
+        heights = {}
+        for field in DESCRIPTION_FIELDS:
+            if field in fields:
+                body = fields[field]
+                tex = template.fill(
+                    Overlay(fields, dict.fromkeys(DESCRIPTION_FIELDS, body))
+                )
+                heights[field] = layout.item_height(tex)
+        if not heights:
+            heights[""] = layout.item_height(template.fill(fields))
+        layouts.append(ItemLayout(section, name, heights))
+    return layouts
+
+
+def plan_layouts(
+    plan: BuildPlan, fmt: str, sections: Optional[Sequence[str]] = None
+) -> Dict[str, List[ItemLayout]]:
+    """Item layouts of the aggregated directories of a build plan, by section name
+    (e.g. ``work-items``), with the items in the order of their aggregate"""
+    layouts = {}
+    known = {item_name(entry.source) for entry in plan.entries if entry.aggregates}
+    unknown = set(sections or ()) - known
+    if unknown:
+        raise ValueError(f"No aggregated sections {', '.join(sorted(unknown))}")
+    for entry in plan.entries:
+        section = item_name(entry.source)
+        if not entry.aggregates or (sections and section not in sections):
+            continue
+        generator = entry.make_generator()
+        aggregate = entry.make_aggregate(entry.aggregates[0], generator)
+        paths = aggregate.item_paths(entry.source)
+        named = list(zip(map(item_name, paths), generator.load_many(paths)))
+        layouts[section] = item_layouts(
+            generator, aggregate.select_items(named), fmt, section
+        )
+    return layouts
@@ -0,0 +1,97 @@
+import functools
+import hashlib
+import logging
+import os
+import pickle
+import threading
+from typing import Optional, Type
+
+from .utils import Data
+
+
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=None)
+def safe_loader() -> Type:
+    """The fastest safe YAML loader class available
+
+    PyYAML is only imported on first use, so runs that don't parse any YAML (e.g.
+    incremental runs with nothing to do) don't pay for importing it.
+    """
+    try:
+        from yaml import CSafeLoader as SafeLoader
+    except ImportError:  # PyYAML built without libyaml
+        from yaml import SafeLoader
+    return SafeLoader
+
+
+def parse_yaml(text: str) -> Data:
+    loader = safe_loader()(text)
+    try:
+        return loader.get_single_data()
+    finally:
+        loader.dispose()
+
+
+class YamlLoader:
+    """
+    Load YAML documents with the fastest available safe loader
+
+    Uses libyaml's ``CSafeLoader`` when PyYAML was built with it, and the pure Python
+    ``SafeLoader`` otherwise. If a cache directory is set, each loaded document is
+    also stored there in pickled form, keyed by a hash of its source text, and later
+    loads of the same text are served from the pickle instead of being re-parsed.
+    """
+
+    CACHE_FORMAT_VERSION = 1
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = cache_dir
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @property
+    def name(self) -> str:
+        return safe_loader().__name__
+
+    def load(self, text: str) -> Data:
+        if self.cache_dir is None:
+            return parse_yaml(text)
+
+        path = self._cache_path(text)
+        try:
+            with open(path, "rb") as f:
+                data = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            pass
+        else:
+            self.cache_hits += 1
+            return data
+
+        self.cache_misses += 1
+        data = parse_yaml(text)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+        return data
+
+    def _cache_path(self, text: str) -> str:
+        hasher = hashlib.sha256(f"{self.CACHE_FORMAT_VERSION}\0".encode("ascii"))
+        hasher.update(text.encode("utf-8"))
+        return os.path.join(self.cache_dir, f"{hasher.hexdigest()}.pickle")
+
+    def report(self) -> str:
+        message = f"YAML loader: {self.name}"
+        if self.cache_dir is not None:
+            message += (
+                f" (pre-serialized cache at {self.cache_dir}:"
+                f" {self.cache_hits} hits, {self.cache_misses} misses)"
+            )
+        return message
+
+
+#: loader shared by all YAML generators
+YAML_LOADER = YamlLoader()
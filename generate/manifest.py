@@ -0,0 +1,124 @@
+import functools
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from .config import FORMATS, MANIFEST_PATH
+
+
+logger = logging.getLogger(__name__)
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path: str) -> Optional[str]:
+    """Content hash of the file at ``path``, or ``None`` if it doesn't exist"""
+    try:
+        with open(path, "rb") as f:
+            return hash_bytes(f.read())
+    except FileNotFoundError:
+        return None
+
+
+@functools.lru_cache(maxsize=None)
+def code_hash(*paths: str) -> str:
+    """Hash of the source of this package and of the modules at ``paths``
+
+    Part of every fingerprint, so that upgrading the generators, templates,
+    tokenizer etc. rebuilds their outputs. Computed once per process.
+    """
+    package = os.path.dirname(os.path.abspath(__file__))
+    sources = sorted(
+        os.path.join(package, name)
+        for name in os.listdir(package)
+        if name.endswith(".py")
+    )
+    hasher = hashlib.sha256()
+    for path in [*sources, *sorted(set(paths) - set(sources))]:
+        hasher.update(path.encode("utf-8"))
+        hasher.update(b"\0")
+        hasher.update((hash_file(path) or "").encode("ascii"))
+    return hasher.hexdigest()
+
+
+class Manifest:
+    """
+    Record of what each generation step was last built from, for incremental runs
+
+    Each entry is keyed by a generation step (a generator applied to a source path)
+    and stores a fingerprint of everything the step's output depends on (input
+    content hashes, generator class and code, template identity, output formats)
+    together with the content hashes of the outputs it wrote. A step can be skipped
+    if its fingerprint is unchanged and its outputs are still on disk, untouched.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: str = MANIFEST_PATH):
+        self.path = path
+        self._entries: Dict[str, Dict] = self._load()
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                contents = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            logger.warning("Ignoring corrupt manifest at %s", self.path)
+            return {}
+        if contents.get("version") != self.VERSION:
+            return {}
+        return contents["entries"]
+
+    @staticmethod
+    def fingerprint(inputs: Iterable[str], components: Iterable[str]) -> str:
+        """Hash of the contents of ``inputs`` plus any other identifying strings"""
+        hasher = hashlib.sha256()
+        for part in [*components, *FORMATS]:
+            hasher.update(part.encode("utf-8"))
+            hasher.update(b"\0")
+        for path in inputs:
+            hasher.update(path.encode("utf-8"))
+            hasher.update(b"\0")
+            hasher.update((hash_file(path) or "").encode("ascii"))
+            hasher.update(b"\0")
+        return hasher.hexdigest()
+
+    def is_up_to_date(self, key: str, fingerprint: str) -> bool:
+        return self.stale_reason(key, fingerprint) is None
+
+    def stale_reason(self, key: str, fingerprint: str) -> Optional[str]:
+        """Why the step ``key`` must be run again, or ``None`` if it is up to date"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return "never built"
+        if entry["fingerprint"] != fingerprint:
+            return "sources, generator or options changed"
+        for path, digest in entry["outputs"].items():
+            current = hash_file(path)
+            if current != digest:
+                return f"output {'missing' if current is None else 'modified'}: {path}"
+        return None
+
+    def record(self, key: str, fingerprint: str, outputs: List[str]) -> None:
+        entry = {
+            "fingerprint": fingerprint,
+            "outputs": {path: hash_file(path) for path in outputs},
+        }
+        with self._lock:
+            self._entries[key] = entry
+
+    def save(self) -> None:
+        with self._lock:
+            contents = {"version": self.VERSION, "entries": self._entries}
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(contents, f, indent=1, sort_keys=True)
@@ -0,0 +1,146 @@
+import functools
+from typing import Callable, Dict, List, Optional, Sequence, TYPE_CHECKING
+
+from .cache import PARSED_ITEMS
+from .config import STREAMING_THRESHOLD
+from .generators import FileToFileGenerator, YamlTexModuleGenerator
+from .manifest import Manifest
+from .plan import BuildPlan, PlanEntry, load_plan
+from .scheduler import TaskGraph
+from .utils import item_name
+
+if TYPE_CHECKING:
+    from .branches import Branch
+    from .variants import Variant
+
+
+def build_graph(
+    add_comment: bool = True,
+    manifest: Optional[Manifest] = None,
+    *,
+    variant: Optional["Variant"] = None,
+    graph: Optional[TaskGraph] = None,
+    plan: Optional[BuildPlan] = None,
+    branch: Optional["Branch"] = None,
+) -> TaskGraph:
+    """
+    Compile a build plan into the graph of tasks that generate every module
+
+    There is one task per source file, rendering it in all output formats in one
+    pass. The items of a directory are first parsed in one batch by a task that all
+    of the directory's tasks depend on, unless there are too many of them to keep in
+    memory at once, and each aggregate output (e.g. "all items") depends on the
+    tasks of the individual items. The plan defaults to the one in
+    ``BUILD_PLAN_PATH``.
+
+    If a variant is given, its tasks render into the variant's output root with its
+    section options applied, and are added to ``graph`` if given. Likewise, if a
+    branch is given, its sources are read from its git tree and rendered into its
+    output root; sources the branch doesn't have are skipped.
+    """
+    if graph is None:
+        graph = TaskGraph()
+    if plan is None:
+        plan = load_plan()
+    options = dict(add_comment=add_comment, manifest=manifest)
+    prefix = next((f"{x.name}/" for x in (variant, branch) if x is not None), "")
+
+    def explain(stale_reason: Callable, source: str, formats: Sequence[str]):
+        """Why the task for ``source`` would run, grouping formats by reason"""
+        formats_by_reason: Dict[str, List[str]] = {}
+        for fmt in formats:
+            reason = stale_reason(source, fmt, **options)
+            if reason is not None:
+                formats_by_reason.setdefault(reason, []).append(fmt)
+        return (
+            "; ".join(
+                f"{reason} ({', '.join(reason_formats)})"
+                for reason, reason_formats in formats_by_reason.items()
+            )
+            or None
+        )
+
+    def add_file(generator: FileToFileGenerator, path: str) -> str:
+        if variant is not None:
+            variant.configure(generator, path)
+        return add_outputs(generator, path)
+
+    def add_outputs(
+        generator: FileToFileGenerator, path: str, dependencies: Sequence[str] = ()
+    ) -> str:
+        name = f"{prefix}{generator.__class__.__name__}[{generator.module_type}]"
+        return graph.add(
+            f"{name}:{path}",
+            functools.partial(generator.generate_outputs, path, **options),
+            dependencies=dependencies,
+            inputs=[path],
+            explain=functools.partial(
+                explain, generator.stale_reason, path, list(generator.formatters)
+            ),
+        )
+
+    def add_dir(generator: YamlTexModuleGenerator, entry: PlanEntry) -> None:
+        source_dir = entry.source
+        item_filter = None
+        if variant is not None:
+            variant.configure(generator, source_dir)
+            item_filter = variant.section(source_dir).selects
+        paths = [
+            path
+            for path in generator.list_sources(source_dir)
+            if item_filter is None or item_filter(item_name(path))
+        ]
+        preload: List[str] = []
+        # larger directories are streamed item by item, and would not even stay in
+        # the cache until their tasks run: their items are parsed one at a time
+        if len(paths) < min(STREAMING_THRESHOLD, PARSED_ITEMS.maxsize):
+            name = f"{prefix}{generator.__class__.__name__}[{generator.module_type}]"
+            preload.append(
+                graph.add(
+                    f"{name}:{source_dir}:parse",
+                    functools.partial(generator.preload, paths, **options),
+                    inputs=[source_dir],
+                    explain=lambda: None,  # writes nothing
+                )
+            )
+        item_tasks: List[str] = [
+            add_outputs(generator, path, preload) for path in paths
+        ]
+        for kind in entry.aggregates:
+            if variant is not None:
+                aggregate = variant.aggregate_generator(
+                    generator, source_dir, kind, entry.max_items
+                )
+            else:
+                aggregate = entry.make_aggregate(kind, generator)
+            name = f"{prefix}{aggregate.__class__.__name__}[{generator.module_type}]"
+            graph.add(
+                f"{name}:{source_dir}",
+                functools.partial(aggregate.generate_outputs, source_dir, **options),
+                dependencies=item_tasks,
+                inputs=[source_dir],
+                explain=functools.partial(
+                    explain,
+                    aggregate.stale_reason,
+                    source_dir,
+                    list(generator.formatters),
+                ),
+            )
+
+    for entry in plan.entries:
+        generator = entry.make_generator()
+        is_dir = entry.is_dir
+        if branch is not None:
+            if not branch.tree.exists(entry.source):
+                continue
+            generator.tree = branch.tree
+            generator.output_root = branch.output_root
+            is_dir = branch.tree.isdir(entry.source)
+        if is_dir:
+            add_dir(generator, entry)
+        elif entry.aggregates:
+            raise ValueError(f"{plan.path}: {entry.source} is not a directory")
+        else:
+            add_file(generator, entry.source)
+
+    return graph
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Mapping, NamedTuple, Optional, Tuple
+
+from .config import BUILD_PLAN_PATH, PLAN_CACHE_PATH
+from .loader import parse_yaml
+from .registry import AGGREGATES, GENERATORS
+from .templates import cap_templates
+from .utils import Data, per_format
+
+
+class PlanEntry(NamedTuple):
+    """
+    How one source under ``modules/`` is rendered
+
+    ``generator`` is the module type of the generator (see ``registry.GENERATORS``)
+    applied to the source, or to each file in it if it is a directory. ``subdir``
+    overrides the generator's output subdirectory, and ``aggregates`` lists the
+    aggregate outputs (see ``registry.AGGREGATES``) rendered from all the items of a
+    directory. ``max_items`` caps the number of items shown per format, by the
+    aggregates or in a multiple-items-per-file output.
+    """
+
+    source: str
+    generator: str
+    subdir: Optional[str] = None
+    aggregates: Tuple[str, ...] = ()
+    max_items: Mapping[str, int] = {}
+
+    @classmethod
+    def from_data(cls, data: Data) -> "PlanEntry":
+        unknown = set(data) - {field.replace("_", "-") for field in cls._fields}
+        if unknown:
+            raise ValueError(f"Unknown build plan keys: {', '.join(sorted(unknown))}")
+        aggregates = data.get("aggregates") or ()
+        if isinstance(aggregates, str):
+            aggregates = (aggregates,)
+        entry = cls(
+            source=os.path.normpath(data["source"]),
+            generator=data["generator"],
+            subdir=data.get("subdir"),
+            aggregates=tuple(aggregates),
+            max_items=per_format(data.get("max-items")),
+        )
+        if entry.generator not in GENERATORS:
+            raise ValueError(
+                f"Unknown generator {entry.generator!r} for {entry.source}; known: "
+                f"{', '.join(GENERATORS.module_types())}"
+            )
+        for aggregate in entry.aggregates:
+            if aggregate not in AGGREGATES:
+                raise ValueError(
+                    f"Unknown aggregate {aggregate!r} for {entry.source}; known: "
+                    f"{', '.join(AGGREGATES.module_types())}"
+                )
+        return entry
+
+    @property
+    def is_dir(self) -> bool:
+        """Whether the source is a one-item-per-file directory"""
+        return os.path.isdir(self.source)
+
+    def make_generator(self):
+        generator = GENERATORS.create(self.generator)
+        if self.subdir is not None:
+            generator.subdir = self.subdir
+        if self.max_items and hasattr(generator, "templates"):
+            generator.templates = cap_templates(generator.templates, self.max_items)
+        return generator
+
+    def make_aggregate(self, kind: str, item_generator):
+        """The aggregate generator ``kind`` of the items of this (directory) entry"""
+        return AGGREGATES.create(kind, item_generator, max_items=self.max_items)
+
+
+class BuildPlan(NamedTuple):
+    """The sources to render and how, in order, as read from a build plan file"""
+
+    path: str
+    entries: Tuple[PlanEntry, ...]
+
+    @classmethod
+    def from_data(cls, data: Data, path: str = BUILD_PLAN_PATH) -> "BuildPlan":
+        entries = []
+        for i, entry_data in enumerate(data.get("modules") or ()):
+            try:
+                entries.append(PlanEntry.from_data(entry_data))
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"{path}: invalid entry #{i + 1}: {e}") from e
+        return cls(path, tuple(entries))
+
+
+def parse_plan(text: str, cache_dir: Optional[str] = PLAN_CACHE_PATH) -> Data:
+    """
+    Parse the text of a build plan file
+
+    Parses are cached as JSON in ``cache_dir``, keyed by a hash of the text, so that
+    runs with nothing to do don't need to import PyYAML. Unlike the optional pickle
+    cache of ``loader.YamlLoader``, reading the cache can't run arbitrary code.
+    """
+    if cache_dir is None:
+        return parse_yaml(text)
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    path = os.path.join(cache_dir, f"{digest}.json")
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    data = parse_yaml(text)
+    try:
+        serialized = json.dumps(data)
+    except (TypeError, ValueError):  # e.g. dates, which JSON can't represent
+        return data
+    os.makedirs(cache_dir, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(serialized)
+    os.replace(temp_path, path)
+    return data
+
+
+_plans: Dict[str, Tuple[Tuple[int, int], BuildPlan]] = {}
+
+
+def load_plan(path: str = BUILD_PLAN_PATH) -> BuildPlan:
+    """Read a build plan file, reusing the previous result while it is unchanged"""
+    path = os.path.abspath(path)
+    with open(path, encoding="utf-8") as f:
+        st = os.fstat(f.fileno())
+        stamp = (st.st_mtime_ns, st.st_size)
+        if path in _plans and _plans[path][0] == stamp:
+            return _plans[path][1]
+        plan = BuildPlan.from_data(parse_plan(f.read()) or {}, path)
+    _plans[path] = (stamp, plan)
+    return plan
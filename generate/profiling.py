@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Tuple
+
+#: (module type, stage, output format or "")
+StageKey = Tuple[str, str, str]
+
+
+class StageStats:
+    __slots__ = ("calls", "seconds", "bytes_read", "bytes_written")
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+
+class _Stage:
+    __slots__ = ("profiler", "key", "start", "previous")
+
+    def __init__(self, profiler: "Profiler", key: StageKey):
+        self.profiler = profiler
+        self.key = key
+
+    def __enter__(self):
+        local = self.profiler._local
+        self.previous = getattr(local, "key", None)
+        local.key = self.key
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        self.profiler._local.key = self.previous
+        with self.profiler._lock:
+            stats = self.profiler.stats[self.key]
+            stats.calls += 1
+            stats.seconds += elapsed
+
+
+class Profiler:
+    """
+    Per-stage timing and I/O accounting for the generators
+
+    Generators wrap each stage (read, parse, format, generate, sort, save) in
+    ``stage(...)``; I/O code reports the bytes it reads or writes with
+    ``count_bytes``, which are attributed to the innermost stage running on the
+    current thread. Stage times are inclusive of nested stages (e.g. "generate"
+    includes "format"). While disabled, ``stage`` is a no-op.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.stats: Dict[StageKey, StageStats] = defaultdict(StageStats)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    _NO_OP = nullcontext()
+
+    def stage(self, stage: str, module_type: str, fmt: Optional[str] = None):
+        if not self.enabled:
+            return self._NO_OP
+        return _Stage(self, (module_type, stage, fmt or ""))
+
+    def count_bytes(self, read: int = 0, written: int = 0) -> None:
+        if not self.enabled or (key := getattr(self._local, "key", None)) is None:
+            return
+        with self._lock:
+            stats = self.stats[key]
+            stats.bytes_read += read
+            stats.bytes_written += written
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stats.clear()
+
+    def to_json(self) -> List[Dict]:
+        return [
+            {
+                "module_type": module_type,
+                "stage": stage,
+                "format": fmt or None,
+                "calls": stats.calls,
+                "seconds": stats.seconds,
+                "bytes_read": stats.bytes_read,
+                "bytes_written": stats.bytes_written,
+            }
+            for (module_type, stage, fmt), stats in sorted(self.stats.items())
+        ]
+
+    def format_table(self) -> str:
+        header = ("module type", "stage", "format", "calls", "ms", "read", "written")
+        rows = [header] + [
+            (
+                row["module_type"],
+                row["stage"],
+                row["format"] or "",
+                str(row["calls"]),
+                f"{row['seconds'] * 1000:.2f}",
+                str(row["bytes_read"]),
+                str(row["bytes_written"]),
+            )
+            for row in self.to_json()
+        ]
+        widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+        lines = [
+            "  ".join(
+                cell.ljust(width) if i < 3 else cell.rjust(width)
+                for i, (cell, width) in enumerate(zip(row, widths))
+            )
+            for row in rows
+        ]
+        lines.insert(1, "  ".join("-" * width for width in widths))
+        return "\n".join(lines)
+
+
+#: profiler shared by all generators
+PROFILER = Profiler()
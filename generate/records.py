@@ -0,0 +1,144 @@
+from collections.abc import Mapping, MutableMapping
+from typing import Any, ClassVar, Dict, Iterable, Iterator, List, Optional, Tuple, Type
+
+#: value of a declared field that is absent from an item
+MISSING = object()
+
+
+class Record(Mapping):
+    """
+    Immutable, slotted mapping of an item's parsed fields
+
+    Each item type gets its own subclass (see ``record_type``), declaring the fields
+    its templates use. Their values are stored in a single tuple, in declaration
+    order; fields an item has beyond those are kept in a small dict. Records behave
+    as read-only dicts, so they can be shared between threads, caches and variants.
+    The sort key of the item's date is computed once, when the item is parsed.
+    """
+
+    __slots__ = ("_values", "_extra", "date_key")
+
+    fields: ClassVar[Tuple[str, ...]] = ()
+    _index: ClassVar[Dict[str, int]] = {}
+
+    def __init__(
+        self,
+        values: Tuple[Any, ...],
+        extra: Optional[Dict[str, Any]] = None,
+        date_key: Optional[int] = None,
+    ):
+        self._values = values
+        self._extra = extra
+        #: integer sort key of the item's date (see ``utils.date_sort_key``)
+        self.date_key = date_key
+
+    @classmethod
+    def split(cls, data: Mapping) -> Tuple[List[Any], Optional[Dict[str, Any]]]:
+        """Split a raw item into its (mutable) declared values and extra fields"""
+        values = [data.get(field, MISSING) for field in cls.fields]
+        extra = {key: value for key, value in data.items() if key not in cls._index}
+        return values, extra or None
+
+    @classmethod
+    def from_mapping(cls, data: Mapping) -> "Record":
+        values, extra = cls.split(data)
+        return cls(tuple(values), extra)
+
+    def __getitem__(self, key: str) -> Any:
+        index = self._index.get(key)
+        if index is not None:
+            value = self._values[index]
+            if value is not MISSING:
+                return value
+        elif self._extra is not None:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __contains__(self, key) -> bool:
+        index = self._index.get(key)
+        if index is not None:
+            return self._values[index] is not MISSING
+        return self._extra is not None and key in self._extra
+
+    def __iter__(self) -> Iterator[str]:
+        for field, value in zip(self.fields, self._values):
+            if value is not MISSING:
+                yield field
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return sum(value is not MISSING for value in self._values) + len(
+            self._extra or ()
+        )
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({dict(self)!r})"
+
+
+#: record classes by item type
+RECORD_TYPES: Dict[str, Type[Record]] = {}
+
+
+def record_type(item_type: str, fields: Iterable[str]) -> Type[Record]:
+    """The record class for items of ``item_type``, declaring ``fields``"""
+    fields = tuple(sorted(set(fields)))
+    cls = RECORD_TYPES.get(item_type)
+    if cls is None or cls.fields != fields:
+        name = "".join(part.title() for part in item_type.split("-")) + "Record"
+        cls = type(
+            name,
+            (Record,),
+            {
+                "__slots__": (),
+                "__module__": __name__,
+                "fields": fields,
+                "_index": {field: i for i, field in enumerate(fields)},
+            },
+        )
+        RECORD_TYPES[item_type] = cls
+    return cls
+
+
+class Overlay(MutableMapping):
+    """
+    Writable view of a mapping that leaves the mapping itself untouched
+
+    Assignments are stored in a small dict of changes that shadows the base mapping,
+    so formatting an item only allocates the fields it actually rewrites.
+    """
+
+    __slots__ = ("base", "changes")
+
+    def __init__(self, base: Mapping, changes: Optional[Dict[str, Any]] = None):
+        self.base = base
+        self.changes = {} if changes is None else changes
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return self.changes[key]
+        except KeyError:
+            return self.base[key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.changes[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key in self.base:
+            raise TypeError(f"Cannot delete field {key!r} of the underlying item")
+        del self.changes[key]
+
+    def __contains__(self, key) -> bool:
+        return key in self.changes or key in self.base
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.base
+        for key in self.changes:
+            if key not in self.base:
+                yield key
+
+    def __len__(self) -> int:
+        return len(self.base) + sum(key not in self.base for key in self.changes)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({dict(self)!r})"
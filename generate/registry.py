@@ -0,0 +1,75 @@
+"""
+Generators by module type, resolved lazily
+
+Generators are registered with a ``"module:attribute"`` reference instead of the
+class itself, so that looking up or listing module types doesn't import the
+generators (and the templates and YAML machinery they pull in) until a generator
+is actually instantiated.
+"""
+import functools
+import importlib
+import threading
+from typing import Any, Callable, Dict, List, Tuple
+
+
+class GeneratorRegistry:
+    def __init__(self):
+        self._references: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        self._factories: Dict[str, Callable[..., Any]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, module_type: str, reference: str, /, **kwargs) -> None:
+        """Register the generator of ``module_type``
+
+        ``reference`` names its class (or any factory) as ``"module:attribute"``,
+        with the module relative to this package if it starts with a dot; ``kwargs``
+        are passed to it on instantiation.
+        """
+        with self._lock:
+            self._references[module_type] = (reference, kwargs)
+            self._factories.pop(module_type, None)
+
+    def factory(self, module_type: str) -> Callable[..., Any]:
+        """Callable creating generators of ``module_type``, importing it if needed"""
+        with self._lock:
+            factory = self._factories.get(module_type)
+            if factory is None:
+                reference, kwargs = self._references[module_type]
+                module_name, _, attribute = reference.partition(":")
+                module = importlib.import_module(module_name, __package__)
+                factory = functools.partial(getattr(module, attribute), **kwargs)
+                self._factories[module_type] = factory
+            return factory
+
+    def create(self, module_type: str, *args, **kwargs) -> Any:
+        return self.factory(module_type)(*args, **kwargs)
+
+    def module_types(self) -> List[str]:
+        return list(self._references)
+
+    def __contains__(self, module_type: str) -> bool:
+        return module_type in self._references
+
+
+#: generators of every module type the pipeline knows about
+GENERATORS = GeneratorRegistry()
+
+GENERATORS.register(
+    "toplevel", ".generators:TexIdentityGenerator", module_type="toplevel", subdir=""
+)
+GENERATORS.register("contact-info", ".generators:ContactInfoGenerator")
+GENERATORS.register("skill", ".generators:SkillsGenerator")
+GENERATORS.register("skill-compact", ".generators:CompactSkillsGenerator")
+GENERATORS.register("language", ".generators:LanguagesGenerator")
+GENERATORS.register("education", ".generators:EducationItemGenerator")
+GENERATORS.register("work", ".generators:WorkItemGenerator")
+GENERATORS.register("experience", ".generators:ExperienceItemGenerator")
+GENERATORS.register("course", ".generators:CourseItemGenerator")
+GENERATORS.register("project", ".generators:ProjectItemGenerator")
+GENERATORS.register("award", ".generators:AwardItemGenerator")
+
+#: generators of outputs combining all the items of a directory, created with the
+#: items' generator
+AGGREGATES = GeneratorRegistry()
+
+AGGREGATES.register("all-items-by-date", ".generators:AllItemsByDateGenerator")
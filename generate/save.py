@@ -1,32 +1,159 @@
+import datetime
+import hashlib
 import logging
 import os
-from typing import Callable, Sequence
+import threading
+from typing import Callable, IO, Iterable, Optional, Sequence, Tuple
 
 from .config import ROOT_OUTPUT_PATH
+from .profiling import PROFILER
 
 
 logger = logging.getLogger(__name__)
 
+GENERATED_HEADER_PREFIX = "% generated by "
+
+_known_output_dirs = set()
+
 
 def ensure_output_dir(path=ROOT_OUTPUT_PATH):
     path = os.path.normpath(path)  # avoid empty path at the end (foo/bar/)
-    if not os.path.exists(path):
-        ensure_output_dir(os.path.dirname(path))
-        os.mkdir(path)
-    elif not os.path.isdir(path):
+    if path in _known_output_dirs:
+        return path
+    if os.path.exists(path) and not os.path.isdir(path):
         raise IOError("Output path {} already exists and is a file".format(path))
+    os.makedirs(path, exist_ok=True)
+    _known_output_dirs.add(path)
     return path
 
 
+def generated_header(source: str) -> str:
+    """Comment line stating which file generated an output, and when"""
+    return f"{GENERATED_HEADER_PREFIX}{source} at {datetime.datetime.now()}\n"
+
+
+def strip_generated_header(text: str) -> str:
+    if text.startswith(GENERATED_HEADER_PREFIX):
+        return text.partition("\n")[2]
+    return text
+
+
+def _temp_path(path: str) -> str:
+    """Temporary file next to ``path``, unique to the calling thread
+
+    It is created with a plain ``open`` so that it gets the same permissions as any
+    other new file, and then replaces ``path``.
+    """
+    directory, filename = os.path.split(path)
+    return os.path.join(
+        directory, f".{filename}.{os.getpid()}-{threading.get_ident()}.tmp"
+    )
+
+
+def _open_temp(path: str) -> Tuple[str, IO[str]]:
+    """Create the temporary file for ``path``, see ``_temp_path``
+
+    If the output directory has been removed since ``ensure_output_dir`` created it
+    (e.g. by cleaning ``generated/`` under a long-running ``--watch`` or ``serve``),
+    it is created again.
+    """
+    temp_path = _temp_path(path)
+    try:
+        return temp_path, open(temp_path, "w", encoding="utf-8", newline="")
+    except FileNotFoundError:
+        directory = os.path.normpath(os.path.dirname(path))
+        _known_output_dirs.discard(directory)
+        ensure_output_dir(directory)
+        return temp_path, open(temp_path, "w", encoding="utf-8", newline="")
+
+
+def write_if_changed(path: str, text: str) -> bool:
+    """
+    Atomically write ``text`` to ``path`` unless it already has the same contents
+
+    The "generated by ... at ..." header line is ignored in the comparison, so that
+    regenerating an unchanged output leaves the file (and its mtime) alone. Writes
+    go to a temporary file in the same directory, which then replaces ``path``.
+    Returns whether the file was written.
+    """
+    try:
+        with open(path, encoding="utf-8", newline="") as f:
+            existing: Optional[str] = f.read()
+    except (FileNotFoundError, UnicodeDecodeError):
+        existing = None
+    if existing is not None:
+        PROFILER.count_bytes(read=len(existing.encode("utf-8")))
+        if strip_generated_header(existing) == strip_generated_header(text):
+            return False
+
+    temp_path, f = _open_temp(path)
+    try:
+        with f:
+            f.write(text)
+            PROFILER.count_bytes(written=f.tell())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return True
+
+
+def _body_digest(path: str, count_read: bool = False) -> Optional[bytes]:
+    """Hash of a file's contents after the generated header, or ``None`` if missing"""
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            first_line = f.readline()
+            if not first_line.startswith(GENERATED_HEADER_PREFIX.encode("utf-8")):
+                digest.update(first_line)
+            for block in iter(lambda: f.read(1 << 16), b""):
+                digest.update(block)
+            if count_read:
+                PROFILER.count_bytes(read=f.tell())
+    except FileNotFoundError:
+        return None
+    return digest.digest()
+
+
+def stream_if_changed(path: str, chunks: Iterable[str]) -> bool:
+    """
+    Atomically write the concatenation of ``chunks`` to ``path`` unless unchanged
+
+    Unlike ``write_if_changed``, the text is never held in memory as a whole: each
+    chunk is written to the temporary file as soon as it is produced, and the result
+    is compared with the existing file by hash, again ignoring the header line.
+    Returns whether the file was written.
+    """
+    temp_path, f = _open_temp(path)
+    try:
+        with f:
+            for chunk in chunks:
+                f.write(chunk)
+            PROFILER.count_bytes(written=f.tell())
+        unchanged = _body_digest(temp_path) == _body_digest(path, count_read=True)
+        if not unchanged:
+            os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    if unchanged:
+        os.unlink(temp_path)
+    return not unchanged
+
+
 def save_output(
-    save_func: Callable[[str], None],
+    save_func: Callable[[str], Optional[bool]],
     output_dir: str,
     output_name: str,
     identifiers: Sequence[str],
     file_extension: str,
     include_output_name: bool = False,
-) -> None:
-    """Greatest common denominator for output saving functions"""
+) -> str:
+    """Greatest common denominator for output saving functions
+
+    ``save_func`` may return ``False`` to signal that the output was already up to
+    date and nothing was written.
+    """
     components = list(identifiers)
     if include_output_name:
         components.insert(0, output_name)
@@ -35,25 +162,38 @@ def save_output(
     filename = "{}.{}".format(name, file_extension)
     path = os.path.join(output_dir, filename)
 
-    message = " ".join(
-        [
-            "Saving {}".format(output_name),
-            "for {}".format(", ".join(identifiers)) if identifiers else "",
-            "to {}".format(path),
-        ]
-    )
-    logger.info(message)
     ensure_output_dir(output_dir)
-    save_func(path)
+    written = save_func(path) is not False
 
+    level = logging.INFO if written else logging.DEBUG
+    if logger.isEnabledFor(level):
+        message = " ".join(
+            [
+                "{} {}".format("Saved" if written else "Unchanged", output_name),
+                "for {}".format(", ".join(identifiers)) if identifiers else "",
+                "at {}".format(path),
+            ]
+        )
+        logger.log(level, message)
+    return path
+
+
+def save_tex(tex: str, type_name: str, name: str, output_dir=ROOT_OUTPUT_PATH) -> str:
+    return save_output(
+        lambda path: write_if_changed(path, tex),
+        output_dir=output_dir,
+        output_name=type_name,
+        identifiers=(name,),
+        file_extension=".tex",
+    )
 
-def save_tex(tex: str, type_name: str, name: str, output_dir=ROOT_OUTPUT_PATH):
-    def save_func(path):
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(tex)
 
-    save_output(
-        save_func,
+def stream_tex(
+    chunks: Iterable[str], type_name: str, name: str, output_dir=ROOT_OUTPUT_PATH
+) -> str:
+    """Like ``save_tex``, for a document produced piece by piece"""
+    return save_output(
+        lambda path: stream_if_changed(path, chunks),
         output_dir=output_dir,
         output_name=type_name,
         identifiers=(name,),
@@ -0,0 +1,138 @@
+import logging
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+class Task(NamedTuple):
+    key: str
+    func: Callable[[], Any]
+    dependencies: Tuple[str, ...] = ()
+    inputs: Tuple[str, ...] = ()  # source files or directories the task reads
+    #: why running the task would do anything, or ``None`` if it would be a no-op
+    explain: Optional[Callable[[], Optional[str]]] = None
+
+
+class TaskGraph:
+    """
+    Dependency graph of generation tasks
+
+    Tasks are identified by a unique key and may only depend on tasks that have
+    already been added, so insertion order is always a valid execution order. Each
+    task is run exactly once, after all of its dependencies have completed.
+    """
+
+    def __init__(self):
+        self.tasks: Dict[str, Task] = {}
+
+    def add(
+        self,
+        key: str,
+        func: Callable[[], Any],
+        dependencies: Iterable[str] = (),
+        inputs: Iterable[str] = (),
+        explain: Optional[Callable[[], Optional[str]]] = None,
+    ) -> str:
+        if key in self.tasks:
+            raise ValueError(f"Duplicate task: {key}")
+        dependencies = tuple(dependencies)
+        for dependency in dependencies:
+            if dependency not in self.tasks:
+                raise ValueError(f"Task {key} depends on unknown task {dependency}")
+        inputs = tuple(os.path.abspath(path) for path in inputs)
+        self.tasks[key] = Task(key, func, dependencies, inputs, explain)
+        return key
+
+    def affected_by(self, changed_paths: Iterable[str]) -> "TaskGraph":
+        """
+        The subgraph of tasks that read any of the given paths
+
+        A task whose input is a directory is affected by changes to any path in it
+        (e.g. items being added or removed). Dependencies on tasks that aren't
+        affected are dropped, since their outputs are already up to date.
+        """
+        changed = {os.path.abspath(path) for path in changed_paths}
+        changed_dirs = {os.path.dirname(path) for path in changed}
+        subgraph = TaskGraph()
+        for task in self.tasks.values():
+            if any(path in changed or path in changed_dirs for path in task.inputs):
+                subgraph.tasks[task.key] = task._replace(
+                    dependencies=tuple(
+                        key for key in task.dependencies if key in subgraph.tasks
+                    )
+                )
+        return subgraph
+
+    def explain(self) -> List[Tuple[Task, str]]:
+        """
+        The tasks that would do something if the graph was run, and why
+
+        Nothing is run: tasks are asked to explain themselves in insertion order.
+        Tasks that can't explain themselves are assumed to always do something.
+        """
+        stale = []
+        for task in self.tasks.values():
+            reason = task.explain() if task.explain is not None else "always runs"
+            if reason is not None:
+                stale.append((task, reason))
+        return stale
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def __iter__(self):
+        return iter(self.tasks.values())
+
+    def run(self, jobs: int = 1) -> None:
+        """
+        Run all tasks, using up to ``jobs`` worker threads
+
+        With a single job, tasks run sequentially in insertion order. Otherwise,
+        each task is submitted to the pool as soon as its dependencies are done. The
+        workers are threads, so they only overlap I/O: parsing and rendering are
+        serialized by the GIL.
+        The first failure stops the scheduling of new tasks and is re-raised once
+        the running ones have finished.
+        """
+        if jobs <= 1:
+            for task in self.tasks.values():
+                task.func()
+            return
+
+        remaining = {key: len(task.dependencies) for key, task in self.tasks.items()}
+        dependents: Dict[str, List[str]] = {key: [] for key in self.tasks}
+        for task in self.tasks.values():
+            for dependency in task.dependencies:
+                dependents[dependency].append(task.key)
+
+        with ThreadPoolExecutor(jobs, thread_name_prefix="generate") as executor:
+            running: Dict[Future, str] = {}
+
+            def submit(key):
+                running[executor.submit(self.tasks[key].func)] = key
+
+            for key, count in remaining.items():
+                if count == 0:
+                    submit(key)
+
+            error = None
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key = running.pop(future)
+                    if (exception := future.exception()) is not None:
+                        logger.error("Task %s failed: %r", key, exception)
+                        error = error or exception
+                        continue
+                    if error is not None:
+                        continue
+                    for dependent in dependents[key]:
+                        remaining[dependent] -= 1
+                        if remaining[dependent] == 0:
+                            submit(dependent)
+
+            if error is not None:
+                raise error
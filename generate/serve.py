@@ -0,0 +1,396 @@
+"""
+Long-running render server
+
+Keeps the parsed sources, compiled templates and rendered outputs in memory and
+renders modules and whole documents on request over a local HTTP API, either on a
+TCP port or on a Unix socket. Nothing is written to ``generated/``: responses are
+rendered in memory, and cached until one of the files they were rendered from
+changes.
+
+Endpoints (all take an optional ``variant`` query parameter, naming a variant from
+the variants file the server was started with):
+
+``GET /health``
+    ``ok``, once the server is up
+``GET /render/<format>/<module>``
+    TeX of a single module, named like its output file relative to
+    ``generated/<format>`` and without extension, e.g. ``skills``, ``work/all-items``
+    or ``work/woodmac``
+``GET /document/<format>[?pdf=1]``
+    the master document for the format (e.g. ``resume.tex``) with every generated
+    module inlined, or the PDF compiled from it
+``POST /reload``
+    re-read the variants file and the build plan and drop all cached responses
+"""
+import http.server
+import logging
+import os
+import re
+import socketserver
+import stat
+import tempfile
+import threading
+import urllib.parse
+from collections import OrderedDict
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+from .build import compile_document, find_engine
+from .config import (
+    BUILD_PLAN_PATH,
+    DOCUMENTS,
+    FORMATS,
+    PDF_CACHE_SIZE,
+    RESPONSE_CACHE_SIZE,
+    SERVE_HOST,
+    SERVE_PORT,
+)
+from .generators import AllItemsByDateGenerator, FileToFileGenerator
+from .manifest import hash_bytes
+from .plan import BuildPlan, load_plan
+from .utils import item_name, list_files
+from .variants import Variant, load_variants
+
+
+logger = logging.getLogger(__name__)
+
+GENERATED_INPUT_PATTERN = re.compile(
+    r"\\input\{generated/(?P<fmt>[^/}]+)/(?P<module>[^}]+?)(?:\.tex)?\}"
+)
+COMMENT_PATTERN = re.compile(r"(?<!\\)%")
+
+Stamp = Tuple[Optional[Tuple[int, int]], ...]
+
+
+def stamp(paths: List[str]) -> Stamp:
+    """Modification times and sizes of ``paths``, to tell when any of them changes"""
+    stamps = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            stamps.append(None)
+        else:
+            stamps.append((st.st_mtime_ns, st.st_size))
+    return tuple(stamps)
+
+
+class FileModule(NamedTuple):
+    """A module rendered from a single source file"""
+
+    generator: FileToFileGenerator
+    path: str
+
+    def inputs(self) -> List[str]:
+        return [self.path]
+
+    def render(self, fmt: str) -> str:
+        return self.generator.generate(self.generator.load(self.path), fmt)
+
+
+class AggregateModule(NamedTuple):
+    """A module combining all the items of a one-item-per-file directory"""
+
+    aggregate: AllItemsByDateGenerator
+    source_dir: str
+
+    def inputs(self) -> List[str]:
+        # the directory's own stamp changes when items are added or removed
+        return [self.source_dir, *self.aggregate.item_paths(self.source_dir)]
+
+    def render(self, fmt: str) -> str:
+        paths = self.aggregate.item_paths(self.source_dir)
+        return self.aggregate.render_items(paths, fmt)
+
+
+Module = Union[FileModule, AggregateModule]
+
+
+class Site:
+    """The modules of one variant (or of the default rendering), by output name"""
+
+    def __init__(self, plan: BuildPlan, variant: Optional[Variant] = None):
+        self.files: Dict[str, Module] = {}
+        #: item generator, source directory and item filter of each one-item-per-file
+        #: subdirectory
+        self.dirs: Dict[str, Tuple[FileToFileGenerator, str, Callable]] = {}
+
+        for entry in plan.entries:
+            generator = entry.make_generator()
+            if variant is not None:
+                variant.configure(generator, entry.source)
+            if not entry.is_dir:
+                name = os.path.join(
+                    generator.subdir, generator.output_name(entry.source)
+                )
+                self.files[name] = FileModule(generator, entry.source)
+                continue
+
+            item_filter = (
+                variant.section(entry.source).selects
+                if variant is not None
+                else lambda name: True
+            )
+            self.dirs[generator.subdir] = (generator, entry.source, item_filter)
+            for kind in entry.aggregates:
+                if variant is not None:
+                    aggregate = variant.aggregate_generator(
+                        generator, entry.source, kind, entry.max_items
+                    )
+                else:
+                    aggregate = entry.make_aggregate(kind, generator)
+                name = os.path.join(generator.subdir, aggregate.output_name)
+                self.files[name] = AggregateModule(aggregate, entry.source)
+
+    def module(self, name: str) -> Module:
+        """The module named ``name``; raises ``KeyError`` if there is none"""
+        if name in self.files:
+            return self.files[name]
+        subdir, _, item = name.rpartition("/")
+        generator, source_dir, item_filter = self.dirs[subdir]
+        for path in list_files(source_dir):
+            if item_name(path) == item and item_filter(item):
+                return FileModule(generator, path)
+        raise KeyError(name)
+
+
+class Renderer:
+    """
+    Renders modules and documents in memory, reusing work across requests
+
+    Parsed sources are shared through the parsed items cache and templates are
+    compiled once. Rendered TeX is cached together with the stamps of the files it
+    was rendered from, and served again as long as none of them has changed.
+    """
+
+    def __init__(
+        self,
+        variants_path: Optional[str] = None,
+        engine: str = None,
+        plan_path: str = BUILD_PLAN_PATH,
+    ):
+        self.variants_path = variants_path
+        self.engine = engine
+        self.plan_path = plan_path
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self) -> None:
+        variants = load_variants(self.variants_path) if self.variants_path else []
+        plan = load_plan(self.plan_path)
+        with self._lock:
+            self.plan = plan
+            self.variants = {variant.name: variant for variant in variants}
+            self._sites: Dict[Optional[str], Site] = {}
+            self._responses: Dict[Tuple, Tuple[List[str], Stamp, str]] = OrderedDict()
+            self._pdfs: Dict[str, bytes] = OrderedDict()
+
+    def site(self, variant: Optional[str] = None) -> Site:
+        with self._lock:
+            site = self._sites.get(variant)
+            if site is None:
+                site = Site(
+                    self.plan, self.variants[variant] if variant is not None else None
+                )
+                self._sites[variant] = site
+            return site
+
+    def _cached(
+        self, key: Tuple, render: Callable[[], Tuple[str, List[str], Stamp]]
+    ) -> str:
+        with self._lock:
+            entry = self._responses.get(key)
+        if entry is not None:
+            inputs, inputs_stamp, text = entry
+            if stamp(inputs) == inputs_stamp:
+                with self._lock:
+                    if key in self._responses:
+                        self._responses.move_to_end(key)
+                return text
+
+        text, inputs, inputs_stamp = render()
+        with self._lock:
+            self._responses[key] = (inputs, inputs_stamp, text)
+            while len(self._responses) > RESPONSE_CACHE_SIZE:
+                self._responses.popitem(last=False)
+        return text
+
+    def render_module(self, fmt: str, name: str, variant: Optional[str] = None) -> str:
+        if fmt not in FORMATS:
+            raise KeyError(fmt)
+        module = self.site(variant).module(name)
+
+        def render():
+            inputs = module.inputs()
+            inputs_stamp = stamp(inputs)  # before rendering, so changes aren't missed
+            return module.render(fmt), inputs, inputs_stamp
+
+        return self._cached(("module", variant, fmt, name), render)
+
+    def render_document(self, fmt: str, variant: Optional[str] = None) -> str:
+        document = f"{fmt}.tex"
+        if document not in DOCUMENTS:
+            raise KeyError(document)
+        site = self.site(variant)
+
+        def render():
+            inputs = [document]
+            inputs_stamp = list(stamp(inputs))
+            with open(document, encoding="utf-8") as f:
+                lines = f.read().splitlines(keepends=True)
+
+            def inline(match: re.Match) -> str:
+                try:
+                    module_inputs = site.module(match["module"]).inputs()
+                except KeyError:  # not generated here: leave it to TeX
+                    return match[0]
+                inputs.extend(module_inputs)
+                inputs_stamp.extend(stamp(module_inputs))
+                return self.render_module(match["fmt"], match["module"], variant)
+
+            for i, line in enumerate(lines):
+                # leave commented out \input's alone
+                comment = COMMENT_PATTERN.search(line)
+                split = comment.start() if comment else len(line)
+                lines[i] = (
+                    GENERATED_INPUT_PATTERN.sub(inline, line[:split]) + line[split:]
+                )
+            return "".join(lines), inputs, tuple(inputs_stamp)
+
+        return self._cached(("document", variant, fmt), render)
+
+    def render_pdf(self, fmt: str, variant: Optional[str] = None) -> bytes:
+        tex = self.render_document(fmt, variant)
+        key = hash_bytes(tex.encode("utf-8"))
+        with self._lock:
+            pdf = self._pdfs.get(key)
+        if pdf is not None:
+            return pdf
+
+        engine = find_engine(self.engine)
+        # compile next to the master documents, so that resume.cls etc. are found
+        fd, tex_path = tempfile.mkstemp(dir=".", prefix=f".serve-{fmt}-", suffix=".tex")
+        try:
+            with open(fd, "w", encoding="utf-8") as f:
+                f.write(tex)
+            with tempfile.TemporaryDirectory(prefix="generate-serve-") as output_dir:
+                compile_document(tex_path, engine, output_dir=output_dir)
+                name = os.path.splitext(os.path.basename(tex_path))[0]
+                with open(os.path.join(output_dir, f"{name}.pdf"), "rb") as f:
+                    pdf = f.read()
+        finally:
+            os.unlink(tex_path)
+
+        with self._lock:
+            self._pdfs[key] = pdf
+            while len(self._pdfs) > PDF_CACHE_SIZE:
+                self._pdfs.popitem(last=False)
+        return pdf
+
+
+class RequestHandler(http.server.BaseHTTPRequestHandler):
+    server: "Union[HTTPServer, UnixHTTPServer]"
+    server_version = "generate-serve"
+    protocol_version = "HTTP/1.1"  # keep connections alive between requests
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        variant = query.get("variant", [None])[0]
+        parts = [urllib.parse.unquote(part) for part in url.path.split("/") if part]
+        renderer = self.server.renderer
+        try:
+            if parts == ["health"]:
+                self.send("ok\n")
+            elif len(parts) >= 3 and parts[0] == "render":
+                tex = renderer.render_module(parts[1], "/".join(parts[2:]), variant)
+                self.send(tex, "text/x-tex")
+            elif len(parts) == 2 and parts[0] == "document":
+                if query.get("pdf", ["0"])[0] not in ("", "0"):
+                    self.send(renderer.render_pdf(parts[1], variant), "application/pdf")
+                else:
+                    self.send(renderer.render_document(parts[1], variant), "text/x-tex")
+            else:
+                self.send_error(404)
+        except KeyError as e:
+            self.send_error(404, f"Unknown {e}")
+        except Exception as e:
+            logger.exception("Failed to serve %s", self.path)
+            self.send_error(500, str(e))
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/reload":
+            self.send_error(404)
+            return
+        try:
+            self.server.renderer.reload()
+        except Exception as e:
+            logger.exception("Failed to reload")
+            self.send_error(500, str(e))
+            return
+        self.send("reloaded\n")
+
+    def send(self, body: Union[str, bytes], content_type: str = "text/plain") -> None:
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+            content_type += "; charset=utf-8"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else "local"
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+class HTTPServer(http.server.ThreadingHTTPServer):
+    def __init__(self, address: Tuple[str, int], renderer: Renderer):
+        super().__init__(address, RequestHandler)
+        self.renderer = renderer
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, renderer: Renderer):
+        try:
+            mode = os.lstat(path).st_mode
+        except FileNotFoundError:
+            pass
+        else:
+            if not stat.S_ISSOCK(mode):
+                raise FileExistsError(f"{path} exists and is not a socket")
+            os.unlink(path)  # left over from a previous run
+        super().__init__(path, RequestHandler)
+        self.renderer = renderer
+
+
+def serve(
+    host: str = SERVE_HOST,
+    port: int = SERVE_PORT,
+    socket_path: Optional[str] = None,
+    variants_path: Optional[str] = None,
+    engine: Optional[str] = None,
+    plan_path: str = BUILD_PLAN_PATH,
+) -> None:
+    """Serve rendered modules and documents until interrupted"""
+    renderer = Renderer(variants_path, engine, plan_path)
+    if socket_path is not None:
+        server = UnixHTTPServer(socket_path, renderer)
+        location = socket_path
+    else:
+        server = HTTPServer((host, port), renderer)
+        location = "http://{}:{}".format(*server.server_address[:2])
+    logger.info("Serving on %s", location)
+    with server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("Stopping")
+        finally:
+            if socket_path is not None:
+                os.unlink(socket_path)
@@ -1,22 +1,81 @@
+import string
 from abc import ABCMeta, abstractmethod
-from typing import Dict, Optional
+from typing import Dict, FrozenSet, Mapping, Optional
 
 from .config import ITEMS_FIELD
 from .utils import FormattedFields
 
 
+class CompiledFormat:
+    """
+    A ``str.format``-style format string parsed once into a render plan
+
+    The plan is a sequence of literal segments and field slots (name, conversion and
+    format spec). Rendering looks up each field, formats it and joins everything in
+    a single pass, instead of re-parsing the format string on every call. Only plain
+    field names are supported (no positional, attribute or index fields).
+    """
+
+    __slots__ = ("source", "plan", "fields")
+
+    _CONVERSIONS = {None: None, "s": str, "r": repr, "a": ascii}
+
+    def __init__(self, source: str):
+        plan = []
+        for literal, name, spec, conversion in string.Formatter().parse(source):
+            if literal:
+                plan.append((literal, None, None, None))
+            if name is None:
+                continue
+            if not name or name.isdigit() or "." in name or "[" in name:
+                raise ValueError(f"Unsupported field {{{name}}} in {source!r}")
+            if "{" in spec:
+                raise ValueError(f"Nested format spec in field {{{name}}}")
+            plan.append((None, name, spec, self._CONVERSIONS[conversion]))
+
+        self.source = source
+        self.plan = tuple(plan)
+        self.fields = frozenset(name for _, name, _, _ in plan if name is not None)
+
+    def render(self, fields: FormattedFields) -> str:
+        missing = [name for name in self.fields if name not in fields]
+        if missing:
+            raise KeyError(f"Missing template fields: {', '.join(sorted(missing))}")
+        return "".join(
+            literal
+            if name is None
+            else format(
+                fields[name] if convert is None else convert(fields[name]), spec
+            )
+            for literal, name, spec, convert in self.plan
+        )
+
+
 class Template(metaclass=ABCMeta):
     @abstractmethod
     def fill(self, fields: FormattedFields) -> str:
         pass
 
+    @property
+    @abstractmethod
+    def item_fields(self) -> FrozenSet[str]:
+        """Names of the fields used to render each item"""
+
 
 class SimpleTemplate(Template):
     def __init__(self, template: str):
         self.template = template
+        self.compiled = CompiledFormat(template)
 
     def fill(self, fields: FormattedFields) -> str:
-        return self.template.format(**fields)
+        return self.compiled.render(fields)
+
+    @property
+    def item_fields(self) -> FrozenSet[str]:
+        return self.compiled.fields
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.template!r})"
 
 
 class MultiItemTemplate(Template):
@@ -31,13 +90,44 @@ class MultiItemTemplate(Template):
         self.item_template = item_template
         self.item_sep = item_sep
         self.max_items = max_items
+        self.compiled_global = CompiledFormat(global_template)
+        self.compiled_item = CompiledFormat(item_template)
 
     def fill(self, fields: FormattedFields) -> str:
+        render_item = self.compiled_item.render
         items_fmt = self.item_sep.join(
-            self.item_template.format(**item)
-            for item in fields[ITEMS_FIELD][: self.max_items]
+            render_item(item) for item in fields[ITEMS_FIELD][: self.max_items]
+        )
+        return self.compiled_global.render({ITEMS_FIELD: items_fmt})
+
+    @property
+    def item_fields(self) -> FrozenSet[str]:
+        return self.compiled_item.fields
+
+    def with_max_items(self, max_items: Optional[int]) -> "MultiItemTemplate":
+        return MultiItemTemplate(
+            self.global_template, self.item_template, self.item_sep, max_items
+        )
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}({self.global_template!r}, "
+            f"{self.item_template!r}, {self.item_sep!r}, {self.max_items!r})"
+        )
+
+
+def cap_templates(
+    templates: Mapping[str, Template], max_items: Mapping[str, int]
+) -> Dict[str, Template]:
+    """``templates`` with the multiple-items ones capped at ``max_items`` per format"""
+    return {
+        fmt: (
+            template.with_max_items(max_items[fmt])
+            if fmt in max_items and isinstance(template, MultiItemTemplate)
+            else template
         )
-        return self.global_template.format(items=items_fmt)
+        for fmt, template in templates.items()
+    }
 
 
 # fmt: off
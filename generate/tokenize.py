@@ -1,18 +1,52 @@
+"""
+Tokenization of free text fields into LaTeX-aware tokens
+
+Token types are registered with ``register_token_type``: each is a regular
+expression plus the ``Token`` subclass built from its matches. All registered
+patterns are combined into a single alternation, so a text is tokenized in one
+scan, with earlier registrations taking precedence where several types could match
+at the same position. Text between matches becomes plain text tokens. Results are
+memoized per input string.
+"""
+import functools
 import re
+import threading
 from abc import ABCMeta, abstractmethod
-from typing import Callable, ClassVar, Dict, Sequence
+from collections import OrderedDict
+from typing import (
+    Callable,
+    ClassVar,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Pattern,
+    Sequence,
+    Type,
+)
+
+from .config import TOKENIZE_CACHE_SIZE
+from .utils import MONTH_NUMBERS, parse_date
+
+URL_PATTERN = re.compile(r"(?P<protocol>https?://|mailto:)(?P<address>\S+)(?<!\W)")
 
-URL_SEARCH_PATTERN = re.compile(r"((?:https?://|mailto:)\S+)(?<!\W)")
-URL_PATTERN = re.compile(r"(?P<protocol>https?://|mailto:)(?P<address>\S+)")
+#: separator for batch tokenization; token patterns must not match across newlines
+BATCH_SEPARATOR = "\n"
 
 
 class Token(metaclass=ABCMeta):
+    __slots__ = ("text",)
+
     formatters: ClassVar[Dict[str, Callable[["Token"], str]]]
 
-    def __init__(self, text: str, *args):
-        self._init_args = (text,) + args
+    def __init__(self, text: str):
         self.text = text
 
+    @classmethod
+    def from_match(cls, match: re.Match, group: str) -> "Token":
+        return cls(match[group])
+
     @abstractmethod
     def __format__(self, format_spec):
         """Format for inclusion in LaTeX code."""
@@ -22,47 +56,274 @@ class Token(metaclass=ABCMeta):
         return self.text
 
     def __repr__(self):
-        args_fmt = ", ".join(repr(arg) for arg in self._init_args)
-        return f"{self.__class__.__name__}({args_fmt})"
+        return f"{self.__class__.__name__}({self.text!r})"
 
 
 class PlainTextToken(Token):
-    def __init__(self, text: str):
-        super().__init__(text)
+    __slots__ = ()
 
     def __format__(self, format_spec):
         return self.text
 
 
+class _Memo:
+    """Bounded LRU memo of tokenized texts"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: Dict[str, "TokenizedText"] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, text: str):
+        with self._lock:
+            tokenized = self._entries.get(text)
+            if tokenized is not None:
+                self._entries.move_to_end(text)
+            return tokenized
+
+    def put(self, text: str, tokenized: "TokenizedText") -> None:
+        with self._lock:
+            self._entries[text] = tokenized
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_memo = _Memo(TOKENIZE_CACHE_SIZE)
+
+
+def clear_cache() -> None:
+    """Forget all memoized tokenizations"""
+    _memo.clear()
+
+
+class TokenType(NamedTuple):
+    name: str
+    pattern: str
+    token_class: Type[Token]
+
+
+#: registered token types, in order of precedence
+TOKEN_TYPES: Dict[str, TokenType] = {}
+
+
+def register_token_type(name: str, pattern: str):
+    """
+    Decorate a ``Token`` subclass to be recognized by the tokenizer
+
+    ``name`` is used as the name of the pattern's group in the combined regular
+    expression, so it (and any named groups in ``pattern``) must be unique among
+    all token types.
+    """
+
+    def decorator(cls: Type[Token]) -> Type[Token]:
+        if name in TOKEN_TYPES:
+            raise ValueError(f"Token type {name!r} is already registered")
+        TOKEN_TYPES[name] = TokenType(name, pattern, cls)
+        token_pattern.cache_clear()
+        clear_cache()
+        return cls
+
+    return decorator
+
+
+@functools.lru_cache(maxsize=None)
+def token_pattern() -> Pattern:
+    """Single regular expression matching any of the registered token types"""
+    return re.compile(
+        "|".join(f"(?P<{t.name}>{t.pattern})" for t in TOKEN_TYPES.values())
+    )
+
+
+@register_token_type("url", URL_PATTERN.pattern)
 class URLToken(Token):
-    def __init__(self, url: str):
+    __slots__ = ("protocol", "address")
+
+    def __init__(self, url: str, protocol: str = None, address: str = None):
         super().__init__(url)
-        groups = re.fullmatch(URL_PATTERN, url).groupdict()
-        for key, value in groups.items():
-            setattr(self, key, value)
+        if protocol is None or address is None:
+            match = URL_PATTERN.fullmatch(url)
+            protocol, address = match["protocol"], match["address"]
+        self.protocol = protocol
+        self.address = address
+
+    @classmethod
+    def from_match(cls, match: re.Match, group: str) -> Token:
+        return cls(match[group], match["protocol"], match["address"])
 
     def __format__(self, format_spec):
         return rf"\href{{{self.protocol}{self.address}}}{{{self.address}}}"
 
 
+@register_token_type("email", r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+class EmailToken(Token):
+    __slots__ = ()
+
+    def __format__(self, format_spec):
+        return rf"\href{{mailto:{self.text}}}{{{self.text}}}"
+
+
+@register_token_type("math", r"(?<!\\)\$(?=\S)[^$\n]+(?<=\S)\$|\\\([^\n]+?\\\)")
+class MathToken(Token):
+    """Inline math, ``$...$`` or ``\\(...\\)``, passed through verbatim
+
+    As in Pandoc's Markdown, a ``$...$`` span must not start or end with a space, so
+    that amounts such as "$5 and $10" are not mistaken for math.
+    """
+
+    __slots__ = ()
+
+    def __format__(self, format_spec):
+        return self.text
+
+
+#: markup delimiters must be at word boundaries, so that e.g. ``5*3*2`` and
+#: ``C*-algebras`` are left alone
+MARKUP_START = r"(?<![\w*])"
+MARKUP_END = r"(?![\w*])"
+
+
+@register_token_type(
+    "strong",
+    rf"{MARKUP_START}\*\*(?=\S)(?P<strong_content>(?:[^*\n]|\*[^*\n]+\*)+)"
+    rf"(?<=\S)\*\*{MARKUP_END}",
+)
+class StrongToken(Token):
+    """``**text**`` markup, rendered in bold; the inner text is tokenized too"""
+
+    __slots__ = ("content",)
+
+    command = r"\textbf"
+
+    def __init__(self, text: str, content: str = None):
+        super().__init__(text)
+        self.content = tokenize(text.strip("*") if content is None else content)
+
+    @classmethod
+    def from_match(cls, match: re.Match, group: str) -> Token:
+        return cls(match[group], match[f"{group}_content"])
+
+    def __format__(self, format_spec):
+        return f"{self.command}{{{format(self.content, format_spec)}}}"
+
+
+@register_token_type(
+    "emphasis",
+    rf"{MARKUP_START}\*(?=\S)(?P<emphasis_content>[^*\n]+)(?<=\S)\*{MARKUP_END}",
+)
+class EmphasisToken(StrongToken):
+    """``*text*`` markup, rendered emphasized"""
+
+    __slots__ = ()
+
+    command = r"\emph"
+
+
+@register_token_type(
+    "date", rf"\b(?i:{'|'.join(map(re.escape, MONTH_NUMBERS))})\.? \d{{4}}\b"
+)
+class DateToken(Token):
+    """A "Month YYYY" date, parsed but rendered verbatim"""
+
+    __slots__ = ("date",)
+
+    def __init__(self, text: str):
+        super().__init__(text)
+        self.date = parse_date(text.replace(".", ""))
+
+    def __format__(self, format_spec):
+        return self.text
+
+
+@register_token_type("special", r"(?<!\\)[&%$#_]")
+class SpecialCharacterToken(Token):
+    """A LaTeX special character that wasn't escaped in the source"""
+
+    __slots__ = ()
+
+    def __format__(self, format_spec):
+        return "\\" + self.text
+
+
 class TokenizedText:
+    """A sequence of tokens, whose formatted form is cached per format spec"""
+
+    __slots__ = ("token_list", "_formatted")
+
     def __init__(self, token_list: Sequence[Token]):
-        self.token_list = token_list
+        self.token_list = tuple(token_list)
+        self._formatted: Dict[str, str] = {}
 
     def __format__(self, format_spec):
+        try:
+            return self._formatted[format_spec]
+        except KeyError:
+            pass
         s = "".join(format(token, format_spec) for token in self.token_list)
-        return format(s, format_spec)
+        formatted = self._formatted[format_spec] = format(s, format_spec)
+        return formatted
 
     def __repr__(self):
-        return f"TokenizedText({repr(self.token_list)})"
+        return f"TokenizedText({list(self.token_list)!r})"
+
+
+def _tokens_from_matches(
+    text: str, matches: Iterator[re.Match], start: int, end: int
+) -> Iterator[Token]:
+    position = start
+    for match in matches:
+        if match.start() > position:
+            yield PlainTextToken(text[position : match.start()])
+        group = match.lastgroup
+        yield TOKEN_TYPES[group].token_class.from_match(match, group)
+        position = match.end()
+    if position < end:
+        yield PlainTextToken(text[position:end])
+
+
+def iter_tokens(text: str, start: int = 0, end: int = None) -> Iterator[Token]:
+    """Lazily tokenize ``text[start:end]`` in a single scan (not memoized)"""
+    end = len(text) if end is None else end
+    matches = token_pattern().finditer(text, start, end)
+    return _tokens_from_matches(text, matches, start, end)
 
 
 def tokenize(text: str) -> TokenizedText:
-    def select_token_class(token_text: str):
-        return (
-            URLToken if re.fullmatch(URL_SEARCH_PATTERN, token_text) else PlainTextToken
-        )
-
-    split_list = re.split(URL_SEARCH_PATTERN, text)
-    tokens = [select_token_class(txt)(txt) for txt in split_list]
-    return TokenizedText(tokens)
+    tokenized = _memo.get(text)
+    if tokenized is None:
+        tokenized = TokenizedText(iter_tokens(text))
+        _memo.put(text, tokenized)
+    return tokenized
+
+
+def tokenize_many(texts: Iterable[str]) -> List[TokenizedText]:
+    """
+    Tokenize several texts (e.g. all descriptions in a directory) in one scan
+
+    Texts that were tokenized before are taken from the memo; the rest are joined
+    with a separator no token can span, scanned once, and split back by text.
+    """
+    texts = list(texts)
+    results = [_memo.get(text) for text in texts]
+    pending = list({text: None for text, r in zip(texts, results) if r is None})
+
+    joined = BATCH_SEPARATOR.join(pending)
+    matches = token_pattern().finditer(joined)
+    match = next(matches, None)
+    tokenized = {}
+    start = 0
+    for text in pending:
+        end = start + len(text)
+        text_matches = []
+        while match is not None and match.start() < end:
+            text_matches.append(match)
+            match = next(matches, None)
+        tokens = _tokens_from_matches(joined, iter(text_matches), start, end)
+        tokenized[text] = TokenizedText(tokens)
+        _memo.put(text, tokenized[text])
+        start = end + len(BATCH_SEPARATOR)
+
+    return [r if r is not None else tokenized[t] for t, r in zip(texts, results)]
@@ -1,25 +1,72 @@
 import calendar
+import functools
+import os
+import sys
 from collections import namedtuple
-from typing import Any, Callable, Dict, Union
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    MutableMapping,
+    Optional,
+    Union,
+)
+
+from .config import DATE_CACHE_SIZE, FORMATS
 
 # helper types / type aliases
 MonthDate = namedtuple("MonthDate", ["year", "month"])
-Data = Dict[str, Any]
-FormattedFields = Dict[str, str]
+Data = Mapping[str, Any]
+FormattedFields = MutableMapping[str, Any]
 Parser = Callable[[Data], Data]
 Formatter = Callable[[Data], FormattedFields]
 
 
+#: end date of ongoing items, sorted after any other date
+PRESENT = "present"
+PRESENT_SORT_KEY = sys.maxsize
+
+
+def _month_numbers() -> Dict[str, int]:
+    """Month numbers by lowercase full and abbreviated name, in the current locale"""
+    months = {}
+    for names in (calendar.month_name, calendar.month_abbr):
+        for number, name in enumerate(names):
+            if name:
+                months[name.lower()] = number
+    return months
+
+
+MONTH_NUMBERS = _month_numbers()
+
+
+@functools.lru_cache(maxsize=DATE_CACHE_SIZE)
 def parse_date(date: str) -> Union[MonthDate, str]:
     try:
         month, year = date.split()
-        month = list(calendar.month_name).index(month.title())
-        year = int(year)
-        return MonthDate(year, month)
-    except ValueError:
+        return MonthDate(int(year), MONTH_NUMBERS[month.lower()])
+    except (KeyError, ValueError):
         return date
 
 
+def date_sort_key(date: Union[MonthDate, str, None]) -> Optional[int]:
+    """
+    Integer key ordering dates chronologically, or ``None`` if ``date`` isn't one
+
+    Month dates map to consecutive integers and ``PRESENT`` comes after all of them;
+    strings are parsed first.
+    """
+    if isinstance(date, str):
+        if date == PRESENT:
+            return PRESENT_SORT_KEY
+        date = parse_date(date)
+    if isinstance(date, MonthDate):
+        return date.year * 12 + date.month - 1
+    return None
+
+
 def format_date_long(date):
     return (
         f"{calendar.month_name[date.month]} {date.year}"
@@ -36,5 +83,36 @@ def format_date_short(date):
     )
 
 
+def per_format(value: Union[int, Mapping[str, int], None]) -> Dict[str, int]:
+    """Per-format limits, from a mapping or a single number for every format"""
+    if isinstance(value, int):
+        return {fmt: value for fmt in FORMATS}
+    return dict(value or {})
+
+
+def stable_repr(value: tuple) -> str:
+    """repr of a named tuple with its sets sorted, so that it is the same in every
+    run (the iteration order of sets of strings isn't), e.g. for fingerprints"""
+    fields = ", ".join(
+        f"{name}={(sorted(v) if isinstance(v, (set, frozenset)) else v)!r}"
+        for name, v in zip(value._fields, value)
+    )
+    return f"{type(value).__name__}({fields})"
+
+
 def format_optional(optional):
     return optional if optional else ""
+
+
+def list_files(directory: str) -> List[str]:
+    """Paths of the regular files in a directory, in a stable order"""
+    return sorted(
+        path
+        for file_name in os.listdir(directory)
+        if os.path.isfile(path := os.path.join(directory, file_name))
+    )
+
+
+def item_name(path: str) -> str:
+    """Name of the module in a source file: its file name without extension"""
+    return os.path.basename(path).rsplit(".")[0]
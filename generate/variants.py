@@ -0,0 +1,142 @@
+import os
+from typing import Dict, FrozenSet, List, Mapping, NamedTuple, Optional, Tuple
+
+from .config import ITEM_NAME_FIELDS, ROOT_OUTPUT_PATH
+from .generators import FileToFileGenerator, YamlTexModuleGenerator
+from .index import ItemQuery
+from .loader import YAML_LOADER
+from .manifest import Manifest
+from .pipeline import build_graph
+from .plan import BuildPlan
+from .registry import AGGREGATES
+from .scheduler import TaskGraph
+from .templates import cap_templates
+from .utils import Data, item_name, per_format, stable_repr
+
+
+class SectionOptions(NamedTuple):
+    """How a variant renders one module (a file or a directory of items)"""
+
+    include: Optional[FrozenSet[str]] = None
+    exclude: FrozenSet[str] = frozenset()
+    order: Tuple[str, ...] = ()
+    max_items: Dict[str, int] = {}
+    #: selection of items by tags, institutions, dates etc. (see ``index.ItemQuery``)
+    select: Optional[ItemQuery] = None
+
+    @classmethod
+    def from_data(cls, data: Data) -> "SectionOptions":
+        include = data.get("include")
+        return cls(
+            include=frozenset(include) if include is not None else None,
+            exclude=frozenset(data.get("exclude") or ()),
+            order=tuple(data.get("order") or ()),
+            max_items=per_format(data.get("max-items")),
+            select=ItemQuery.from_data(data["select"]) if data.get("select") else None,
+        )
+
+    def __repr__(self):
+        return stable_repr(self)
+
+    def selects(self, name: str) -> bool:
+        return (self.include is None or name in self.include) and (
+            name not in self.exclude
+        )
+
+    def selects_item(self, item: Data) -> bool:
+        name = next((item[field] for field in ITEM_NAME_FIELDS if field in item), None)
+        return name is None or self.selects(name)
+
+
+class Variant(NamedTuple):
+    """
+    A flavour of CV/resume rendered from the shared modules
+
+    ``sections`` maps module names (the source file or directory name under
+    ``modules/``, without extension, e.g. ``work-items`` or ``skills``) to the
+    options used to render them; modules without an entry are rendered as usual.
+    """
+
+    name: str
+    output_root: str
+    sections: Dict[str, SectionOptions] = {}
+
+    @classmethod
+    def from_data(cls, data: Data) -> "Variant":
+        name = data["name"]
+        return cls(
+            name=name,
+            output_root=os.path.abspath(
+                data.get("output-root") or os.path.join(ROOT_OUTPUT_PATH, name)
+            ),
+            sections={
+                section: SectionOptions.from_data(options or {})
+                for section, options in (data.get("sections") or {}).items()
+            },
+        )
+
+    def section(self, path: str) -> SectionOptions:
+        return self.sections.get(item_name(os.path.normpath(path)), SectionOptions())
+
+    def configure(self, generator: FileToFileGenerator, path: str) -> None:
+        """Render ``generator``'s output for ``path`` according to this variant"""
+        generator.output_root = self.output_root
+        if not isinstance(generator, YamlTexModuleGenerator):
+            return
+
+        section = self.section(path)
+        if hasattr(generator, "item_filter"):  # multiple items per file
+            generator.item_filter = section.selects_item
+            generator.item_filter_key = repr(section)
+            generator.item_query = section.select
+        generator.templates = cap_templates(generator.templates, section.max_items)
+
+    def aggregate_generator(
+        self,
+        item_generator: YamlTexModuleGenerator,
+        source_dir: str,
+        kind: str = "all-items-by-date",
+        max_items: Mapping[str, int] = {},
+    ):
+        """The aggregate generator ``kind`` for ``source_dir`` in this variant
+
+        ``max_items`` are the limits of the build plan, which the variant's own override.
+        """
+        section = self.section(source_dir)
+        return AGGREGATES.create(
+            kind,
+            item_generator,
+            item_filter=section.selects,
+            order=section.order,
+            max_items={**max_items, **section.max_items},
+            query=section.select,
+        )
+
+
+def load_variants(path: str) -> List[Variant]:
+    """Read a variants file: a YAML document with a list of ``variants``"""
+    with open(path, encoding="utf-8") as f:
+        data = YAML_LOADER.load(f.read())
+    variants = [Variant.from_data(variant) for variant in data["variants"]]
+    names = [variant.name for variant in variants]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate variant names in {path}")
+    return variants
+
+
+def build_variants_graph(
+    variants: List[Variant],
+    add_comment: bool = True,
+    manifest: Optional[Manifest] = None,
+    plan: Optional[BuildPlan] = None,
+) -> TaskGraph:
+    """
+    Build the tasks rendering every variant into its own output root
+
+    All variants use the same generator classes, so every source file is parsed
+    once (through the shared parsed-item cache) and then rendered once per variant.
+    """
+    graph = TaskGraph()
+    for variant in variants:
+        build_graph(add_comment, manifest, variant=variant, graph=graph, plan=plan)
+    return graph
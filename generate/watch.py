@@ -0,0 +1,186 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import time
+from abc import ABCMeta, abstractmethod
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from .scheduler import TaskGraph
+
+
+logger = logging.getLogger(__name__)
+
+#: seconds without further changes before a burst of changes is processed
+DEBOUNCE_DELAY = 0.2
+#: seconds between scans of the polling watcher
+POLL_INTERVAL = 0.5
+
+
+def is_ignored(path: str) -> bool:
+    """Whether a changed path is an editor's temporary or backup file"""
+    name = os.path.basename(path)
+    return name.startswith((".", "#")) or name.endswith(("~", ".swp", ".tmp"))
+
+
+class Watcher(metaclass=ABCMeta):
+    """Source of file system change notifications for a directory tree"""
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    @abstractmethod
+    def poll(self, timeout: Optional[float]) -> Set[str]:
+        """Wait up to ``timeout`` seconds for changes, returning the changed paths"""
+
+    def close(self) -> None:
+        pass
+
+    def wait_for_changes(self, debounce: float = DEBOUNCE_DELAY) -> Set[str]:
+        """Block until something changes, then until things settle down"""
+        changed = set()
+        while not changed:
+            changed = {path for path in self.poll(None) if not is_ignored(path)}
+        while more := self.poll(debounce):
+            changed.update(path for path in more if not is_ignored(path))
+        return changed
+
+
+class PollingWatcher(Watcher):
+    """Detect changes by periodically comparing file modification times and sizes"""
+
+    def __init__(self, root: str, interval: float = POLL_INTERVAL):
+        super().__init__(root)
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        for dir_path, _, file_names in os.walk(self.root):
+            for file_name in file_names:
+                path = os.path.join(dir_path, file_name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def poll(self, timeout: Optional[float]) -> Set[str]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = self._scan()
+            changed = {
+                path
+                for path in snapshot.keys() | self._snapshot.keys()
+                if snapshot.get(path) != self._snapshot.get(path)
+            }
+            self._snapshot = snapshot
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            sleep = self.interval
+            if deadline is not None:
+                sleep = min(sleep, max(deadline - time.monotonic(), 0))
+            time.sleep(sleep)
+
+
+class InotifyWatcher(Watcher):
+    """Receive change notifications from the Linux kernel through inotify"""
+
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_FROM = 0x040
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_ISDIR = 0x40000000
+    WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+    EVENT_HEADER = struct.Struct("iIII")
+
+    def __init__(self, root: str):
+        super().__init__(root)
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._watches: Dict[int, str] = {}
+        for dir_path, _, _ in os.walk(self.root):
+            self._add_watch(dir_path)
+
+    def _add_watch(self, path: str) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), self.WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        self._watches[wd] = path
+
+    def poll(self, timeout: Optional[float]) -> Set[str]:
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changed = set()
+        buffer = os.read(self._fd, 64 * 1024)
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, _, length = self.EVENT_HEADER.unpack_from(buffer, offset)
+            offset += self.EVENT_HEADER.size
+            name = buffer[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if wd not in self._watches or not name:
+                continue
+            path = os.path.join(self._watches[wd], os.fsdecode(name))
+            if mask & self.IN_ISDIR:
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    self._add_watch(path)
+                continue
+            changed.add(path)
+        return changed
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+def make_watcher(root: str) -> Watcher:
+    """Watch ``root`` with inotify where available, falling back to polling"""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError) as e:
+            logger.warning("inotify unavailable (%s), falling back to polling", e)
+    return PollingWatcher(root)
+
+
+def watch(
+    root: str,
+    build: Callable[[], TaskGraph],
+    run: Callable[[TaskGraph], None],
+) -> None:
+    """
+    Regenerate the outputs affected by changes under ``root`` until interrupted
+
+    After each burst of changes, the graph is rebuilt with ``build`` (so that added
+    or removed items are picked up) and the tasks that read a changed path are
+    passed to ``run``.
+    """
+    watcher = make_watcher(root)
+    logger.info("Watching %s for changes (%s)", root, watcher.__class__.__name__)
+    try:
+        while True:
+            changed = watcher.wait_for_changes()
+            graph = build().affected_by(changed)
+            logger.info(
+                "%d changed path(s), running %d task(s)", len(changed), len(graph)
+            )
+            try:
+                run(graph)
+            except Exception:
+                logger.exception("Regeneration failed")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
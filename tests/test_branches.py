@@ -0,0 +1,123 @@
+import os
+import subprocess
+
+import pytest
+
+from generate import branches
+from generate.__main__ import main
+from generate.branches import (
+    Branch,
+    CatFile,
+    GitTree,
+    build_branches_graph,
+    list_branches,
+)
+from generate.plan import BuildPlan
+
+
+def _git(repo, *args):
+    subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        cwd=repo,
+        check=True,
+        capture_output=True,
+    )
+
+
+def _item(repo, name, year):
+    path = repo / "modules" / "work-items" / f"{name}.yaml"
+    path.write_text(
+        f"job-title: Job {name}\ncompany: Acme\nstart-date: May {year}\n"
+        f"end-date: June {year}\ncomment:\ndescription: Did {name}\n"
+    )
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    """A repository whose ``alt`` branch changes one item and adds another"""
+    repo = tmp_path / "repo"
+    (repo / "modules" / "work-items").mkdir(parents=True)
+    _git(repo, "init", "-q", "-b", "main")
+    _item(repo, "a", 2010)
+    _item(repo, "b", 2011)
+    _git(repo, "add", ".")
+    _git(repo, "commit", "-q", "-m", "main")
+    _git(repo, "checkout", "-q", "-b", "alt")
+    _item(repo, "b", 2015)
+    _item(repo, "c", 2012)
+    _git(repo, "add", ".")
+    _git(repo, "commit", "-q", "-m", "alt")
+    _git(repo, "checkout", "-q", "main")
+    monkeypatch.chdir(repo)
+    return repo
+
+
+def test_git_tree(repo):
+    with CatFile(str(repo)) as cat_file:
+        tree = GitTree(cat_file, "alt")
+        assert tree.isdir("modules/work-items")
+        assert tree.list_files("modules/work-items") == [
+            "modules/work-items/a.yaml",
+            "modules/work-items/b.yaml",
+            "modules/work-items/c.yaml",
+        ]
+        assert b"2015" in tree.read("modules/work-items/b.yaml")
+        with pytest.raises(ValueError, match="Unknown branch"):
+            GitTree(cat_file, "no-such-branch")
+    assert list_branches(str(repo)) == ["alt", "main"]
+
+
+def test_branches_render_from_git_objects(repo, tmp_path):
+    # the working tree is on main: alt's files must come from git
+    plan = BuildPlan.from_data(
+        {
+            "modules": [
+                {
+                    "source": "modules/work-items",
+                    "generator": "work",
+                    "aggregates": ["all-items-by-date"],
+                }
+            ]
+        }
+    )
+    output_root = tmp_path / "generated"
+    with CatFile(str(repo)) as cat_file:
+        branches = [
+            Branch(name, GitTree(cat_file, name), str(output_root / name))
+            for name in ["main", "alt"]
+        ]
+        build_branches_graph(branches, add_comment=False, plan=plan).run(jobs=2)
+
+    def jobs(branch):
+        path = output_root / branch / "cv" / "work" / "all-items.tex"
+        return [line for line in path.read_text().splitlines() if "Job " in line]
+
+    assert jobs("main") == ["{ Job b }", "{ Job a }"]
+    assert jobs("alt") == ["{ Job b }", "{ Job c }", "{ Job a }"]
+    assert sorted(os.listdir(output_root / "alt" / "cv" / "work")) == [
+        "a.tex",
+        "all-items.tex",
+        "b.tex",
+        "c.tex",
+    ]
+
+
+@pytest.mark.parametrize("names", [["main"], ["no-such-branch"]])
+def test_cat_file_is_closed(repo, monkeypatch, names):
+    (repo / "build-plan.yaml").write_text(
+        "modules:\n  - source: modules/work-items\n    generator: work\n"
+    )
+    closed = []
+    close = branches.CatFile.close
+
+    def tracking_close(self):
+        closed.append(self)
+        close(self)
+
+    monkeypatch.setattr(branches.CatFile, "close", tracking_close)
+    try:
+        main(branches=names, dry_run=True, plan=str(repo / "build-plan.yaml"))
+    except SystemExit as e:
+        assert names == ["no-such-branch"] and e.code == 1
+    assert len(closed) == 1
+    assert closed[0].process.returncode is not None
@@ -0,0 +1,127 @@
+import threading
+
+from generate import generators
+from generate.cache import ParsedItemCache
+from generate.config import DATE_FIELDS, TEXT_FIELDS
+from generate.records import record_type
+
+
+def _write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+
+def test_fetch_many_loads_missing_files_in_one_batch(tmp_path):
+    a, b, c = (_write(tmp_path, name, name) for name in "abc")
+    batches = []
+
+    def load_many(paths):
+        batches.append(list(paths))
+        return [open(path).read().upper() for path in paths]
+
+    cache = ParsedItemCache()
+    assert cache.fetch("ns", a, lambda path: "A") == "A"
+    assert cache.fetch_many("ns", [a, b, c, b], load_many) == ["A", "B", "C", "B"]
+    assert batches == [[b, c]]
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+def test_fetch_objects_shares_objects(tmp_path):
+    cache = ParsedItemCache()
+    loaded = cache.fetch_objects("ns", ["x", "y", "x"], lambda ids: [*ids])
+    assert loaded == ["x", "y", "x"]
+    assert len(cache) == 2
+
+
+def test_fetch_reloads_modified_files(tmp_path):
+    path = _write(tmp_path, "a", "one")
+    cache = ParsedItemCache()
+
+    def load(path):
+        with open(path) as f:
+            return f.read()
+
+    assert cache.fetch("ns", path, load) == "one"
+    with open(path, "w") as f:
+        f.write("three")
+    assert cache.fetch("ns", path, load) == "three"
+    assert cache.fetch("other", path, str.upper) == path.upper()
+    assert (cache.hits, cache.misses) == (0, 3)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    a, b, c = (_write(tmp_path, name, name) for name in "abc")
+    cache = ParsedItemCache(maxsize=2)
+    cache.fetch("ns", a, str)
+    cache.fetch("ns", b, str)
+    cache.fetch("ns", a, str)  # b is now the least recently used
+    cache.fetch("ns", c, str)
+    assert len(cache) == 2
+    cache.fetch("ns", a, str)
+    assert (cache.hits, cache.misses) == (2, 3)
+    cache.fetch("ns", b, str)
+    assert cache.misses == 4
+
+
+def test_concurrent_fetches_load_once(tmp_path):
+    path = _write(tmp_path, "a", "a")
+    cache = ParsedItemCache()
+    started = threading.Event()
+    release = threading.Event()
+    loads = []
+
+    def slow_load(path):
+        loads.append(path)
+        started.set()
+        release.wait(5)
+        return "loaded"
+
+    results = []
+    first = threading.Thread(
+        target=lambda: results.append(cache.fetch("ns", path, slow_load))
+    )
+    first.start()
+    started.wait(5)
+    second = threading.Thread(
+        target=lambda: results.append(cache.fetch("ns", path, slow_load))
+    )
+    second.start()
+    release.set()
+    first.join(5)
+    second.join(5)
+    assert results == ["loaded", "loaded"]
+    assert loads == [path]
+
+
+def test_item_and_aggregate_generators_share_parses(tmp_path, monkeypatch):
+    source = tmp_path / "awards"
+    source.mkdir()
+    for name in "ab":
+        (source / f"{name}.yaml").write_text(
+            f"title: Award {name}\nawarded-by: Acme\ndate: June 2020\n"
+            f"description: Won {name}\n"
+        )
+    monkeypatch.setattr(generators, "PARSED_ITEMS", ParsedItemCache())
+    item_generator = generators.AwardItemGenerator()
+    item_generator.output_root = str(tmp_path / "generated")
+    item_generator.generate_dir(str(source), add_comment=False)
+    aggregate = generators.AllItemsByDateGenerator(item_generator)
+    aggregate.generate_dir(str(source), add_comment=False)
+    assert (generators.PARSED_ITEMS.hits, generators.PARSED_ITEMS.misses) == (2, 2)
+
+
+def test_generators_with_different_record_types_do_not_share_parses(
+    tmp_path, monkeypatch
+):
+    path = _write(
+        tmp_path, "a.yaml", "job-title: Job\ncompany: Acme\nend-date: June 2020\n"
+    )
+    monkeypatch.setattr(generators, "PARSED_ITEMS", ParsedItemCache())
+    generator, other = generators.WorkItemGenerator(), generators.WorkItemGenerator()
+    other.record_type = record_type(
+        "work-variant", ["job-title", *DATE_FIELDS, *TEXT_FIELDS]
+    )
+    assert generator.load(path) is generator.load(path)
+    assert type(other.load(path)) is other.record_type
+    assert generators.PARSED_ITEMS.misses == 2
@@ -0,0 +1,65 @@
+from generate.generators import AwardItemGenerator, WorkItemGenerator
+
+ITEMS = [
+    {
+        "job-title": f"Job {i}",
+        "company": "Acme",
+        "start-date": f"May {2000 + i}",
+        "end-date": f"June {2000 + i}",
+        "comment": None,
+        "description": f"Did *things* number {i}, see https://example.com/{i}",
+    }
+    for i in range(4)
+]
+
+
+def test_generate_many_matches_generate():
+    generator = WorkItemGenerator()
+    items = generator.parse_many(ITEMS)
+    rendered = generator.generate_many(items)
+    assert set(rendered) == set(generator.formatters)
+    for fmt, texts in rendered.items():
+        assert texts == [generator.generate(item, fmt) for item in items]
+
+
+def test_generate_many_caps_per_format():
+    generator = WorkItemGenerator()
+    items = generator.parse_many(ITEMS)
+    rendered = generator.generate_many(items, ["resume", "cv"], {"resume": 2})
+    assert [len(rendered["cv"]), len(rendered["resume"])] == [4, 2]
+    assert rendered["resume"] == [
+        generator.generate(item, "resume") for item in items[:2]
+    ]
+
+
+def test_base_fields_are_formatted_once_per_item(monkeypatch):
+    generator = WorkItemGenerator()
+    items = generator.parse_many(ITEMS)
+    calls = []
+    format_base = generator.format_base
+
+    def counting_format_base(data):
+        calls.append(data)
+        return format_base(data)
+
+    monkeypatch.setattr(generator, "format_base", counting_format_base)
+    generator.generate_many(items)
+    assert len(calls) == len(items)
+    generator.generate(items[0], "cv")
+    assert len(calls) == len(items) + 1  # not shared outside generate_many
+
+
+def test_award_dates_are_formatted_like_other_dates():
+    generator = AwardItemGenerator()
+    (award,) = generator.parse_many(
+        [
+            {
+                "title": "Prize",
+                "awarded-by": "Acme",
+                "date": "June 2022",
+                "description": None,
+            }
+        ]
+    )
+    assert "{\\noindent Jun 2022 }" in generator.generate(award, "resume")
+    assert "{ June 2022 }" in generator.generate(award, "cv")
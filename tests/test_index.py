@@ -0,0 +1,58 @@
+from generate.index import IndexedItem, ItemIndex, ItemQuery, index_items
+from generate.utils import date_sort_key
+
+
+def _index():
+    return index_items(
+        "work",
+        [
+            ("old", {"end-date": "June 2019", "tags": ["python"]}),
+            ("new", {"end-date": "May 2023", "tags": ["python", "sql"]}),
+            ("undated", {"tags": ["python"]}),
+            ("mid", {"end-date": "March 2021", "company": "Acme"}),
+        ],
+    )
+
+
+def _names(items):
+    return [item.name for item in items]
+
+
+def test_select_by_date():
+    assert _names(_index().select(ItemQuery())) == ["new", "mid", "old", "undated"]
+
+
+def test_undated_items_are_selectable_in_source_order():
+    skills = ItemIndex(
+        IndexedItem(name, "skill", {"name": name}, None) for name in ["b", "a", "c"]
+    )
+    assert _names(skills.select(ItemQuery(limit=2))) == ["b", "a"]
+    assert _names(skills.select(ItemQuery(item_type="skill"))) == ["b", "a", "c"]
+
+
+def test_date_range_leaves_out_undated_items():
+    query = ItemQuery(since=date_sort_key("January 2020"))
+    assert _names(_index().select(query)) == ["new", "mid"]
+
+
+def test_tags_and_limit():
+    query = ItemQuery(tags=frozenset(["python"]), limit=2)
+    assert _names(_index().select(query)) == ["new", "old"]
+
+
+def test_order_by_field_ranks_items_without_it_last():
+    index = index_items(
+        "skill",
+        [("a", {"score": 2}), ("b", {}), ("c", {"score": 5})],
+    )
+    assert _names(index.select(ItemQuery(order_by="score"))) == ["c", "a", "b"]
+
+
+def test_institutions():
+    query = ItemQuery(institutions=frozenset(["acme"]))
+    assert _names(_index().select(query)) == ["mid"]
+
+
+def test_repr_is_stable():
+    query = ItemQuery(tags=frozenset(["b", "a", "c"]))
+    assert "tags=['a', 'b', 'c']" in repr(query)
@@ -0,0 +1,59 @@
+from generate.layout import (
+    LAYOUTS,
+    NORMAL_10,
+    ItemLayout,
+    command_arguments,
+    count_lines,
+    fit,
+    tex_text,
+)
+
+
+def test_tex_text():
+    tex = r"\textbf{Job} at \href{https://x.org}{x.org}\\ 5\% more -- % comment"
+    assert tex_text(tex) == "Job at x.org\n 5% more \u2013 "
+
+
+def test_command_arguments():
+    tex = r"\twentyitem[x]{a {b}}{\{c}{d}"
+    assert command_arguments(tex, "twentyitem") == ["a {b}", r"\{c", "d"]
+    assert command_arguments(tex, "cvchronoitem") is None
+
+
+def test_count_lines():
+    width = NORMAL_10.width("word word")
+    assert count_lines([("word word word", NORMAL_10)], width) == 2
+    assert count_lines([("word\nword", NORMAL_10)], width) == 2
+    assert count_lines([("", NORMAL_10)], width) == 0
+
+
+def test_longer_descriptions_take_more_space():
+    layout = LAYOUTS["resume"]
+    item = "\\twentyitem\n{{Jan 2020 - \\\\ Jun 2020}}\n{{Job}}\n{{Acme}}\n{{{}}}\n"
+    short = layout.item_height(item.format("Did things."))
+    long = layout.item_height(item.format("Did many things. " * 20))
+    assert long > short
+
+
+def test_fit_prefers_more_items_over_longer_descriptions():
+    layout = LAYOUTS["resume"]
+    capacity = layout.page_height
+
+    def item(name, short, long):
+        heights = {"short-description": short, "description": long}
+        return ItemLayout("work", name, heights)
+
+    # room for all three short, and for one long description besides
+    short = (capacity - layout.section_height - 2 * layout.item_separation) / 4
+    items = [item(name, short, 2 * short) for name in "abc"]
+    result = fit({"work": items}, layout)
+    assert [(chosen.name, field) for chosen, field in result.chosen] == [
+        ("a", "description"),
+        ("b", "short-description"),
+        ("c", "short-description"),
+    ]
+    assert result.left_out == []
+    assert result.height <= result.capacity
+
+    result = fit({"work": items * 2}, layout)
+    assert len(result.chosen) == 3 and len(result.left_out) == 3
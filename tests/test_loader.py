@@ -0,0 +1,32 @@
+import os
+
+from generate.loader import YamlLoader
+
+TEXT = "title: Job\ntags: [a, b]\n"
+
+
+def test_load():
+    assert YamlLoader().load(TEXT) == {"title": "Job", "tags": ["a", "b"]}
+
+
+def test_cache(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    loader = YamlLoader(cache_dir)
+    assert (
+        loader.load(TEXT) == loader.load(TEXT) == {"title": "Job", "tags": ["a", "b"]}
+    )
+    assert (loader.cache_hits, loader.cache_misses) == (1, 1)
+    assert len(os.listdir(cache_dir)) == 1
+    assert YamlLoader(cache_dir).load(TEXT + "x: 1\n")["x"] == 1
+    assert "1 hits, 1 misses" in loader.report()
+
+
+def test_corrupt_cache_entries_are_reparsed(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    YamlLoader(cache_dir).load(TEXT)
+    (name,) = os.listdir(cache_dir)
+    with open(os.path.join(cache_dir, name), "wb") as f:
+        f.write(b"")
+    loader = YamlLoader(cache_dir)
+    assert loader.load(TEXT)["title"] == "Job"
+    assert loader.cache_misses == 1
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from generate.generators import WorkItemGenerator
+from generate.manifest import Manifest
+from generate.templates import SimpleTemplate
+
+ITEM = """\
+job-title: Job
+company: Acme
+start-date: May 2020
+end-date: June 2020
+comment:
+description: Did things
+"""
+
+
+@pytest.fixture
+def setup(tmp_path):
+    path = tmp_path / "job.yaml"
+    path.write_text(ITEM)
+    generator = WorkItemGenerator()
+    generator.output_root = str(tmp_path / "generated")
+    manifest = Manifest(str(tmp_path / "manifest.json"))
+    generator.generate_outputs(str(path), manifest=manifest)
+    return path, generator, manifest
+
+
+def _stale(generator, path, manifest):
+    return {
+        fmt: generator.stale_reason(str(path), fmt, manifest=manifest)
+        for fmt in generator.formatters
+    }
+
+
+def test_up_to_date_after_run(setup):
+    path, generator, manifest = setup
+    assert set(_stale(generator, path, manifest).values()) == {None}
+
+
+def test_saved_and_reloaded(setup):
+    path, generator, manifest = setup
+    manifest.save()
+    reloaded = Manifest(manifest.path)
+    assert set(_stale(generator, path, reloaded).values()) == {None}
+
+
+def test_stale_after_input_change(setup):
+    path, generator, manifest = setup
+    path.write_text(ITEM.replace("Acme", "Initech"))
+    assert None not in _stale(generator, path, manifest).values()
+
+
+def test_stale_after_template_change(setup):
+    path, generator, manifest = setup
+    generator.templates = {
+        **generator.templates,
+        "cv": SimpleTemplate("{job-title} at {company}"),
+    }
+    assert _stale(generator, path, manifest)["cv"] is not None
+
+
+def test_stale_after_output_modified(setup):
+    path, generator, manifest = setup
+    output = os.path.join(generator.output_dir("cv"), "job.tex")
+    with open(output, "a", encoding="utf-8") as f:
+        f.write("% edited\n")
+    assert _stale(generator, path, manifest)["cv"].startswith("output modified")
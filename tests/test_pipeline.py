@@ -0,0 +1,76 @@
+import collections
+
+import pytest
+
+from generate import generators
+from generate.cache import PARSED_ITEMS
+from generate.pipeline import build_graph
+from generate.plan import BuildPlan
+
+
+@pytest.fixture
+def parses(tmp_path, monkeypatch):
+    """Sizes of the batches of items parsed, and number of parses per item"""
+    monkeypatch.setattr(
+        generators.FileToFileGenerator, "output_root", str(tmp_path / "generated")
+    )
+    PARSED_ITEMS.clear()
+    batches = []
+    counts = collections.Counter()
+    parse_many = generators.YamlTexModuleGenerator.parse_many
+
+    def counting_parse_many(self, items):
+        batches.append(len(items))
+        counts.update(item["job-title"] for item in items)
+        return parse_many(self, items)
+
+    monkeypatch.setattr(
+        generators.YamlTexModuleGenerator, "parse_many", counting_parse_many
+    )
+    yield batches, counts
+    PARSED_ITEMS.clear()
+
+
+def _run(tmp_path, n_items):
+    source = tmp_path / "work-items"
+    source.mkdir()
+    for i in range(n_items):
+        (source / f"item{i:03}.yaml").write_text(
+            f"job-title: Job {i}\n"
+            "company: Acme\n"
+            f"start-date: January {2000 + i}\n"
+            f"end-date: June {2000 + i}\n"
+            "comment:\n"
+            f"description: Did things number {i}\n"
+        )
+    plan = BuildPlan.from_data(
+        {
+            "modules": [
+                {
+                    "source": str(source),
+                    "generator": "work",
+                    "aggregates": ["all-items-by-date"],
+                }
+            ]
+        }
+    )
+    build_graph(plan=plan).run()
+
+
+def test_directory_is_parsed_once_in_one_batch(tmp_path, parses):
+    batches, counts = parses
+    _run(tmp_path, 20)
+    assert batches == [20]
+    assert set(counts.values()) == {1}
+
+
+def test_directory_larger_than_cache_is_not_batch_parsed(
+    tmp_path, parses, monkeypatch
+):
+    _, counts = parses
+    monkeypatch.setattr(PARSED_ITEMS, "maxsize", 8)
+    _run(tmp_path, 20)
+    # once by the item's own task, at most once more by the aggregate
+    assert len(counts) == 20
+    assert max(counts.values()) <= 2
+    assert sum(counts.values()) == 20 + 20 - PARSED_ITEMS.maxsize
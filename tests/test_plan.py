@@ -0,0 +1,26 @@
+import os
+
+from generate.plan import parse_plan
+
+PLAN = "modules:\n  - source: modules/work\n    generator: work\n"
+
+
+def test_parse_plan_caches_as_json(tmp_path):
+    cache_dir = str(tmp_path)
+    data = parse_plan(PLAN, cache_dir=cache_dir)
+    assert data == {"modules": [{"source": "modules/work", "generator": "work"}]}
+    (name,) = os.listdir(cache_dir)
+    assert name.endswith(".json")
+
+    with open(os.path.join(cache_dir, name), "w", encoding="utf-8") as f:
+        f.write('{"modules": []}')
+    assert parse_plan(PLAN, cache_dir=cache_dir) == {"modules": []}
+
+
+def test_parse_plan_ignores_corrupt_cache(tmp_path):
+    cache_dir = str(tmp_path)
+    parse_plan(PLAN, cache_dir=cache_dir)
+    (name,) = os.listdir(cache_dir)
+    with open(os.path.join(cache_dir, name), "w", encoding="utf-8") as f:
+        f.write("{")
+    assert parse_plan(PLAN, cache_dir=cache_dir)["modules"][0]["generator"] == "work"
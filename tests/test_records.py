@@ -0,0 +1,56 @@
+import pytest
+
+from generate.records import Overlay, record_type
+
+ItemRecord = record_type("test-item", ["title", "description", "end-date"])
+
+
+def _record():
+    return ItemRecord.from_mapping({"title": "Job", "end-date": None, "tags": ["x"]})
+
+
+def test_record_lookup():
+    record = _record()
+    assert record["title"] == "Job"
+    assert record["end-date"] is None
+    assert record["tags"] == ["x"]  # not declared, kept as an extra field
+    assert "description" not in record
+    assert record.get("description", "-") == "-"
+    with pytest.raises(KeyError):
+        record["description"]
+    with pytest.raises(KeyError):
+        record["company"]
+
+
+def test_record_behaves_like_a_dict():
+    record = _record()
+    assert dict(record) == {"title": "Job", "end-date": None, "tags": ["x"]}
+    assert len(record) == 3
+    assert record == {"end-date": None, "tags": ["x"], "title": "Job"}
+
+
+def test_record_type_is_reused():
+    assert record_type("test-item", ["end-date", "title", "description"]) is ItemRecord
+    assert record_type("test-item", ["title"]) is not ItemRecord
+
+
+def test_overlay_shadows_without_changing_the_record():
+    record = _record()
+    overlay = Overlay(record)
+    overlay["title"] = r"\textbf{Job}"
+    overlay["comment"] = ""
+    assert overlay["title"] == r"\textbf{Job}"
+    assert record["title"] == "Job"
+    assert overlay["tags"] == ["x"]
+    assert dict(overlay) == {
+        "title": r"\textbf{Job}",
+        "end-date": None,
+        "tags": ["x"],
+        "comment": "",
+    }
+    assert len(overlay) == 4
+
+    del overlay["comment"]
+    assert "comment" not in overlay
+    with pytest.raises(TypeError):
+        del overlay["title"]
@@ -0,0 +1,41 @@
+import os
+import shutil
+
+from generate.save import (
+    generated_header,
+    save_tex,
+    stream_if_changed,
+    write_if_changed,
+)
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def test_write_if_changed_ignores_generated_header(tmp_path):
+    path = str(tmp_path / "out.tex")
+    assert write_if_changed(path, generated_header("a.py") + "body\n")
+    os.utime(path, ns=(0, 0))
+    assert not write_if_changed(path, "% generated by b.py at later\nbody\n")
+    assert os.stat(path).st_mtime_ns == 0
+    assert write_if_changed(path, generated_header("a.py") + "other body\n")
+    assert _read(path).endswith("other body\n")
+
+
+def test_stream_if_changed_ignores_generated_header(tmp_path):
+    path = str(tmp_path / "out.tex")
+    assert stream_if_changed(path, [generated_header("a.py"), "bo", "dy\n"])
+    assert not stream_if_changed(path, [generated_header("b.py"), "body\n"])
+    assert stream_if_changed(path, ["other body\n"])
+    assert _read(path) == "other body\n"
+    assert os.listdir(tmp_path) == ["out.tex"]  # no temporary files left behind
+
+
+def test_output_dir_removed_while_running_is_recreated(tmp_path):
+    output_dir = str(tmp_path / "generated" / "cv")
+    save_tex("one", "cv TeX", "item", output_dir=output_dir)
+    shutil.rmtree(tmp_path / "generated")
+    path = save_tex("two", "cv TeX", "item", output_dir=output_dir)
+    assert _read(path) == "two"
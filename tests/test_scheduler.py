@@ -0,0 +1,48 @@
+import threading
+
+import pytest
+
+from generate.scheduler import TaskGraph
+
+
+def _graph(log, fail=()):
+    lock = threading.Lock()
+
+    def task(key):
+        def run():
+            if key in fail:
+                raise RuntimeError(key)
+            with lock:
+                log.append(key)
+
+        return run
+
+    graph = TaskGraph()
+    graph.add("a", task("a"))
+    graph.add("b", task("b"))
+    graph.add("c", task("c"), dependencies=["a", "b"])
+    graph.add("d", task("d"), dependencies=["c"])
+    return graph
+
+
+@pytest.mark.parametrize("jobs", [1, 4])
+def test_dependencies_run_first(jobs):
+    log = []
+    _graph(log).run(jobs=jobs)
+    assert sorted(log[:2]) == ["a", "b"]
+    assert log[2:] == ["c", "d"]
+
+
+@pytest.mark.parametrize("jobs", [1, 4])
+def test_failure_skips_dependents(jobs):
+    log = []
+    with pytest.raises(RuntimeError, match="b"):
+        _graph(log, fail={"b"}).run(jobs=jobs)
+    assert "c" not in log and "d" not in log
+
+
+def test_unknown_dependency():
+    graph = TaskGraph()
+    with pytest.raises(ValueError):
+        graph.add("a", lambda: None, dependencies=["missing"])
+
@@ -0,0 +1,47 @@
+import pytest
+
+from generate.generators import AllItemsByDateGenerator, WorkItemGenerator
+
+
+def _items(tmp_path, n_items):
+    source = tmp_path / "work-items"
+    source.mkdir()
+    for i in range(n_items):
+        (source / f"item{i:02}.yaml").write_text(
+            f"job-title: Job {i}\n"
+            "company: Acme\n"
+            f"start-date: January {2000 + i // 2}\n"
+            f"end-date: June {2000 + i // 2}\n"  # pairs of items with equal dates
+            "comment:\n"
+            f"description: Did things number {i}, see https://example.com/{i}\n"
+        )
+    return sorted(str(path) for path in source.iterdir())
+
+
+def _render(tmp_path, paths, output, stream, **kwargs):
+    generator = WorkItemGenerator()
+    generator.output_root = str(tmp_path / output)
+    aggregate = AllItemsByDateGenerator(generator, **kwargs)
+    render = aggregate.stream_output if stream else aggregate.render_output
+    outputs = {}
+    for fmt in generator.formatters:
+        with open(render(paths, fmt, add_comment=False), "rb") as f:
+            outputs[fmt] = f.read()
+    return outputs
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {},
+        {"max_items": {"cv": 5, "resume": 3}},
+        {"order": ["item07", "item02"], "max_items": {"resume": 3}},
+    ],
+)
+def test_streamed_output_matches_rendered_output(tmp_path, options):
+    paths = _items(tmp_path, 12)
+    streamed = _render(tmp_path, paths, "streamed", True, **options)
+    rendered = _render(tmp_path, paths, "rendered", False, **options)
+    assert streamed == rendered
+    for fmt, tex in streamed.items():
+        assert tex.count(b"Job ") == options.get("max_items", {}).get(fmt, 12)
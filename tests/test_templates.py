@@ -0,0 +1,54 @@
+import pytest
+
+from generate.templates import (
+    TEX_TEMPLATES,
+    CompiledFormat,
+    MultiItemTemplate,
+    SimpleTemplate,
+    cap_templates,
+)
+
+FIELDS = {"title": "Job", "start-date": "May 2020", "score": 4.5, "items": []}
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        "plain text",
+        r"\item{{ {title} }} {{{start-date}}}",
+        "{score:.2f} {title!r} {title:>6}",
+    ],
+)
+def test_render_matches_str_format(source):
+    assert CompiledFormat(source).render(FIELDS) == source.format_map(FIELDS)
+
+
+def test_fields():
+    assert CompiledFormat("{a} {b!r} {{c}} {a}").fields == {"a", "b"}
+
+
+@pytest.mark.parametrize("source", ["{}", "{0}", "{a.b}", "{a[0]}", "{a:{b}}"])
+def test_unsupported_fields(source):
+    with pytest.raises(ValueError):
+        CompiledFormat(source)
+
+
+def test_missing_fields():
+    with pytest.raises(KeyError, match="start-date"):
+        SimpleTemplate("{title} {start-date}").fill({"title": "Job"})
+
+
+def test_multi_item_template_caps():
+    template = MultiItemTemplate("[{items}]", "<{name}>", ", ")
+    items = [{"name": name} for name in "abc"]
+    assert template.fill({"items": items}) == "[<a>, <b>, <c>]"
+    assert template.with_max_items(2).fill({"items": items}) == "[<a>, <b>]"
+    assert template.item_fields == {"name"}
+
+
+def test_cap_templates_only_caps_multi_item_templates():
+    capped = cap_templates(TEX_TEMPLATES["skill"], {"resume": 1})
+    assert capped["resume"].max_items == 1
+    assert capped["cv"] is TEX_TEMPLATES["skill"]["cv"]
+    work = TEX_TEMPLATES["work"]
+    assert cap_templates(work, {"resume": 1}) == work
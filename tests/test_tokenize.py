@@ -0,0 +1,28 @@
+import pytest
+
+from generate.tokenize import DateToken, tokenize
+
+
+@pytest.mark.parametrize(
+    "text, tex",
+    [
+        ("Solved $x^2 + 1$ in \\(a*b*c\\)", "Solved $x^2 + 1$ in \\(a*b*c\\)"),
+        ("R&D, 100% of #1 and a_b", "R\\&D, 100\\% of \\#1 and a\\_b"),
+        ("a price of \\$5", "a price of \\$5"),
+        ("$5 and $10", "\\$5 and \\$10"),
+        ("between $ 5 and 10 $", "between \\$ 5 and 10 \\$"),
+        ("5*3*2 and C*-algebras, W*-algebras", "5*3*2 and C*-algebras, W*-algebras"),
+        (
+            "a *nice* and **bold *x* text**",
+            "a \\emph{nice} and \\textbf{bold \\emph{x} text}",
+        ),
+    ],
+)
+def test_tokenize(text, tex):
+    assert format(tokenize(text), "") == tex
+
+
+def test_dates():
+    tokens = tokenize("From Jun. 2020 to March 2021, not Junk 2022").token_list
+    dates = [token.date for token in tokens if isinstance(token, DateToken)]
+    assert [(date.year, date.month) for date in dates] == [(2020, 6), (2021, 3)]
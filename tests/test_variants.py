@@ -0,0 +1,112 @@
+import os
+
+import pytest
+
+from generate.plan import BuildPlan
+from generate.variants import Variant, build_variants_graph
+
+SKILLS = """\
+items:
+  - name: Python
+    level: Fluent
+    score: 5
+    description: Python
+  - name: SQL
+    level: Intermediate
+    score: 3
+    description: SQL
+  - name: Git
+    level: Fluent
+    score: 4
+    description: Git
+"""
+
+
+@pytest.fixture
+def outputs(tmp_path):
+    """Render a plan in the given variants, returning a reader of their outputs"""
+    modules = tmp_path / "modules"
+    work = modules / "work-items"
+    work.mkdir(parents=True)
+    for year, name in enumerate(["a", "b", "c", "d"], start=2010):
+        (work / f"{name}.yaml").write_text(
+            f"job-title: Job {name}\ncompany: Acme\nstart-date: May {year}\n"
+            f"end-date: June {year}\ncomment:\ndescription: Did {name}\n"
+        )
+    (modules / "skills.yaml").write_text(SKILLS)
+    plan = BuildPlan.from_data(
+        {
+            "modules": [
+                {
+                    "source": str(work),
+                    "generator": "work",
+                    "aggregates": ["all-items-by-date"],
+                },
+                {"source": str(modules / "skills.yaml"), "generator": "skill"},
+            ]
+        }
+    )
+
+    def render(*variants_data):
+        variants = [
+            Variant.from_data({"output-root": str(tmp_path / data["name"]), **data})
+            for data in variants_data
+        ]
+        build_variants_graph(variants, add_comment=False, plan=plan).run()
+
+        def read(variant, fmt, name):
+            path = os.path.join(tmp_path, variant, fmt, name)
+            if not os.path.exists(path):
+                return None
+            with open(path, encoding="utf-8") as f:
+                return f.read()
+
+        return read
+
+    return render
+
+
+def _jobs(tex):
+    return [line.strip()[2:-2] for line in tex.splitlines() if "Job " in line]
+
+
+def test_include_exclude_order_and_max_items(outputs):
+    read = outputs(
+        {
+            "name": "short",
+            "sections": {
+                "work-items": {
+                    "exclude": ["b"],
+                    "order": ["a"],
+                    "max-items": {"resume": 2},
+                },
+                "skills": {"include": ["Python", "Git"], "max-items": 1},
+            },
+        },
+        {"name": "full"},
+    )
+    assert _jobs(read("short", "cv", "work/all-items.tex")) == [
+        "Job a",
+        "Job d",
+        "Job c",
+    ]
+    assert _jobs(read("short", "resume", "work/all-items.tex")) == ["Job a", "Job d"]
+    assert read("short", "cv", "work/b.tex") is None
+    assert read("short", "cv", "work/c.tex") is not None
+    skills = read("short", "cv", "skills.tex")
+    assert "Python" in skills and "SQL" not in skills and "Git" not in skills
+
+    assert _jobs(read("full", "cv", "work/all-items.tex")) == [
+        "Job d",
+        "Job c",
+        "Job b",
+        "Job a",
+    ]
+    assert all(name in read("full", "cv", "skills.tex") for name in ["Python", "SQL"])
+
+
+def test_select(outputs):
+    read = outputs(
+        {"name": "recent", "sections": {"work-items": {"select": {"limit": 2}}}}
+    )
+    assert _jobs(read("recent", "cv", "work/all-items.tex")) == ["Job d", "Job c"]